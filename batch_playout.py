@@ -0,0 +1,146 @@
+"""
+A module for playing many random Stonehenge games at once with NumPy.
+
+A batch of games is a few arrays with one row per game:
+
+    cells   the mark of each cell (0 empty, 1 or 2 for the player)
+    counts  the stones of each player on each ley line
+    claims  the owner of each ley line (0 for nobody yet)
+    mover   whose turn it is (1 or 2)
+
+Every step plays one random empty cell in every game that is not over yet:
+a random number per cell, with taken cells ruled out, picks the cell, and
+the row of that cell in the ley-line incidence matrix adds the stone to
+the counts of every line through it. A line becomes the mover's when their
+count reaches half its length, which is only checked right after their
+move, so whoever gets half first keeps it, as in SGState. A game is over
+when a player owns lines_to_win lines or the board is full.
+"""
+from typing import Optional, Tuple
+import numpy
+from stonehenge_board import BoardLayout, Position, board_layout
+
+# Games played at once by playout_win_rate.
+DEFAULT_BATCH = 4096
+
+# Playout boards made by playout_board, by size.
+_boards = {}
+
+
+class PlayoutBoard:
+    """
+    The incidence matrix of a Stonehenge board size.
+
+    layout - the layout of the board
+    incidence - incidence[i, j] is 1 if cell i is on ley line j
+    half - the stones a player needs on each line to claim it
+    """
+    layout: BoardLayout
+    incidence: numpy.ndarray
+    half: numpy.ndarray
+
+    def __init__(self, size: int) -> None:
+        """
+        Create the playout board of size.
+        """
+        self.layout = board_layout(size)
+        self.incidence = numpy.zeros(
+            (len(self.layout.cells), len(self.layout.lines)), dtype=numpy.int8)
+        for j, line in enumerate(self.layout.lines):
+            self.incidence[list(line), j] = 1
+        lengths = self.incidence.sum(axis=0)
+        self.half = (lengths + 1) // 2
+
+    def encode(self, positions: Tuple[Position, ...]) \
+            -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        Return the cells, claims and mover arrays of positions.
+        """
+        cells = numpy.array([position[0] for position in positions],
+                            dtype=numpy.int8)
+        claims = numpy.array([position[1] for position in positions],
+                             dtype=numpy.int8)
+        mover = numpy.array([1 if position[2] else 2
+                             for position in positions], dtype=numpy.int8)
+        return cells, claims, mover
+
+    def winners(self, claims: numpy.ndarray) -> numpy.ndarray:
+        """
+        Return the winner of each game with claims: 1 or 2 if that player
+        owns enough lines, else 0.
+        """
+        needed = self.layout.lines_to_win
+        winner = numpy.zeros(len(claims), dtype=numpy.int8)
+        winner[(claims == 2).sum(axis=1) >= needed] = 2
+        winner[(claims == 1).sum(axis=1) >= needed] = 1
+        return winner
+
+    def play_out(self, cells: numpy.ndarray, claims: numpy.ndarray,
+                 mover: numpy.ndarray,
+                 rng: numpy.random.Generator) -> numpy.ndarray:
+        """
+        Play every game of the batch to the end with uniformly random moves
+        and return the winner of each (0 if neither player won). The arrays
+        are not changed.
+        """
+        cells = cells.copy()
+        claims = claims.copy()
+        mover = mover.copy()
+        incidence = self.incidence.astype(numpy.int16)
+        counts = numpy.stack([(cells == 1).astype(numpy.int16) @ incidence,
+                              (cells == 2).astype(numpy.int16) @ incidence])
+        winner = self.winners(claims)
+        live = numpy.flatnonzero((winner == 0) & (cells == 0).any(axis=1))
+        while len(live):
+            keys = rng.random((len(live), cells.shape[1]))
+            keys[cells[live] != 0] = -1.0
+            chosen = keys.argmax(axis=1)
+            player = mover[live]
+            cells[live, chosen] = player
+            player_counts = counts[player - 1, live] + incidence[chosen]
+            counts[player - 1, live] = player_counts
+            line_claims = claims[live]
+            new = (line_claims == 0) & (player_counts >= self.half)
+            line_claims[new] = numpy.broadcast_to(
+                player[:, None], new.shape)[new]
+            claims[live] = line_claims
+            mover[live] = 3 - player
+            live_winner = self.winners(line_claims)
+            winner[live] = live_winner
+            live = live[(live_winner == 0) & (cells[live] == 0).any(axis=1)]
+        return winner
+
+
+def playout_board(size: int) -> PlayoutBoard:
+    """
+    Return the playout board of size, made once per size.
+    """
+    if size not in _boards:
+        _boards[size] = PlayoutBoard(size)
+    return _boards[size]
+
+
+def playout_win_rate(size: int, position: Position, playouts: int,
+                     rng: Optional[numpy.random.Generator] = None,
+                     batch: int = DEFAULT_BATCH) -> float:
+    """
+    Return the share of playouts random games from position, on a board of
+    size, that the player to move in position wins, played batch games at
+    a time.
+    """
+    board = playout_board(size)
+    rng = rng if rng is not None else numpy.random.default_rng()
+    cells, claims, mover = board.encode((position,))
+    wins = 0
+    for start in range(0, playouts, batch):
+        count = min(batch, playouts - start)
+        winner = board.play_out(numpy.repeat(cells, count, axis=0),
+                                numpy.repeat(claims, count, axis=0),
+                                numpy.repeat(mover, count), rng)
+        wins += int((winner == mover[0]).sum())
+    return wins / playouts
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
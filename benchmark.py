@@ -0,0 +1,1166 @@
+"""
+Benchmarks for the search strategies.
+
+Run a benchmark by name, e.g.
+
+    python benchmark.py move_ordering
+
+or run all of them with no arguments. Each benchmark prints a small table.
+"""
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+import numpy
+from stonehenge import StonehengeGame
+from subtract_square_game import SubtractSquareGame
+from move_ordering import MoveOrderer, LeyLineOrderer
+from search import Searcher, SearchStrategy, solve, iterative_deepening, \
+    METHODS, FULL_DEPTH
+from opening_book import build_book, book_file_name
+from endgame import EndgameSolver, endgame_solver, empty_cells, \
+    ENDGAME_EMPTY_CELLS
+from strategy import recursive_minimax_strategy, rough_outcome_strategy, \
+    iterative_minimax_strategy
+from ponder import PonderingStrategy
+from stack_search import StackSearch, FrameStack, STACK_METHODS, MEMOIZED
+from mcts import MCTS
+from mcts_pool import PoolMCTS
+from rave import RaveMCTS, equivalence_schedule
+from batch_playout import playout_win_rate
+from heuristic import heuristic_search, make_heuristic_strategy, \
+    ley_line_evaluation, DEFAULT_WEIGHTS
+from tune import tune
+from proof_number import ProofNumberSearch
+from tablebase import Tablebase, subtract_square_codes
+from tablebase_file import TablebaseFile, write_tablebase_file, \
+    SUBTRACT_SQUARE
+from stonehenge_board import board_layout
+from ranking import PositionRanking, ranking_for
+from pruning import LeyLinePruner, dead_cells
+from parallel import parallel_minimax, process_pool, shutdown_pools, \
+    frontier
+from game_state import GameState
+
+
+def stonehenge_position(size: int, plies: int, seed: int) -> StonehengeGame:
+    """
+    Return a Stonehenge game of size after plies random moves, chosen with
+    random seed seed. Stops early if the game is over.
+    """
+    rng = random.Random(seed)
+    game = StonehengeGame(True, size)
+    for _ in range(plies):
+        moves = game.current_state.get_possible_moves()
+        if not moves:
+            break
+        game.current_state = game.current_state.make_move(rng.choice(moves))
+    return game
+
+
+def timed(function: Callable[[], Any]) -> Any:
+    """
+    Return (seconds taken, return value) of calling function.
+    """
+    start = time.perf_counter()
+    value = function()
+    return time.perf_counter() - start, value
+
+
+def move_ordering() -> None:
+    """
+    Compare nodes searched and first-move cutoff rate with alphabetical move
+    order against LeyLineOrderer, at a fixed depth on random positions of
+    sizes 2 to 4.
+    """
+    cases = [(2, 1, 7), (3, 3, 9), (4, 8, 10)]
+    print('size  depth  positions  nodes(alpha)  nodes(ordered)  '
+          'reduction  first-cut(alpha)  first-cut(ordered)')
+    for size, plies, depth in cases:
+        games = [stonehenge_position(size, plies, seed) for seed in range(5)]
+        row = []
+        for make_orderer in (plain_orderer, LeyLineOrderer):
+            nodes, cutoffs, first = 0, 0, 0
+            for game in games:
+                searcher = Searcher(game, orderer=make_orderer())
+                searcher.search_root(game.current_state, depth)
+                nodes += searcher.nodes
+                cutoffs += searcher.cutoffs
+                first += searcher.first_move_cutoffs
+            row.append((nodes, first / max(cutoffs, 1)))
+        print('{:4}  {:5}  {:9}  {:12}  {:14}  {:8.1%}  {:16.1%}  {:18.1%}'
+              .format(size, depth, len(games), row[0][0], row[1][0],
+                      1 - row[1][0] / row[0][0], row[0][1], row[1][1]))
+
+
+def plain_orderer() -> MoveOrderer:
+    """
+    Return an orderer that keeps moves in get_possible_moves order.
+    """
+    return MoveOrderer(use_hash_move=False, use_killers=False,
+                       use_history=False)
+
+
+def game_tree_size(state: GameState) -> int:
+    """
+    Return the number of states in the game tree below and including
+    state, which is what recursive_minimax_strategy visits.
+    """
+    return 1 + sum(game_tree_size(state.make_move(move))
+                   for move in state.get_possible_moves())
+
+
+def null_window() -> None:
+    """
+    Compare nodes and time of recursive minimax, alpha-beta, principal
+    variation search and MTD(f), all searching to the end of the game.
+    """
+    positions = [('subtract square 18', lambda: SubtractSquareGame(True, 18)),
+                 ('subtract square 30', lambda: SubtractSquareGame(True, 30)),
+                 ('stonehenge 2', lambda: StonehengeGame(True, 2)),
+                 ('stonehenge 3 after ABCD',
+                  lambda: stonehenge_after(3, 'ABCD')),
+                 ('stonehenge 3', lambda: StonehengeGame(True, 3))]
+    print('{:24}  {:>10}  {:>16}  {:>16}  {:>16}'.format(
+        'position', 'method', 'nodes', 'seconds', 'move'))
+    for name, make_game in positions:
+        if name != 'stonehenge 3':
+            game = make_game()
+            seconds, move = timed(lambda: recursive_minimax_strategy(game))
+            nodes = game_tree_size(game.current_state) - 1
+            print('{:24}  {:>10}  {:16}  {:16.3f}  {!r:>16}'.format(
+                name, 'minimax', nodes, seconds, move))
+        for method in METHODS:
+            game = make_game()
+            seconds, result = timed(lambda: solve(game, method))
+            print('{:24}  {:>10}  {:16}  {:16.3f}  {!r:>16}'.format(
+                name, method, result.nodes, seconds, result.move))
+
+
+def stonehenge_after(size: int, moves: str) -> StonehengeGame:
+    """
+    Return a Stonehenge game of size, p1 starting, after moves.
+    """
+    game = StonehengeGame(True, size)
+    for move in moves:
+        game.current_state = game.current_state.make_move(move)
+    return game
+
+
+def proof_number() -> None:
+    """
+    Prove Stonehenge positions that recursive minimax does not finish with
+    df-pn, with alpha-beta to the end of the game for comparison.
+    """
+    positions = [(3, ''), (3, 'A'), (3, 'AB'), (4, 'ABCDEF'),
+                 (4, 'AJBKCL'), (4, 'ABCDE')]
+    print('size  moves     value  move  expanded  proof size  seconds  '
+          'alpha-beta nodes  seconds')
+    for size, moves in positions:
+        game = stonehenge_after(size, moves)
+        search = ProofNumberSearch(game, max_nodes=10 ** 6)
+        seconds, result = timed(lambda: search.prove(game.current_state))
+        ab_seconds, ab_result = timed(lambda: solve(game))
+        print('{:4}  {:8}  {:5}  {:>4}  {:8}  {:10}  {:7.2f}  {:16}  {:7.2f}'
+              .format(size, moves or '-', result.value, result.move or '-',
+                      result.nodes, result.proof_size, seconds,
+                      ab_result.nodes, ab_seconds))
+
+
+def tablebase() -> None:
+    """
+    Build the Stonehenge tablebases of sizes 1 to 3 with 1 and with all
+    cores, and report build time, positions and table size.
+    """
+    cores = os.cpu_count() or 1
+    print('size  positions  seconds(1 core)  seconds({} cores)  '
+          'dict MB  pickle MB'.format(cores))
+    for size in (1, 2, 3):
+        seconds, table = timed(lambda: Tablebase.build(size))
+        many_seconds = timed(lambda: Tablebase.build(size, cores))[0] \
+            if cores > 1 else seconds
+        dict_bytes = sys.getsizeof(table.entries) + \
+            sum(sys.getsizeof(key) for key in table.entries)
+        pickle_bytes = len(pickle.dumps(table.entries))
+        print('{:4}  {:9}  {:15.2f}  {:16.2f}  {:7.1f}  {:9.1f}'.format(
+            size, len(table.entries), seconds, many_seconds,
+            dict_bytes / 1e6, pickle_bytes / 1e6))
+        print('      positions per stone count: {}'.format(table.layer_sizes))
+
+
+def tablebase_file() -> None:
+    """
+    Compare loading pickled tablebases with opening tablebase files, and
+    measure random probes per second on a freshly opened file with the
+    default block cache (cold) and once every block is cached (warm).
+    """
+    print('table               pickle MB  load s  file MB  open+probe s  '
+          'cold probes/s  warm probes/s')
+    directory = tempfile.mkdtemp()
+    for size in (2, 3):
+        table = Tablebase.build(size)
+        layout = board_layout(size)
+        indices = [ranking_for(size).rank(layout.unpack(packed))
+                   for packed in table.entries]
+        report_tablebase_file(directory, 'stonehenge {}'.format(size),
+                              table.entries, table.codes(), size, indices)
+    codes = subtract_square_codes(100000)
+    report_tablebase_file(directory, 'subtract square', list(codes), codes,
+                          0, list(range(len(codes))))
+
+
+def report_tablebase_file(directory: str, name: str, pickled: Any,
+                          codes: bytearray, size: int,
+                          indices: List[int]) -> None:
+    """
+    Print one row of the tablebase_file benchmark.
+    """
+    pickle_path = os.path.join(directory, name + '.pickle')
+    with open(pickle_path, 'wb') as file:
+        pickle.dump(pickled, file)
+
+    def load() -> Any:
+        with open(pickle_path, 'rb') as file:
+            return pickle.load(file)
+    load_seconds = timed(load)[0]
+
+    path = os.path.join(directory, name + '.gtb')
+    write_tablebase_file(path, codes, SUBTRACT_SQUARE if size == 0 else 1,
+                         size)
+    open_seconds = timed(lambda: TablebaseFile(path).value(indices[0]))[0]
+    probes = random.Random(0).choices(indices, k=100000)
+    table = TablebaseFile(path)
+    cold = timed(lambda: [table.value(i) for i in probes])[0]
+    table.close()
+    table = TablebaseFile(path, cache_blocks=len(codes))
+    [table.value(i) for i in probes]
+    warm = timed(lambda: [table.value(i) for i in probes])[0]
+    table.close()
+    print('{:18}  {:9.2f}  {:6.3f}  {:7.2f}  {:12.5f}  {:13.0f}  {:13.0f}'
+          .format(name, os.path.getsize(pickle_path) / 1e6, load_seconds,
+                  os.path.getsize(path) / 1e6, open_seconds,
+                  len(probes) / cold, len(probes) / warm))
+
+
+def ranking() -> None:
+    """
+    Measure ranking and unranking speed, one position at a time and in a
+    batch, and compare the memory of the size 3 tablebase values as a
+    dictionary keyed by packed position with a NumPy array indexed by rank.
+    """
+    print('size  positions  ranks  build s  rank/s  batch rank/s  unrank/s')
+    for size in (2, 3):
+        layout = board_layout(size)
+        build_seconds, ranks = timed(lambda: PositionRanking(size))
+        table = Tablebase.build(size)
+        positions = [layout.unpack(packed) for packed in table.entries]
+        positions = random.Random(0).sample(positions,
+                                            min(len(positions), 100000))
+        rank_seconds, numbers = timed(
+            lambda: [ranks.rank(position) for position in positions])
+        cells = numpy.array([position[0] for position in positions])
+        claims = numpy.array([position[1] for position in positions])
+        turns = numpy.array([position[2] for position in positions])
+        batch_seconds = timed(
+            lambda: ranks.rank_many(cells, claims, turns))[0]
+        unrank_seconds = timed(
+            lambda: [ranks.unrank(number) for number in numbers])[0]
+        print('{:4}  {:9}  {:5}  {:7.3f}  {:6.0f}  {:12.0f}  {:8.0f}'.format(
+            size, len(table.entries), ranks.count, build_seconds,
+            len(positions) / rank_seconds, len(positions) / batch_seconds,
+            len(positions) / unrank_seconds))
+
+    values = {packed: entry % 3 - 1 for packed, entry in table.entries.items()}
+    dict_bytes = sys.getsizeof(values) + \
+        sum(sys.getsizeof(key) for key in values)
+    array = numpy.full(ranks.count, -2, dtype=numpy.int8)
+    for packed, value in values.items():
+        array[ranks.rank(layout.unpack(packed))] = value
+    array_bytes = array.nbytes + ranks.offsets.nbytes
+    print('size 3 values: dict {:.1f} MB, int8 array {:.1f} MB + offsets '
+          '{:.1f} MB'.format(dict_bytes / 1e6, array.nbytes / 1e6,
+                             ranks.offsets.nbytes / 1e6))
+    print('               {:.0f}x smaller, {:.0%} of ranks reachable'.format(
+        dict_bytes / array_bytes, len(values) / ranks.count))
+
+
+def endgame() -> None:
+    """
+    Play whole games of iterative deepening against itself with a 0.5
+    second budget, with and without the switch to the endgame solver, and
+    compare the per-move latency in the midgame (more than
+    ENDGAME_EMPTY_CELLS empty cells) and in the endgame.
+    """
+    print('size  switch  phase     moves  median s  p90 s   max s   total s')
+    for size in (4, 5):
+        for cells in (None, ENDGAME_EMPTY_CELLS):
+            endgame_solver(size).cache.clear()
+            latencies = {'midgame': [], 'endgame': []}
+            for seed in range(3):
+                game = stonehenge_position(size, 2, seed)
+                while game.current_state.get_possible_moves():
+                    phase = 'endgame' if empty_cells(game.current_state) \
+                        <= ENDGAME_EMPTY_CELLS else 'midgame'
+                    seconds, result = timed(lambda: iterative_deepening(
+                        game, 0.5, endgame_cells=cells))
+                    latencies[phase].append(seconds)
+                    game.current_state = \
+                        game.current_state.make_move(result.move)
+            for phase, seconds in latencies.items():
+                seconds.sort()
+                print('{:4}  {:6}  {:7}  {:5}  {:8.3f}  {:6.3f}  {:6.3f}  '
+                      '{:7.2f}'.format(size, 'on' if cells else 'off', phase,
+                                       len(seconds),
+                                       seconds[len(seconds) // 2],
+                                       seconds[len(seconds) * 9 // 10],
+                                       seconds[-1], sum(seconds)))
+
+
+def opening_book() -> None:
+    """
+    Build two-ply books of sizes 4 and 5 with 0.5 seconds per position on
+    every core, and compare probing them with searching the first move.
+    """
+    cores = os.cpu_count() or 1
+    print('size  positions  build s({} cores)  file bytes  probe us  '
+          'search s'.format(cores))
+    directory = tempfile.mkdtemp()
+    for size in (4, 5):
+        path = os.path.join(directory, book_file_name(size))
+        build_seconds, book = timed(
+            lambda: build_book(size, 2, path, 0.5, cores))
+        state = StonehengeGame(True, size).current_state
+        probe_seconds = timed(
+            lambda: [book.probe(state) for _ in range(10000)])[0]
+        search_seconds = timed(
+            lambda: iterative_deepening(StonehengeGame(True, size), 0.5))[0]
+        print('{:4}  {:9}  {:16.1f}  {:10}  {:8.1f}  {:8.3f}'.format(
+            size, len(book.moves), build_seconds, os.path.getsize(path),
+            probe_seconds / 10000 * 1e6, search_seconds))
+
+
+def play_game(game: Any, p1: Callable[[Any], Any],
+              p2: Callable[[Any], Any]) -> str:
+    """
+    Play game to the end with strategy p1 for player 1 and p2 for player
+    2, and return the name of the winner, or 'draw'.
+    """
+    while not game.is_over(game.current_state):
+        strategy = p1 if game.current_state.p1_turn else p2
+        game.current_state = game.current_state.make_move(strategy(game))
+    for player in ('p1', 'p2'):
+        if game.is_winner(player):
+            return player
+    return 'draw'
+
+
+def mcts() -> None:
+    """
+    Measure MCTS playouts per second from the empty board, and its win rate
+    against rough_outcome_strategy on sizes 4 and 5 at several iteration
+    budgets, playing each side in half the games.
+    """
+    print('size  playouts/s')
+    for size in (3, 4, 5):
+        search = MCTS(StonehengeGame(True, size), seed=0)
+        seconds = timed(lambda: search.search(iterations=500))[0]
+        print('{:4}  {:10.0f}'.format(size, search.playouts / seconds))
+    print('size  iterations  games  wins  win rate  seconds/move')
+    for size in (4, 5):
+        for iterations in (4, 16, 64, 256):
+            report_mcts(size, iterations, 20)
+
+
+def report_mcts(size: int, iterations: int, games: int) -> None:
+    """
+    Print one row of the win rate table of the mcts benchmark.
+    """
+    wins, seconds, moves = 0, 0.0, 0
+
+    def mcts_move(game: Any) -> Any:
+        nonlocal seconds, moves
+        took, move = timed(lambda: MCTS(game, seed=moves).search(
+            iterations=iterations))
+        seconds += took
+        moves += 1
+        return move
+    for number in range(games):
+        game = StonehengeGame(number % 2 == 0, size)
+        if number % 4 < 2:
+            wins += play_game(game, mcts_move, rough_outcome_strategy) == 'p1'
+        else:
+            wins += play_game(game, rough_outcome_strategy, mcts_move) == 'p2'
+    print('{:4}  {:10}  {:5}  {:4}  {:8.0%}  {:12.3f}'.format(
+        size, iterations, games, wins, wins / games, seconds / moves))
+
+
+def mcts_pool() -> None:
+    """
+    Compare the memory per node and iterations per second of MCTS on Node
+    objects with MCTS on a NodePool big enough for the whole search and on
+    one small enough to be recycled, from the empty board of sizes 3 to 5.
+    """
+    iterations = 3000
+    print('size  tree            bytes/node  iterations/s  nodes recycled')
+    for size in (3, 4, 5):
+        game = StonehengeGame(True, size)
+        search = MCTS(game, seed=0)
+        seconds = timed(lambda: search.search(iterations=iterations))[0]
+        tracemalloc.start()
+        search = MCTS(game, seed=0)
+        search.search(iterations=iterations)
+        node_bytes = tracemalloc.get_traced_memory()[0] / search.root.size()
+        tracemalloc.stop()
+        print('{:4}  {:14}  {:10.0f}  {:12.0f}  {:14}'.format(
+            size, 'objects', node_bytes, iterations / seconds, 0))
+        for pool_size in (iterations + 1, iterations // 10):
+            search = PoolMCTS(game, pool_size, seed=0)
+            seconds = timed(lambda: search.search(iterations=iterations))[0]
+            print('{:4}  {:14}  {:10}  {:12.0f}  {:14}'.format(
+                size, 'pool of {}'.format(pool_size),
+                search.pool.bytes_per_node(), iterations / seconds,
+                search.pool.recycled))
+
+
+def rave() -> None:
+    """
+    Measure how often plain UCT and RAVE pick a winning move at several
+    playout budgets, on size 4 positions with 12 empty cells where at most
+    half the moves win (found by the endgame solver), and how many playouts
+    RAVE needs to match each UCT budget.
+    """
+    cases = winnable_positions(4, 12, 60)
+    budgets = (25, 50, 100, 200, 400, 800)
+    accuracy = {}
+    print('playouts  UCT right  RAVE right')
+    for budget in budgets:
+        for name, make in (('uct', MCTS), ('rave', RaveMCTS)):
+            accuracy[name, budget] = sum(
+                make(game, seed=seed).search(iterations=budget) in winning
+                for seed, (game, winning) in enumerate(cases)) / len(cases)
+        print('{:8}  {:9.0%}  {:10.0%}'.format(
+            budget, accuracy['uct', budget], accuracy['rave', budget]))
+    for budget in budgets:
+        matched = [rave_budget for rave_budget in budgets
+                   if accuracy['rave', rave_budget] >= accuracy['uct', budget]]
+        print('UCT with {} playouts: RAVE matches it with {}'.format(
+            budget, matched[0] if matched else 'more than {}'.format(
+                budgets[-1])))
+    print('k (beta schedule)  RAVE right with 100 playouts')
+    for k in (30, 100, 300, 1000, 3000):
+        right = sum(RaveMCTS(game, equivalence_schedule(k), seed=seed).search(
+            iterations=100) in winning
+            for seed, (game, winning) in enumerate(cases)) / len(cases)
+        print('{:17}  {:.0%}'.format(k, right))
+
+
+def winnable_positions(size: int, empty: int, count: int) -> List[Any]:
+    """
+    Return count (game, winning moves) pairs: Stonehenge games of size
+    played randomly down to empty empty cells, where the player to move
+    wins with at most half of their moves.
+    """
+    layout = board_layout(size)
+    solver = EndgameSolver(size)
+    cases, seed = [], 0
+    while len(cases) < count:
+        rng = random.Random(seed)
+        seed += 1
+        game = StonehengeGame(True, size)
+        state = game.current_state
+        while empty_cells(state) > empty and state.get_possible_moves():
+            state = state.make_move(rng.choice(state.get_possible_moves()))
+        game.current_state = state
+        position = layout.from_state(state)
+        cells = layout.moves(position)
+        winning = [layout.cells[cell] for cell in cells
+                   if solver.solve(layout.play(position, cell))[0] ==
+                   GameState.LOSE]
+        if winning and len(winning) <= len(cells) // 2:
+            cases.append((game, winning))
+    return cases
+
+
+def batch_playout() -> None:
+    """
+    Compare random playouts per second from the empty board through
+    SGState, through BoardLayout positions and through the NumPy batch
+    kernel at several batch sizes, and the win rates they measure.
+    """
+    print('size  playouts with           playouts/s  mover win rate')
+    for size in (3, 4, 5):
+        layout = board_layout(size)
+        start = layout.start(True)
+        search = MCTS(StonehengeGame(True, size), seed=0)
+        count = 300
+        seconds, results = timed(lambda: [
+            search.playout(search.root.state) for _ in range(count)])
+        print('{:4}  {:22}  {:10.0f}  {:14.3f}'.format(
+            size, 'SGState', count / seconds, sum(results) / count))
+        rng = random.Random(0)
+        count = 20000
+
+        def position_playout() -> bool:
+            """
+            Return whether player 1 wins a random game from start.
+            """
+            position, plies = start, 0
+            while layout.moves(position):
+                position = layout.play(position,
+                                       rng.choice(layout.moves(position)))
+                plies += 1
+            score = layout.score(position)
+            return (score if plies % 2 == 0 else -score) == GameState.WIN
+        seconds, results = timed(lambda: [position_playout()
+                                          for _ in range(count)])
+        print('{:4}  {:22}  {:10.0f}  {:14.3f}'.format(
+            size, 'positions', count / seconds, sum(results) / count))
+        count = 200000
+        for batch in (64, 1024, 16384):
+            seconds, rate = timed(lambda: playout_win_rate(
+                size, start, count, numpy.random.default_rng(0), batch))
+            print('{:4}  {:22}  {:10.0f}  {:14.3f}'.format(
+                size, 'NumPy, batch {}'.format(batch), count / seconds,
+                rate))
+
+
+def heuristic() -> None:
+    """
+    Measure nodes per second of the depth-limited search with the ley-line
+    evaluation, and its wins against rough_outcome_strategy on sizes 3 to
+    5 at depths 1 to 3 (endgame solver off).
+    """
+    print('size  depth  nodes/s  wins  games  seconds/move')
+    for size in (3, 4, 5):
+        for depth in (1, 2, 3):
+            nodes, seconds = 0, 0.0
+            for seed in range(5):
+                game = stonehenge_position(size, 3, seed)
+                took, searcher = timed(lambda: heuristic_search(game, depth))
+                nodes += searcher.nodes
+                seconds += took
+            strategy = make_heuristic_strategy(depth, endgame_cells=-1)
+            wins, games, move_seconds = match(size, strategy, 20)
+            print('{:4}  {:5}  {:7.0f}  {:4}  {:5}  {:12.4f}'.format(
+                size, depth, nodes / seconds, wins, games, move_seconds))
+
+
+def match(size: int, strategy: Callable[[Any], Any],
+          games: int) -> Tuple[int, int, float]:
+    """
+    Play games games of Stonehenge of size between strategy and
+    rough_outcome_strategy, each from two random opening moves, with
+    strategy moving first in half of them. Return the games strategy won,
+    games and its average seconds per move.
+    """
+    wins, seconds, moves = 0, 0.0, 0
+
+    def timed_strategy(game: Any) -> Any:
+        """
+        Return the move of strategy, timing it.
+        """
+        nonlocal seconds, moves
+        took, move = timed(lambda: strategy(game))
+        seconds += took
+        moves += 1
+        return move
+    for number in range(games):
+        game = stonehenge_position(size, 2, number // 2)
+        if number % 2 == 0:
+            wins += play_game(game, timed_strategy,
+                              rough_outcome_strategy) == 'p1'
+        else:
+            wins += play_game(game, rough_outcome_strategy,
+                              timed_strategy) == 'p2'
+    return wins, games, seconds / max(moves, 1)
+
+
+def tuning() -> None:
+    """
+    Tune the evaluation weights on self-play games of sizes 3 to 5 and
+    report the positions per second, peak memory, log loss before and after,
+    and the wins of a depth-2 search with the tuned weights against one
+    with the default weights.
+    """
+    print('size  games  positions  positions/s  peak MB  log loss  '
+          'tuned loss  weights                  wins  games')
+    directory = tempfile.mkdtemp()
+    for size, games in ((3, 2000), (3, 20000), (4, 20000), (5, 20000)):
+        path = os.path.join(directory, 'weights{}.json'.format(size))
+        tracemalloc.start()
+        seconds, result = timed(lambda: tune(size, games, path, seed=0))
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        tuned = make_heuristic_strategy(2, result.weights, -1)
+        default = make_heuristic_strategy(2, DEFAULT_WEIGHTS, -1)
+        wins = 0
+        for number in range(40):
+            game = stonehenge_position(size, 2, number // 2)
+            if number % 2 == 0:
+                wins += play_game(game, tuned, default) == 'p1'
+            else:
+                wins += play_game(game, default, tuned) == 'p2'
+        print('{:4}  {:5}  {:9}  {:11.0f}  {:7.1f}  {:8.4f}  {:10.4f}  '
+              '{:23}  {:4}  {:5}'.format(
+                  size, games, result.positions, result.positions / seconds,
+                  peak, result.start_log_loss, result.log_loss,
+                  ' '.join('{:.2f}'.format(w) for w in result.weights),
+                  wins, 40))
+
+
+def multi_pv() -> None:
+    """
+    Compare scoring every root move with one analyse call, exact and
+    bounded, against one independent search per move, on positions solved
+    to the end and on a depth-limited size 4 position.
+    """
+    cases = [('Subtract Square 40', SubtractSquareGame(True, 40), FULL_DEPTH, None),
+             ('Stonehenge 2', StonehengeGame(True, 2), FULL_DEPTH, None),
+             ('Stonehenge 3 +4', stonehenge_position(3, 4, 0), FULL_DEPTH, None),
+             ('Stonehenge 4 +6, depth 4', stonehenge_position(4, 6, 0), 4,
+              ley_line_evaluation())]
+    print('position                  moves  method       nodes    seconds')
+    for name, game, depth, evaluate in cases:
+        state = game.current_state
+        moves = state.get_possible_moves()
+
+        def separate() -> int:
+            """
+            Search every move with its own searcher and return the nodes.
+            """
+            nodes = 0
+            for move in moves:
+                searcher = Searcher(game, evaluate)
+                searcher.alphabeta(state.make_move(move), depth - 1,
+                                   -2, 2, 1)
+                nodes += searcher.nodes
+            return nodes
+        seconds, nodes = timed(separate)
+        print('{:24}  {:5}  {:11}  {:7}  {:9.3f}'.format(
+            name, len(moves), 'separate', nodes, seconds))
+        for bounded in (False, True):
+            searcher_nodes = []
+
+            def shared() -> None:
+                """
+                Analyse every move in one search and keep its nodes.
+                """
+                searcher = Searcher(game, evaluate)
+                searcher.analyse_root(state, depth, bounded)
+                searcher_nodes.append(searcher.nodes)
+            seconds = timed(shared)[0]
+            print('{:24}  {:5}  {:11}  {:7}  {:9.3f}'.format(
+                name, len(moves), 'bounded' if bounded else 'shared exact',
+                searcher_nodes[0], seconds))
+
+
+def reuse() -> None:
+    """
+    Compare the total search time and nodes of self-play games between
+    SearchStrategy objects that keep their transposition tables between
+    moves and ones that start afresh every move, in all and after the
+    first move of each player (the first search is the same either way).
+    """
+    evaluate = ley_line_evaluation()
+    cases = [('Subtract Square 200, solve',
+              lambda: SubtractSquareGame(True, 200), {}),
+             ('Subtract Square 300, solve',
+              lambda: SubtractSquareGame(True, 300), {}),
+             ('Stonehenge 3, solve', lambda: StonehengeGame(True, 3), {}),
+             ('Stonehenge 3 +2, solve',
+              lambda: stonehenge_position(3, 2, 0), {}),
+             ('Stonehenge 4, depth 4', lambda: stonehenge_position(4, 2, 0),
+              {'max_depth': 4, 'evaluate': evaluate}),
+             ('Stonehenge 5, depth 4', lambda: stonehenge_position(5, 2, 0),
+              {'max_depth': 4, 'evaluate': evaluate})]
+    print('game                        reuse  moves  nodes  seconds  '
+          'later nodes  later seconds')
+    for name, make_game, options in cases:
+        for reused in (False, True):
+            players = [SearchStrategy(reuse=reused, **options)
+                       for _ in range(2)]
+            costs = []
+
+            def player(number: int) -> Callable[[Any], Any]:
+                """
+                Return the timed strategy of player number.
+                """
+                def move(game: Any) -> Any:
+                    """
+                    Return the move of the player, keeping its cost.
+                    """
+                    seconds, chosen = timed(lambda: players[number](game))
+                    costs.append((seconds, players[number].searcher.nodes))
+                    return chosen
+                return move
+            play_game(make_game(), player(0), player(1))
+            later = costs[2:]
+            print('{:26}  {:5}  {:5}  {:5}  {:7.3f}  {:11}  {:13.3f}'.format(
+                name, 'yes' if reused else 'no', len(costs),
+                sum(nodes for _, nodes in costs),
+                sum(seconds for seconds, _ in costs),
+                sum(nodes for _, nodes in later),
+                sum(seconds for seconds, _ in later)))
+
+
+def ponder() -> None:
+    """
+    Measure how long the computer takes to answer a human who thinks for
+    one second per move and plays randomly, with and without pondering,
+    and check that pondering never changes its moves. The first move,
+    which nobody could ponder, is left out.
+    """
+    think = 1.0
+    evaluate = ley_line_evaluation()
+    cases = [('Stonehenge 3, solve', 3, {}),
+             ('Stonehenge 4, depth 4', 4,
+              {'max_depth': 4, 'evaluate': evaluate}),
+             ('Stonehenge 5, depth 4', 5,
+              {'max_depth': 4, 'evaluate': evaluate})]
+    print('game                   answers  pondered  hits  s/answer  '
+          'pondering s/answer  s/hit  same moves')
+    for name, size, options in cases:
+        pondering = PonderingStrategy(SearchStrategy(**options))
+        plain = SearchStrategy(**options)
+        rng = random.Random(size)
+        game = StonehengeGame(True, size)
+        plain_seconds, ponder_seconds, hit_seconds = 0.0, 0.0, 0.0
+        answers, pondered, same = -1, 0, 0
+        while not game.is_over(game.current_state):
+            pondered += len(pondering.answers)
+            hits = pondering.hits
+            took, move = timed(lambda: pondering(game))
+            if answers >= 0:
+                ponder_seconds += took
+                if pondering.hits > hits:
+                    hit_seconds += took
+            took, plain_move = timed(lambda: plain(game))
+            if answers >= 0:
+                plain_seconds += took
+            answers += 1
+            same += move == plain_move
+            game.current_state = game.current_state.make_move(move)
+            if game.is_over(game.current_state):
+                break
+            pondering.ponder(game)
+            time.sleep(think)
+            game.current_state = game.current_state.make_move(
+                rng.choice(game.current_state.get_possible_moves()))
+        print('{:21}  {:7}  {:8}  {:4}  {:8.3f}  {:18.3f}  {:5.3f}  '
+              '{:10}'.format(name, answers, pondered, pondering.hits,
+                             plain_seconds / answers,
+                             ponder_seconds / answers,
+                             hit_seconds / max(pondering.hits, 1),
+                             '{}/{}'.format(same, answers + 1)))
+
+
+def minimax_memory() -> None:
+    """
+    Measure the peak memory (tracemalloc) and time of the minimax
+    strategies of strategy.py from Subtract Square 25 and the empty size 2
+    Stonehenge board.
+    """
+    cases = [('Subtract Square 25', lambda: SubtractSquareGame(True, 25)),
+             ('Stonehenge 2', lambda: StonehengeGame(True, 2))]
+    print('game                strategy   move  seconds  peak MB')
+    for name, make_game in cases:
+        for label, strategy in (('iterative', iterative_minimax_strategy),
+                                ('recursive', recursive_minimax_strategy)):
+            seconds, move = timed(lambda: strategy(make_game()))
+            game = make_game()
+            tracemalloc.start()
+            strategy(game)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            print('{:18}  {:9}  {:>4}  {:7.3f}  {:7.3f}'.format(
+                name, label, move, seconds, peak))
+
+
+def stack_search() -> None:
+    """
+    Compare the searches on a frame stack with their recursive versions on
+    small games, search Subtract Square from large totals with the
+    memoized one, and measure the memory of a frame.
+    """
+    print('game                method     move  score  nodes    seconds')
+    for name, make_game in (('Subtract Square 22',
+                             lambda: SubtractSquareGame(True, 22)),
+                            ('Stonehenge 2', lambda: StonehengeGame(True, 2))):
+        seconds, move = timed(lambda: recursive_minimax_strategy(
+            make_game()))
+        print('{:18}  {:9}  {:>4}  {:>5}  {:>7}  {:7.3f}'.format(
+            name, 'recursive', move, '', '', seconds))
+        for method in STACK_METHODS:
+            search = StackSearch(make_game(), method)
+            seconds, (move, score) = timed(
+                lambda: search.search(search.game.current_state))
+            print('{:18}  {:9}  {:>4}  {:5}  {:7}  {:7.3f}'.format(
+                name, method, move, score, search.nodes, seconds))
+    print('total   recursive solve  stack depth  nodes     seconds  '
+          'peak MB')
+    for total in (1000, 10000, 30000):
+        game = SubtractSquareGame(True, total)
+        try:
+            recursive = solve(game).score
+        except RecursionError:
+            recursive = 'RecursionError'
+        search = StackSearch(game, MEMOIZED)
+        tracemalloc.start()
+        seconds, (move, score) = timed(
+            lambda: search.search(game.current_state))
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        print('{:5}  {:>16}  {:11}  {:8}  {:7.2f}  {:7.1f}'.format(
+            total, recursive, search.max_height, search.nodes, seconds,
+            peak))
+    count = 10000
+    states = [SubtractSquareGame(True, 20000 - i).current_state
+              for i in range(count)]
+    tracemalloc.start()
+    frames = FrameStack(count)
+    for state in states:
+        frames.push(state, state.get_possible_moves(), 0, 0, state.key())
+    frame_bytes = tracemalloc.get_traced_memory()[0] / count
+    tracemalloc.stop()
+    print('bytes per Subtract Square frame (moves and key included, state '
+          'not): {:.0f}'.format(frame_bytes))
+
+
+def minimax_scenario(size: int, p1_starts: bool,
+                     moves: str) -> StonehengeGame:
+    """
+    Return a Stonehenge game of size after moves, as set up in
+    minimax_unittest_basic.py.
+    """
+    game = StonehengeGame(p1_starts, size)
+    for move in moves:
+        game.current_state = game.current_state.make_move(move)
+    return game
+
+
+def forced_moves() -> None:
+    """
+    Compare nodes and time of searches with and without forced-move
+    pruning: to the end of the game on the Stonehenge scenarios of
+    minimax_unittest_basic.py, on whole small games and on random midgame
+    positions, and to a fixed depth with the ley-line evaluation on random
+    size 4 and 5 midgames. Both
+    with alphabetical move order and with LeyLineOrderer. changed counts
+    the positions whose score the pruning changed, which only happens at a
+    fixed depth.
+    """
+    cases = [('unittest 3 KACBFEGDI', FULL_DEPTH,
+              [lambda: minimax_scenario(3, False, 'KACBFEGDI')]),
+             ('unittest 2 AFD', FULL_DEPTH,
+              [lambda: minimax_scenario(2, True, 'AFD')]),
+             ('stonehenge 2', FULL_DEPTH, [lambda: StonehengeGame(True, 2)]),
+             ('stonehenge 3', FULL_DEPTH, [lambda: StonehengeGame(True, 3)]),
+             ('size 3, 4 plies x10', FULL_DEPTH,
+              [lambda seed=seed: stonehenge_position(3, 4, seed)
+               for seed in range(10)]),
+             ('size 4, 8 plies x10', 4,
+              [lambda seed=seed: stonehenge_position(4, 8, seed)
+               for seed in range(10)]),
+             ('size 4, 12 plies x10', 5,
+              [lambda seed=seed: stonehenge_position(4, 12, seed)
+               for seed in range(10)]),
+             ('size 5, 20 plies x5', 4,
+              [lambda seed=seed: stonehenge_position(5, 20, seed)
+               for seed in range(5)])]
+    evaluate = ley_line_evaluation()
+    print('{:22}  {:>5}  {:8}  {:>9}  {:>9}  {:>9}  {:>7}  {:>7}  {:>7}'
+          .format('positions', 'depth', 'order', 'nodes', 'pruned',
+                  'reduction', 'seconds', 'pruned', 'changed'))
+    for name, depth, makers in cases:
+        for order, make_orderer in (('alpha', plain_orderer),
+                                    ('ley-line', LeyLineOrderer)):
+            row = []
+            for pruner in (None, LeyLinePruner(use_dead_cells=False,
+                                               use_outcome_bound=False)):
+                nodes, seconds, scores = 0, 0.0, []
+                for make_game in makers:
+                    game = make_game()
+                    searcher = Searcher(game, evaluate, make_orderer(),
+                                        pruner=pruner)
+                    spent, (_, score) = timed(lambda: searcher.search(
+                        game.current_state, depth))
+                    nodes += searcher.nodes
+                    seconds += spent
+                    scores.append(score)
+                row.append((nodes, seconds, scores))
+            # Solved scores must agree; at a fixed depth the pruned search
+            # may see a forced loss the other scores at the horizon.
+            changed = sum(1 for before, after in zip(row[0][2], row[1][2])
+                          if before != after)
+            assert depth != FULL_DEPTH or not changed
+            print('{:22}  {:>5}  {:8}  {:9}  {:9}  {:9.1%}  {:7.3f}  '
+                  '{:7.3f}  {:7}'.format(name, 'end' if depth == FULL_DEPTH
+                                         else depth, order, row[0][0],
+                                         row[1][0], 1 - row[1][0] / row[0][0],
+                                         row[0][1], row[1][1], changed))
+
+
+def endgame_positions(size: int, empty: int, count: int,
+                      dead: int = 0) -> List[StonehengeGame]:
+    """
+    Return count Stonehenge games of size played randomly until they have
+    at most empty empty cells, or, with dead, until they first have at
+    least dead dead cells. Games that end first are skipped.
+    """
+    games, seed = [], 0
+    while len(games) < count:
+        rng = random.Random(seed)
+        seed += 1
+        game = StonehengeGame(True, size)
+        state = game.current_state
+        while state.get_possible_moves() and (
+                len(dead_cells(state)) < dead if dead else
+                empty_cells(state) > empty):
+            state = state.make_move(rng.choice(state.get_possible_moves()))
+        if state.get_possible_moves():
+            game.current_state = state
+            games.append(game)
+    return games
+
+
+def dead_cell_pruning() -> None:
+    """
+    Compare nodes of searches to the end of the game without pruning, with
+    forced moves or dead cells pruned alone, and with both, on random
+    endgames of sizes 2 to 4 and on positions with two dead cells or more.
+    """
+    pruners = [('none', None),
+               ('forced', LeyLinePruner(use_dead_cells=False,
+                                        use_outcome_bound=False)),
+               ('dead', LeyLinePruner(use_forced_moves=False,
+                                      use_outcome_bound=False)),
+               ('both', LeyLinePruner(use_outcome_bound=False))]
+    cases = [('size 2, 5 empty', endgame_positions(2, 5, 20)),
+             ('size 3, 8 empty', endgame_positions(3, 8, 20)),
+             ('size 4, 11 empty', endgame_positions(4, 11, 10)),
+             ('size 3, 2+ dead', endgame_positions(3, 0, 20, 2)),
+             ('size 4, 2+ dead', endgame_positions(4, 0, 10, 2))]
+    print('{:17}  {:>5}  {:>7}  {:>9}  {:>9}  {:>9}  {:>9}  {:>7}'.format(
+        'positions', 'empty', 'dead', *(name for name, _ in pruners),
+        'dead cut'))
+    for name, games in cases:
+        nodes = []
+        for _, pruner in pruners:
+            total, scores = 0, []
+            for game in games:
+                result = solve(game, pruner=pruner)
+                total += result.nodes
+                scores.append(result.score)
+            nodes.append(total)
+            if pruner is None:
+                expected = scores
+            assert scores == expected
+        empty = sum(empty_cells(game.current_state) for game in games)
+        dead = sum(len(dead_cells(game.current_state)) for game in games)
+        print('{:17}  {:5.1f}  {:7.2f}  {:9}  {:9}  {:9}  {:9}  {:7.1%}'
+              .format(name, empty / len(games), dead / len(games), *nodes,
+                      1 - nodes[3] / nodes[1]))
+
+
+def outcome_bound() -> None:
+    """
+    Compare nodes and time of searches without pruning, with the outcome
+    bound alone, with forced moves and dead cells, and with all three: to
+    the end of the game on whole small games and random endgames, and to a
+    fixed depth with the ley-line evaluation on random midgames.
+    """
+    pruners = [('none', None),
+               ('bound', LeyLinePruner(use_forced_moves=False,
+                                       use_dead_cells=False)),
+               ('forced+dead', LeyLinePruner(use_outcome_bound=False)),
+               ('all', LeyLinePruner())]
+    cases = [('stonehenge 2', FULL_DEPTH, [StonehengeGame(True, 2)]),
+             ('stonehenge 3', FULL_DEPTH, [StonehengeGame(True, 3)]),
+             ('size 3, 8 empty x20', FULL_DEPTH, endgame_positions(3, 8, 20)),
+             ('size 4, 11 empty x10', FULL_DEPTH,
+              endgame_positions(4, 11, 10)),
+             ('size 4, 8 plies x10', 4,
+              [stonehenge_position(4, 8, seed) for seed in range(10)]),
+             ('size 5, 12 plies x5', 4,
+              [stonehenge_position(5, 12, seed) for seed in range(5)])]
+    evaluate = ley_line_evaluation()
+    print('{:21}  {:>5}  '.format('positions', 'depth') +
+          '  '.join('{:>19}'.format(name + ' nodes/s')
+                    for name, _ in pruners))
+    for name, depth, games in cases:
+        row = []
+        for _, pruner in pruners:
+            nodes, seconds = 0, 0.0
+            for game in games:
+                searcher = Searcher(game, evaluate, pruner=pruner)
+                spent, _ = timed(lambda: searcher.search(game.current_state,
+                                                         depth))
+                nodes += searcher.nodes
+                seconds += spent
+            row.append('{:11} {:7.3f}'.format(nodes, seconds))
+        print('{:21}  {:>5}  '.format(
+            name, 'end' if depth == FULL_DEPTH else depth) + '  '.join(row))
+
+
+def one_child_at_a_time(game: Any) -> Any:
+    """
+    Return the move of rough_outcome_strategy for game worked out as it was
+    before evaluate_children: making each child and calling its
+    rough_outcome.
+    """
+    state = game.current_state
+    outcomes = [state.make_move(move).rough_outcome()
+                for move in state.get_possible_moves()]
+    moves = state.get_possible_moves()
+    return moves[outcomes.index(min(outcomes))]
+
+
+def rough_outcome() -> None:
+    """
+    Compare the per-move latency of rough_outcome_strategy with the
+    children scored one at a time and all together by evaluate_children,
+    over whole games of rough_outcome_strategy against itself from random
+    openings, and check that both pick the same moves.
+    """
+    print('game                 moves  one-by-one median s  max s    '
+          'batched median s  max s     speedup  same')
+    cases = [('Stonehenge 3', lambda seed: stonehenge_position(3, 1, seed),
+              5),
+             ('Stonehenge 4', lambda seed: stonehenge_position(4, 1, seed),
+              3),
+             ('Stonehenge 5', lambda seed: stonehenge_position(5, 1, seed),
+              2),
+             ('Subtract Square 1000',
+              lambda seed: SubtractSquareGame(seed % 2 == 0, 1000 + seed),
+              3),
+             ('Subtract Square 20000',
+              lambda seed: SubtractSquareGame(seed % 2 == 0, 20000 + seed),
+              1)]
+    for name, make_game, games in cases:
+        before, after, same = [], [], True
+        for seed in range(games):
+            game = make_game(seed)
+            while game.current_state.get_possible_moves():
+                old_seconds, old_move = timed(
+                    lambda: one_child_at_a_time(game))
+                new_seconds, move = timed(
+                    lambda: rough_outcome_strategy(game))
+                before.append(old_seconds)
+                after.append(new_seconds)
+                same = same and move == old_move
+                game.current_state = game.current_state.make_move(move)
+        before.sort()
+        after.sort()
+        print('{:20}  {:5}  {:19.4f}  {:7.4f}  {:16.5f}  {:7.5f}  {:7.0f}x  '
+              '{}'.format(name, len(before), before[len(before) // 2],
+                          before[-1], after[len(after) // 2], after[-1],
+                          sum(before) / sum(after), same))
+
+
+def parallel() -> None:
+    """
+    Time root-split minimax on 1 to 32 worker processes on Stonehenge 3 and
+    Subtract Square 50, with frontiers 1 and 2 moves deep, against solving
+    the whole tree in this process and solving the same tasks in this
+    process, check that the moves match the serial ones, and break the time
+    down into pool start-up, pickling, search and the rest. Tasks are shown
+    as solved / made: the rest were cancelled before they started. Search
+    counts the tasks that were running when the move was settled, and
+    leftover is the part of the wall time spent waiting for them.
+
+    The rows are only a speedup curve up to as many workers as there are
+    cores; past that the workers take turns on the same cores, and the
+    rows measure overhead.
+    """
+    cores = os.cpu_count() or 1
+    print('cores: {}'.format(cores))
+    if cores < 32:
+        print('only {} core(s): rows with more than {} worker(s) measure '
+              'overhead, not speedup'.format(cores, cores))
+    print('game                frontier    tasks  workers  start s  wall s  '
+          'speedup  search s  leftover s  pickle s  other s  bytes/task  '
+          'same')
+    row = '{:18}  {:8}  {:>7}  {:>7}  {:>7}  {:6.3f}  {:>7}  {:8.3f}  ' \
+          '{:>10}  {:>8}  {:>7}  {:>10}  {}'
+    cases = [('Stonehenge 3', lambda: StonehengeGame(True, 3),
+              LeyLinePruner()),
+             ('Subtract Square 50', lambda: SubtractSquareGame(True, 50),
+              None)]
+    for name, make_game, pruner in cases:
+        whole, _ = timed(lambda: solve(make_game(), pruner=pruner))
+        print(row.format(name, 0, '1/1', 'solve', '', whole, '', whole, '', '',
+                         '', '', ''))
+        for depth in (1, 2):
+            serial = parallel_minimax(make_game(), 0, depth)
+            print(row.format(name, depth, '{}/{}'.format(
+                serial.tasks, serial.tasks + serial.cancelled), 'serial', '',
+                             serial.wall_seconds,
+                             '{:.2f}x'.format(whole / serial.wall_seconds),
+                             serial.search_seconds, '', '', '', '', ''))
+            # What the pool pickles: the tasks there, the results back.
+            state = make_game().current_state
+            found = {}
+            for move in state.get_possible_moves():
+                frontier(state.make_move(move), depth - 1, found)
+            payload = [(encoding, (1, 0.0)) for encoding in found]
+            pickle_seconds, _ = timed(lambda: [
+                pickle.loads(pickle.dumps(item)) for item in payload])
+            task_bytes = sum(len(pickle.dumps(item))
+                             for item in payload) / len(payload)
+            for workers in (1, 2, 4, 8, 16, 32):
+                start_seconds, _ = timed(lambda: list(process_pool(
+                    workers).map(abs, range(workers))))
+                result = parallel_minimax(make_game(), workers, depth)
+                shutdown_pools()
+                # The wall time the work alone would take on these cores.
+                busy = (result.search_seconds + pickle_seconds) / min(
+                    workers, result.tasks, cores)
+                print(row.format(
+                    name, depth, '{}/{}'.format(
+                        result.tasks, result.tasks + result.cancelled),
+                    workers,
+                    '{:.3f}'.format(start_seconds), result.wall_seconds,
+                    '{:.2f}x'.format(whole / result.wall_seconds),
+                    result.search_seconds,
+                    '{:.3f}'.format(result.leftover_seconds),
+                    '{:.4f}'.format(pickle_seconds),
+                    '{:.3f}'.format(result.wall_seconds - busy),
+                    '{:.0f}'.format(task_bytes),
+                    result.move == serial.move))
+
+
+BENCHMARKS = {'move_ordering': move_ordering,
+              'null_window': null_window,
+              'proof_number': proof_number,
+              'tablebase': tablebase,
+              'tablebase_file': tablebase_file,
+              'ranking': ranking,
+              'endgame': endgame,
+              'opening_book': opening_book,
+              'mcts': mcts,
+              'mcts_pool': mcts_pool,
+              'rave': rave,
+              'batch_playout': batch_playout,
+              'heuristic': heuristic,
+              'tuning': tuning,
+              'multi_pv': multi_pv,
+              'reuse': reuse,
+              'ponder': ponder,
+              'minimax_memory': minimax_memory,
+              'stack_search': stack_search,
+              'forced_moves': forced_moves,
+              'dead_cell_pruning': dead_cell_pruning,
+              'outcome_bound': outcome_bound,
+              'rough_outcome': rough_outcome,
+              'parallel': parallel}
+
+
+if __name__ == '__main__':
+    names: List[str] = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print('== {} =='.format(name))
+        BENCHMARKS[name]()
@@ -0,0 +1,137 @@
+"""
+A module for solving Stonehenge endgames exactly.
+
+Once few cells are empty, the game tree below a Stonehenge state is small
+enough to search to the end, so there is no need to guess with an
+evaluation function. An EndgameSolver searches positions (see
+stonehenge_board.py) instead of SGStates and keeps the value and best cell
+of every position it solves, so the solves of later moves in the same game
+are mostly cache hits.
+
+iterative_deepening in search.py hands a Stonehenge state to the solver
+when it has at most ENDGAME_EMPTY_CELLS empty cells.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from game_state import GameState
+from stonehenge import SGState
+from stonehenge_board import Position, board_layout
+
+# Stonehenge states with at most this many empty cells are solved exactly.
+ENDGAME_EMPTY_CELLS = 12
+
+# Positions an EndgameSolver keeps before it empties its cache.
+DEFAULT_CACHE_SIZE = 2000000
+
+# Endgame solvers made by endgame_solver, by board size.
+_solvers = {}
+
+
+class EndgameSolver:
+    """
+    An exact solver for the positions of one Stonehenge board size.
+
+    size - the board size
+    cache_size - the number of positions the cache may hold
+    cache - maps positions to (value for the player to move, best cell),
+            where best cell is -1 if there are no moves
+    nodes - the number of positions solved so far, not counting cache hits
+    """
+    size: int
+    cache_size: int
+    cache: Dict[Position, Tuple[int, int]]
+    nodes: int
+
+    def __init__(self, size: int,
+                 cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """
+        Create an endgame solver for board size.
+        """
+        self.size = size
+        self.cache_size = cache_size
+        self.cache = {}
+        self.nodes = 0
+        self._layout = board_layout(size)
+
+    def solve(self, position: Position) -> Tuple[int, int]:
+        """
+        Return the value of position for the player to move and a best
+        cell.
+        """
+        entry = self.cache.get(position)
+        if entry is not None:
+            return entry
+        self.nodes += 1
+        layout = self._layout
+        moves = layout.moves(position)
+        if not moves:
+            entry = (layout.score(position), -1)
+        else:
+            mover = 1 if position[2] else 2
+            children = [(layout.play(position, cell), cell) for cell in moves]
+            children.sort(key=lambda child: -child[0][1].count(mover))
+            entry = (-2, -1)
+            for child, cell in children:
+                value = -self.solve(child)[0]
+                if value > entry[0]:
+                    entry = (value, cell)
+                    if value == GameState.WIN:
+                        break
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[position] = entry
+        return entry
+
+    def principal_variation(self, position: Position) -> List[str]:
+        """
+        Return the names of the cells both players take from position to
+        the end of the game when they play best moves.
+        """
+        pv = []
+        cell = self.solve(position)[1]
+        while cell >= 0:
+            pv.append(self._layout.cells[cell])
+            position = self._layout.play(position, cell)
+            cell = self.solve(position)[1]
+        return pv
+
+
+def empty_cells(state: SGState) -> int:
+    """
+    Return the number of empty cells of state.
+    """
+    return sum(1 for line in state.h_ley_line.values()
+               for cell in line[:-1] if cell not in ('1', '2'))
+
+
+def endgame_solver(size: int) -> EndgameSolver:
+    """
+    Return the endgame solver of board size, made once per size so its
+    cache lasts the whole game.
+    """
+    if size not in _solvers:
+        _solvers[size] = EndgameSolver(size)
+    return _solvers[size]
+
+
+def solve_endgame(state: Any, threshold: int = ENDGAME_EMPTY_CELLS) \
+        -> Optional[Tuple[str, int, List[str], int]]:
+    """
+    Return the best move from state, its value for the player to move, the
+    principal variation and the number of positions solved, if state is a
+    Stonehenge state with moves and at most threshold empty cells;
+    otherwise None.
+    """
+    if not isinstance(state, SGState) or empty_cells(state) > threshold \
+            or not state.get_possible_moves():
+        return None
+    solver = endgame_solver(state.size)
+    nodes_before = solver.nodes
+    position = board_layout(state.size).from_state(state)
+    value = solver.solve(position)[0]
+    pv = solver.principal_variation(position)
+    return pv[0], value, pv, solver.nodes - nodes_before
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
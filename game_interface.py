@@ -11,6 +11,18 @@ your own curiousity!)
 # TODO: import the modules needed to make game_interface run.
 from strategy import rough_outcome_strategy, interactive_strategy, \
     iterative_minimax_strategy, recursive_minimax_strategy
+from search import iterative_deepening_strategy, alphabeta_strategy, \
+    pvs_strategy, mtdf_strategy, SearchStrategy, DEFAULT_TIME_BUDGET
+from proof_number import proof_number_strategy
+from tablebase import tablebase_strategy
+from opening_book import with_book
+from mcts import mcts_strategy
+from mcts_pool import pool_mcts_strategy
+from rave import rave_strategy
+from heuristic import heuristic_strategy
+from ponder import pondering
+from stack_search import stack_memoized_strategy
+from parallel import parallel_minimax_strategy
 from typing import Any, Callable
 from subtract_square_game import SubtractSquareGame
 from stonehenge import StonehengeGame
@@ -26,7 +38,22 @@ playable_games = {'s': SubtractSquareGame,
 usable_strategies = {'i': interactive_strategy,
                      'ro': rough_outcome_strategy,
                      'mr': recursive_minimax_strategy,
-                     'mi': iterative_minimax_strategy}
+                     'mi': iterative_minimax_strategy,
+                     'id': iterative_deepening_strategy,
+                     'ab': alphabeta_strategy,
+                     'pvs': pvs_strategy,
+                     'mtd': mtdf_strategy,
+                     'pn': proof_number_strategy,
+                     'tb': tablebase_strategy,
+                     'bk': with_book(iterative_deepening_strategy),
+                     'mc': mcts_strategy,
+                     'mp': pool_mcts_strategy,
+                     'rv': rave_strategy,
+                     'hs': heuristic_strategy,
+                     'abr': SearchStrategy(),
+                     'idr': SearchStrategy(time_budget=DEFAULT_TIME_BUDGET),
+                     'ms': stack_memoized_strategy,
+                     'pm': parallel_minimax_strategy}
 
 
 class GameInterface:
@@ -36,11 +63,13 @@ class GameInterface:
     """
 
     def __init__(self, game: Any, p1_strategy: Callable,
-                 p2_strategy: Callable[[Any], Any]) -> None:
+                 p2_strategy: Callable[[Any], Any],
+                 ponder: bool = False) -> None:
         """
         Initialize this GameInterface, setting its active game to game, and
         using the strategies p1_strategy for Player 1 and p2_strategy for
-        Player 2.
+        Player 2. With ponder, a computer player that can (see ponder.py)
+        keeps thinking while the other player types in a move.
 
         :param game: The game to be played.
         :type game:
@@ -48,6 +77,8 @@ class GameInterface:
         :type p1_strategy:
         :param p2_strategy: The strategy for Play 2.
         :type p2_strategy:
+        :param ponder: Whether computer players think on the other's turn.
+        :type ponder: bool
         """
         first_player = input("Type y if player 1 is to make the first move: ")
         is_p1_turn = False
@@ -57,6 +88,9 @@ class GameInterface:
         self.game = game(is_p1_turn)
         self.p1_strategy = p1_strategy
         self.p2_strategy = p2_strategy
+        if ponder:
+            self.p1_strategy = pondering(p1_strategy)
+            self.p2_strategy = pondering(p2_strategy)
 
     def play(self) -> None:
         """
@@ -78,11 +112,21 @@ class GameInterface:
                 print(move)
 
             # Pick a (legal) move.
+            current_strategy, other_strategy = self.p2_strategy, \
+                self.p1_strategy
+            if current_state.get_current_player_name() == 'p1':
+                current_strategy, other_strategy = self.p1_strategy, \
+                    self.p2_strategy
+            # Let the other player think while a human picks a move.
+            pondering_strategy = other_strategy if \
+                current_strategy is interactive_strategy and \
+                hasattr(other_strategy, 'ponder') else None
+            if pondering_strategy is not None:
+                pondering_strategy.ponder(self.game)
             while not current_state.is_valid_move(move_to_make):
-                current_strategy = self.p2_strategy
-                if current_state.get_current_player_name() == 'p1':
-                    current_strategy = self.p1_strategy
                 move_to_make = current_strategy(self.game)
+            if pondering_strategy is not None:
+                pondering_strategy.stop()
 
             # Apply the move
             current_player_name = current_state.get_current_player_name()
@@ -128,5 +172,10 @@ if __name__ == '__main__':
     while p2 not in usable_strategies.keys():
         p2 = input("Select the strategy for Player 2 ({}): ".format(strategies))
 
+    ponder_answer = ''
+    if 'i' in (p1, p2):
+        ponder_answer = input("Type y to let the computer think during "
+                              "your turn: ")
+
     GameInterface(playable_games[chosen_game], usable_strategies[p1],
-                  usable_strategies[p2]).play()
+                  usable_strategies[p2], ponder_answer.lower() == 'y').play()
@@ -3,7 +3,7 @@ The GameState superclass.
 
 NOTE: You do not have to run python-ta on this file.
 """
-from typing import Any, Dict, List
+from typing import Any, Dict, Hashable, List
 
 
 class GameState:
@@ -72,6 +72,14 @@ class GameState:
         """
         raise NotImplementedError
 
+    def key(self) -> Hashable:
+        """
+        Return a hashable value that identifies this state, for use as a
+        key in search caches. Two states with the same key must have the
+        same moves and outcomes.
+        """
+        return repr(self)
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
@@ -79,6 +87,15 @@ class GameState:
         """
         raise NotImplementedError
 
+    def evaluate_children(self) -> List[float]:
+        """
+        Return the rough_outcome of the state each move of this state leads
+        to, in the order of get_possible_moves. Subclasses score the
+        children together, sharing the work between them.
+        """
+        return [self.make_move(move).rough_outcome()
+                for move in self.get_possible_moves()]
+
 
 if __name__ == "__main__":
     from python_ta import check_all
@@ -0,0 +1,155 @@
+"""
+A module for a ley-line evaluation function for Stonehenge, and a
+depth-limited search that uses it.
+
+The evaluation scores a state for the player about to move from three
+features, each worked out in one pass over the ley lines:
+
+    claimed   the lines the player owns minus the lines the opponent owns,
+              over the lines needed to win
+    pressure  over the unclaimed lines: the player's stones minus the
+              opponent's, as a share of the line, averaged over all lines
+    needed    over the unclaimed lines: 1 / (stones the player still needs
+              to claim it) minus the same for the opponent, averaged over
+              all lines; lines one stone from being claimed count most
+
+The score is EVAL_SCALE * tanh(weights . features), which stays inside the
+scores of games that are over, so a proven win always beats a good guess.
+
+Weights can be fitted to self-play games with tune.py and kept in a weights
+file, a JSON object with the names of the features and their weights:
+
+    {"features": ["claimed", "pressure", "needed"],
+     "weights": [1.0, 1.0, 0.5], ...}
+"""
+import json
+import math
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from game_state import GameState
+from stonehenge import SGState
+from search import Searcher
+from endgame import solve_endgame, ENDGAME_EMPTY_CELLS
+
+# The names of the features, in the order of the weights.
+FEATURES = ('claimed', 'pressure', 'needed')
+
+# The weights of the features.
+DEFAULT_WEIGHTS = (1.0, 1.0, 0.5)
+
+# Moves heuristic_strategy searches ahead.
+DEFAULT_DEPTH = 2
+
+# The largest score the evaluation gives.
+EVAL_SCALE = 0.9
+
+
+def ley_line_features(state: SGState) -> List[float]:
+    """
+    Return the features of state for the player about to move.
+
+    >>> from stonehenge import StonehengeGame
+    >>> state = StonehengeGame(True, 2).current_state.make_move('A')
+    >>> [round(feature, 3) for feature in ley_line_features(state)]
+    [-0.444, -0.037, -0.056]
+    """
+    mover = '1' if state.p1_turn else '2'
+    other = '2' if state.p1_turn else '1'
+    lines = state.ley_lines()
+    claimed = pressure = needed = 0.0
+    for line in lines:
+        marker = line[-1]
+        if marker == mover:
+            claimed += 1
+        elif marker == other:
+            claimed -= 1
+        else:
+            cells = line[:-1]
+            mine, theirs = cells.count(mover), cells.count(other)
+            half = (len(cells) + 1) // 2
+            pressure += (mine - theirs) / len(cells)
+            needed += 1 / (half - mine) - 1 / (half - theirs)
+    return [claimed / (1.5 * (state.size + 1)), pressure / len(lines),
+            needed / len(lines)]
+
+
+def load_weights(path: str) -> Tuple[float, ...]:
+    """
+    Return the weights in the weights file at path.
+    """
+    with open(path) as file:
+        data = json.load(file)
+    if tuple(data['features']) != FEATURES:
+        raise ValueError('{} has weights for the features {}, not {}'.format(
+            path, data['features'], list(FEATURES)))
+    return tuple(float(weight) for weight in data['weights'])
+
+
+def write_weights(path: str, weights: Sequence[float],
+                  **details: Any) -> None:
+    """
+    Write weights to a weights file at path, with details (such as how
+    they were fitted) as extra entries.
+    """
+    data: Dict[str, Any] = {'features': list(FEATURES),
+                            'weights': [float(weight) for weight in weights]}
+    data.update(details)
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+
+
+def ley_line_evaluation(weights: Sequence[float] = DEFAULT_WEIGHTS) \
+        -> Callable[[GameState], float]:
+    """
+    Return an evaluation function that scores Stonehenge states with the
+    ley-line features and weights, and other states as draws.
+    """
+    def evaluate(state: GameState) -> float:
+        """
+        Return the score of state for the player about to move.
+        """
+        if not isinstance(state, SGState):
+            return GameState.DRAW
+        total = sum(weight * feature for weight, feature
+                    in zip(weights, ley_line_features(state)))
+        return EVAL_SCALE * math.tanh(total)
+    return evaluate
+
+
+def heuristic_search(game: Any, depth: int = DEFAULT_DEPTH,
+                     weights: Sequence[float] = DEFAULT_WEIGHTS) -> Searcher:
+    """
+    Return a searcher for game that scores the states depth moves ahead
+    with the ley-line evaluation, after searching game.current_state.
+    """
+    searcher = Searcher(game, ley_line_evaluation(weights))
+    searcher.search(game.current_state, depth)
+    return searcher
+
+
+def make_heuristic_strategy(depth: int = DEFAULT_DEPTH,
+                            weights: Sequence[float] = DEFAULT_WEIGHTS,
+                            endgame_cells: int = ENDGAME_EMPTY_CELLS) \
+        -> Callable[[Any], Any]:
+    """
+    Return a strategy that searches depth moves ahead and scores the
+    states there with the ley-line evaluation with weights. Stonehenge
+    states with at most endgame_cells empty cells are solved exactly.
+    """
+    def strategy(game: Any) -> Any:
+        """
+        Return the move of a depth-limited search of game.
+        """
+        solved = solve_endgame(game.current_state, endgame_cells)
+        if solved is not None:
+            return solved[0]
+        return heuristic_search(game, depth, weights).root_move
+    strategy.__name__ = 'heuristic_strategy'
+    return strategy
+
+
+heuristic_strategy = make_heuristic_strategy()
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,260 @@
+"""
+A module for Monte Carlo tree search (MCTS) with UCT.
+
+Instead of scoring states with an evaluation function, MCTS plays random
+games (playouts) from them and grows a tree towards the moves that win most
+playouts. Each iteration
+
+    1. selects a path from the root, taking at each node the child with the
+       best upper confidence bound (UCT): its win rate plus
+       exploration * sqrt(ln(node visits) / child visits)
+    2. expands the last node by one untried move
+    3. plays a random game from the new node
+    4. adds the result to every node on the path
+
+The move played is the root child with the most visits. The more iterations
+the search gets, the better the move, so its strength follows the time
+budget. mcts_strategy keeps its tree between moves: on its next turn it
+starts from the node of the state actually reached.
+"""
+import math
+import random
+import time
+from typing import Any, List, Optional
+from game_state import GameState
+from search import terminal_score, DEFAULT_TIME_BUDGET
+
+# The exploration constant of UCT.
+DEFAULT_EXPLORATION = math.sqrt(2)
+
+# Iterations between two looks at the clock.
+CLOCK_INTERVAL = 16
+
+# Trees kept by mcts_strategy, by id of the game they are for.
+_trees = {}
+
+
+class Node:
+    """
+    A state in a Monte Carlo search tree.
+
+    state - the state
+    move - the move that led here from the parent, None at the root
+    parent - the parent node, None at the root
+    children - the nodes of the moves tried so far
+    untried - the moves not tried yet
+    visits - the number of playouts through this node
+    wins - the total result of those playouts for the player who made move
+           (1 for a win, 0.5 for a draw, 0 for a loss)
+    """
+    state: GameState
+    move: Any
+    parent: Optional['Node']
+    children: List['Node']
+    untried: List[Any]
+    visits: int
+    wins: float
+
+    def __init__(self, state: GameState, move: Any = None,
+                 parent: Optional['Node'] = None) -> None:
+        """
+        Create a node for state, reached by move from parent.
+        """
+        self.state = state
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = state.get_possible_moves()
+        self.visits = 0
+        self.wins = 0.0
+
+    def size(self) -> int:
+        """
+        Return the number of nodes in the tree under this node, itself
+        included.
+        """
+        count, stack = 0, [self]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children)
+        return count
+
+
+class MCTS:
+    """
+    A Monte Carlo tree search of a game.
+
+    game - the game being searched
+    root - the node of the state to move from
+    exploration - the exploration constant of UCT
+    rng - the random number generator of the playouts
+    playouts - the number of playouts played so far
+    """
+    game: Any
+    root: Node
+    exploration: float
+    rng: random.Random
+    playouts: int
+
+    def __init__(self, game: Any,
+                 exploration: float = DEFAULT_EXPLORATION,
+                 seed: Optional[int] = None) -> None:
+        """
+        Create a search from game.current_state.
+        """
+        self.game = game
+        self.root = self.new_node(game.current_state)
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.playouts = 0
+
+    def search(self, time_budget: Optional[float] = None,
+               iterations: Optional[int] = None) -> Any:
+        """
+        Run iterations iterations, or as many as fit in time_budget seconds,
+        and return the most visited move from the root.
+
+        Precondition: time_budget or iterations is not None.
+        """
+        deadline = None if time_budget is None else \
+            time.perf_counter() + time_budget
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and done > 0 and \
+                    done % CLOCK_INTERVAL == 0 and \
+                    time.perf_counter() >= deadline:
+                break
+            self.iterate()
+            done += 1
+        return self.best_move()
+
+    def iterate(self) -> None:
+        """
+        Run one iteration: select, expand, play out and back up.
+        """
+        node = self.descend()
+        self.back_up(node, self.playout(node.state))
+
+    def descend(self) -> Node:
+        """
+        Return the node to play out from: select children from the root
+        down to a node with untried moves, and expand one of them, or down
+        to a state that is over.
+        """
+        node = self.root
+        while not node.untried and node.children:
+            node = self.select_child(node)
+        if node.untried:
+            move = node.untried.pop(self.rng.randrange(len(node.untried)))
+            child = self.new_node(node.state.make_move(move), move, node)
+            node.children.append(child)
+            node = child
+        return node
+
+    def new_node(self, state: GameState, move: Any = None,
+                 parent: Optional[Node] = None) -> Node:
+        """
+        Return a new node for state, reached by move from parent.
+        """
+        return Node(state, move, parent)
+
+    def back_up(self, node: Node, result: float) -> None:
+        """
+        Add result, the result of a playout from node for the player to
+        move there, to node and every node above it.
+        """
+        while node is not None:
+            node.visits += 1
+            # result is for the player to move at node, so the player who
+            # moved into node gets the other side of it.
+            node.wins += 1 - result
+            result = 1 - result
+            node = node.parent
+
+    def select_child(self, node: Node) -> Node:
+        """
+        Return the child of node with the best upper confidence bound.
+        """
+        log_visits = math.log(node.visits)
+        return max(node.children, key=lambda child: child.wins / child.visits
+                   + self.exploration * math.sqrt(log_visits / child.visits))
+
+    def playout(self, state: GameState) -> float:
+        """
+        Return the result of a random game from state for the player to move
+        in state: 1 for a win, 0.5 for a draw, 0 for a loss.
+        """
+        self.playouts += 1
+        plies = 0
+        moves = state.get_possible_moves()
+        while moves:
+            state = state.make_move(self.rng.choice(moves))
+            moves = state.get_possible_moves()
+            plies += 1
+        score = terminal_score(self.game, state)
+        if plies % 2:
+            score = -score
+        return (score + 1) / 2
+
+    def best_move(self) -> Any:
+        """
+        Return the most visited move from the root, or a random move if no
+        move was tried yet.
+        """
+        if not self.root.children:
+            return self.rng.choice(self.root.state.get_possible_moves())
+        return max(self.root.children, key=lambda child: child.visits).move
+
+    def reroot(self, state: GameState, max_plies: int = 2) -> bool:
+        """
+        Make the node of state, if it is at most max_plies below the root,
+        the new root and drop the rest of the tree. Otherwise start a new
+        tree from state. Return whether the node was found.
+        """
+        key = state.key()
+        layer = [self.root]
+        for _ in range(max_plies + 1):
+            for node in layer:
+                if node.state.key() == key:
+                    node.parent = None
+                    node.move = None
+                    self.root = node
+                    return True
+            layer = [child for node in layer for child in node.children]
+        self.root = self.new_node(state)
+        return False
+
+
+def mcts(game: Any, time_budget: Optional[float] = None,
+         iterations: Optional[int] = None,
+         exploration: float = DEFAULT_EXPLORATION,
+         seed: Optional[int] = None) -> Any:
+    """
+    Return the move of a fresh Monte Carlo tree search of game.current_state
+    with iterations iterations or time_budget seconds.
+    """
+    return MCTS(game, exploration, seed).search(time_budget, iterations)
+
+
+def mcts_strategy(game: Any) -> Any:
+    """
+    Return a move for game found by Monte Carlo tree search within
+    DEFAULT_TIME_BUDGET seconds, reusing the tree of the last call for game
+    if the current state is in it.
+    """
+    tree = _trees.get(id(game))
+    if tree is None or tree.game is not game:
+        tree = MCTS(game)
+        _trees.clear()
+        _trees[id(game)] = tree
+    else:
+        tree.reroot(game.current_state)
+    move = tree.search(DEFAULT_TIME_BUDGET)
+    tree.reroot(tree.root.state.make_move(move), 1)
+    return move
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
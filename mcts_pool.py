@@ -0,0 +1,375 @@
+"""
+A module for Monte Carlo tree search of Stonehenge on a fixed pool of nodes.
+
+The tree of mcts.py is made of Node objects that each hold an SGState, so
+it costs kilobytes per node and grows for as long as the search runs. Here
+the tree is a NodePool: parallel NumPy arrays with one entry per node,
+allocated once. Nodes hold no state; the position of a node (see
+stonehenge_board.py) is found by playing the moves on the way down from the
+root, and the playouts are played on positions too.
+
+When the pool is full, the least visited nodes are recycled. A child never
+has more visits than its parent, so the nodes with at most some number of
+visits are whole subtrees, and freeing them keeps the rest of the tree
+intact. Their moves count as untried again at their parents.
+"""
+import math
+import random
+import time
+from typing import Any, List, Optional
+import numpy
+from stonehenge import SGState
+from stonehenge_board import Position, board_layout
+from search import DEFAULT_TIME_BUDGET
+from mcts import DEFAULT_EXPLORATION, CLOCK_INTERVAL, mcts_strategy
+
+# Nodes in the pool of pool_mcts_strategy.
+DEFAULT_POOL_SIZE = 500000
+
+# The index of no node.
+NO_NODE = -1
+
+# Searches kept by pool_mcts_strategy, by id of the game they are for.
+_searches = {}
+
+
+class NodePool:
+    """
+    A preallocated tree of Monte Carlo search nodes. Node i is entry i of
+    every array; the children of a node form a list through first_child
+    and next_sibling.
+
+    capacity - the number of nodes the pool holds
+    visits - the number of playouts through each node
+    wins - the total result of those playouts for the player who made the
+           move into the node
+    first_child - the first child of each node, or NO_NODE
+    next_sibling - the next child of the same parent, or NO_NODE
+    parent - the parent of each node, or NO_NODE for the root
+    move - the cell played to reach each node
+    recycled - the number of nodes freed for reuse so far
+    """
+    capacity: int
+    visits: numpy.ndarray
+    wins: numpy.ndarray
+    first_child: numpy.ndarray
+    next_sibling: numpy.ndarray
+    parent: numpy.ndarray
+    move: numpy.ndarray
+    recycled: int
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Create an empty pool of capacity nodes.
+        """
+        self.capacity = capacity
+        self.visits = numpy.zeros(capacity, dtype=numpy.int32)
+        self.wins = numpy.zeros(capacity, dtype=numpy.float32)
+        self.first_child = numpy.full(capacity, NO_NODE, dtype=numpy.int32)
+        self.next_sibling = numpy.full(capacity, NO_NODE, dtype=numpy.int32)
+        self.parent = numpy.full(capacity, NO_NODE, dtype=numpy.int32)
+        self.move = numpy.zeros(capacity, dtype=numpy.int8)
+        self.recycled = 0
+        self._in_use = numpy.zeros(capacity, dtype=bool)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def bytes_per_node(self) -> int:
+        """
+        Return the number of bytes the arrays take per node.
+
+        >>> NodePool(10).bytes_per_node()
+        22
+        """
+        arrays = [self.visits, self.wins, self.first_child, self.next_sibling,
+                  self.parent, self.move, self._in_use]
+        return sum(array.itemsize for array in arrays)
+
+    def used(self) -> int:
+        """
+        Return the number of nodes in use.
+        """
+        return self.capacity - len(self._free)
+
+    def full(self) -> bool:
+        """
+        Return whether every node is in use.
+        """
+        return not self._free
+
+    def allocate(self, parent: int, move: int) -> int:
+        """
+        Return a new node for move, added as the first child of parent
+        (which may be NO_NODE for a root).
+
+        Precondition: the pool is not full.
+        """
+        node = self._free.pop()
+        self._in_use[node] = True
+        self.visits[node] = 0
+        self.wins[node] = 0.0
+        self.first_child[node] = NO_NODE
+        self.parent[node] = parent
+        self.move[node] = move
+        if parent == NO_NODE:
+            self.next_sibling[node] = NO_NODE
+        else:
+            self.next_sibling[node] = self.first_child[parent]
+            self.first_child[parent] = node
+        return node
+
+    def children(self, node: int) -> List[int]:
+        """
+        Return the children of node.
+        """
+        children = []
+        child = int(self.first_child[node])
+        while child != NO_NODE:
+            children.append(child)
+            child = int(self.next_sibling[child])
+        return children
+
+    def recycle(self, root: int) -> None:
+        """
+        Free at least half of the nodes in use: every node but root with at
+        most the median number of visits.
+        """
+        used = numpy.flatnonzero(self._in_use)
+        visits = self.visits[used]
+        middle = len(visits) // 2
+        threshold = numpy.partition(visits, middle)[middle]
+        keep = self._in_use & (self.visits > threshold)
+        keep[root] = True
+        self._keep(keep)
+
+    def keep_subtree(self, root: int) -> None:
+        """
+        Free every node that is not under root, and make root a root.
+        """
+        keep = numpy.zeros(self.capacity, dtype=bool)
+        keep[root] = True
+        self.parent[root] = NO_NODE
+        while True:
+            under = self._in_use & ~keep & (self.parent != NO_NODE)
+            under[under] = keep[self.parent[under]]
+            if not under.any():
+                break
+            keep |= under
+        self._keep(keep)
+
+    def clear(self) -> None:
+        """
+        Free every node.
+        """
+        self._keep(numpy.zeros(self.capacity, dtype=bool))
+
+    def _keep(self, keep: numpy.ndarray) -> None:
+        """
+        Free every node in use that keep is False for, and relink the
+        children lists of the rest.
+
+        Precondition: the parent of every kept node except roots is kept.
+        """
+        freed = self._in_use & ~keep
+        self.recycled += int(freed.sum())
+        self._in_use = keep
+        self._free = numpy.flatnonzero(~keep)[::-1].tolist()
+        self.first_child[:] = NO_NODE
+        self.next_sibling[:] = NO_NODE
+        nodes = numpy.flatnonzero(keep & (self.parent != NO_NODE))
+        nodes = nodes[numpy.argsort(self.parent[nodes], kind='stable')]
+        parents = self.parent[nodes]
+        same = parents[1:] == parents[:-1]
+        self.next_sibling[nodes[:-1][same]] = nodes[1:][same]
+        starts = numpy.ones(len(nodes), dtype=bool)
+        starts[1:] = ~same
+        self.first_child[parents[starts]] = nodes[starts]
+
+
+class PoolMCTS:
+    """
+    A Monte Carlo tree search of a Stonehenge game on a NodePool. It plays
+    the same way as mcts.MCTS.
+
+    game - the game being searched
+    pool - the nodes of the tree
+    root - the node of the position to move from
+    root_position - that position
+    exploration - the exploration constant of UCT
+    rng - the random number generator of the playouts
+    playouts - the number of playouts played so far
+    """
+    game: Any
+    pool: NodePool
+    root: int
+    root_position: Position
+    exploration: float
+    rng: random.Random
+    playouts: int
+
+    def __init__(self, game: Any, pool_size: int = DEFAULT_POOL_SIZE,
+                 exploration: float = DEFAULT_EXPLORATION,
+                 seed: Optional[int] = None) -> None:
+        """
+        Create a search from game.current_state, a Stonehenge state, with a
+        pool of pool_size nodes.
+
+        Raise ValueError if pool_size is less than 2: the root always keeps
+        its node, so the pool needs room for at least one more.
+        """
+        if pool_size < 2:
+            raise ValueError('pool_size must be at least 2, not {}'.format(
+                pool_size))
+        self.game = game
+        self._layout = board_layout(game.current_state.size)
+        self.pool = NodePool(pool_size)
+        self.root = self.pool.allocate(NO_NODE, 0)
+        self.root_position = self._layout.from_state(game.current_state)
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.playouts = 0
+
+    def search(self, time_budget: Optional[float] = None,
+               iterations: Optional[int] = None) -> str:
+        """
+        Run iterations iterations, or as many as fit in time_budget seconds,
+        and return the most visited move from the root.
+
+        Precondition: time_budget or iterations is not None.
+        """
+        deadline = None if time_budget is None else \
+            time.perf_counter() + time_budget
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and done > 0 and \
+                    done % CLOCK_INTERVAL == 0 and \
+                    time.perf_counter() >= deadline:
+                break
+            self.iterate()
+            done += 1
+        return self.best_move()
+
+    def iterate(self) -> None:
+        """
+        Run one iteration: select, expand, play out and back up.
+        """
+        pool, layout = self.pool, self._layout
+        if pool.full():
+            pool.recycle(self.root)
+        node, position = self.root, self.root_position
+        while True:
+            moves = layout.moves(position)
+            children = pool.children(node)
+            if len(children) < len(moves):
+                tried = {int(pool.move[child]) for child in children}
+                cell = self.rng.choice([cell for cell in moves
+                                        if cell not in tried])
+                node = pool.allocate(node, cell)
+                position = layout.play(position, cell)
+                break
+            if not moves:
+                break
+            node = self.select_child(node, children)
+            position = layout.play(position, int(pool.move[node]))
+        result = self.playout(position)
+        while node != NO_NODE:
+            pool.visits[node] += 1
+            pool.wins[node] += 1 - result
+            result = 1 - result
+            node = int(pool.parent[node])
+
+    def select_child(self, node: int, children: List[int]) -> int:
+        """
+        Return the child of node, one of children, with the best upper
+        confidence bound.
+        """
+        pool = self.pool
+        log_visits = math.log(pool.visits[node])
+        best, best_bound = NO_NODE, -1.0
+        for child in children:
+            visits = int(pool.visits[child])
+            bound = float(pool.wins[child]) / visits + \
+                self.exploration * math.sqrt(log_visits / visits)
+            if bound > best_bound:
+                best, best_bound = child, bound
+        return best
+
+    def playout(self, position: Position) -> float:
+        """
+        Return the result of a random game from position for the player to
+        move in it: 1 for a win, 0 for a loss.
+        """
+        self.playouts += 1
+        layout = self._layout
+        plies = 0
+        moves = layout.moves(position)
+        while moves:
+            position = layout.play(position, self.rng.choice(moves))
+            moves = layout.moves(position)
+            plies += 1
+        score = layout.score(position)
+        if plies % 2:
+            score = -score
+        return (score + 1) / 2
+
+    def best_move(self) -> str:
+        """
+        Return the most visited move from the root, or a random move if no
+        move was tried yet.
+        """
+        children = self.pool.children(self.root)
+        if not children:
+            cell = self.rng.choice(self._layout.moves(self.root_position))
+        else:
+            best = max(children, key=lambda child: self.pool.visits[child])
+            cell = int(self.pool.move[best])
+        return self._layout.cells[cell]
+
+    def reroot(self, state: SGState, max_plies: int = 2) -> bool:
+        """
+        Make the node of state, if it is at most max_plies below the root,
+        the new root and free the rest of the pool. Otherwise start a new
+        tree from state. Return whether the node was found.
+        """
+        layout = self._layout
+        position = layout.from_state(state)
+        layer = [(self.root, self.root_position)]
+        for _ in range(max_plies + 1):
+            for node, node_position in layer:
+                if node_position == position:
+                    self.pool.keep_subtree(node)
+                    self.root, self.root_position = node, position
+                    return True
+            layer = [(child, layout.play(node_position,
+                                         int(self.pool.move[child])))
+                     for node, node_position in layer
+                     for child in self.pool.children(node)]
+        self.pool.clear()
+        self.root = self.pool.allocate(NO_NODE, 0)
+        self.root_position = position
+        return False
+
+
+def pool_mcts_strategy(game: Any) -> Any:
+    """
+    Return a move for game found by Monte Carlo tree search on a pool of
+    DEFAULT_POOL_SIZE nodes within DEFAULT_TIME_BUDGET seconds, reusing the
+    tree of the last call for game if the current state is in it. Games
+    other than Stonehenge are left to mcts_strategy.
+    """
+    if not isinstance(game.current_state, SGState):
+        return mcts_strategy(game)
+    search = _searches.get(id(game))
+    if search is None or search.game is not game:
+        search = PoolMCTS(game)
+        _searches.clear()
+        _searches[id(game)] = search
+    else:
+        search.reroot(game.current_state)
+    move = search.search(DEFAULT_TIME_BUDGET)
+    search.reroot(game.current_state.make_move(move), 1)
+    return move
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,183 @@
+"""
+A module for the order in which a search tries moves.
+
+Alpha-beta pruning cuts the most when the best move is tried first, but
+SGState.get_possible_moves returns cells in alphabetical order. A
+MoveOrderer sorts the moves of a state before a search tries them:
+
+    1. the hash move, the best move an earlier search stored for the state
+    2. moves that claim a ley line, then moves that block the opponent
+       from claiming one (LeyLineOrderer only)
+    3. killer moves, moves that caused a cutoff at the same ply elsewhere
+    4. every other move, by its history score: how often and how deep it
+       caused cutoffs so far
+
+Ties are broken by how central a cell is (LeyLineOrderer only), and then by
+the order of get_possible_moves.
+"""
+from typing import Any, Dict, List
+from game_state import GameState
+from stonehenge import SGState, StonehengeGame
+
+# Ranks of the groups moves are sorted into.
+HASH_MOVE = 0
+CLAIMING_MOVE = 1
+BLOCKING_MOVE = 2
+KILLER_MOVE = 3
+QUIET_MOVE = 4
+
+# Number of killer moves remembered per ply.
+KILLER_SLOTS = 2
+
+
+class MoveOrderer:
+    """
+    Orders moves by hash move, killer moves and history score.
+
+    use_hash_move - whether to try the hash move first
+    use_killers - whether to try killer moves before quiet moves
+    use_history - whether to sort quiet moves by history score
+    killers - the killer moves of each ply, most recent first
+    history - the history score of each move
+    """
+    use_hash_move: bool
+    use_killers: bool
+    use_history: bool
+    killers: Dict[int, List[Any]]
+    history: Dict[Any, int]
+
+    def __init__(self, use_hash_move: bool = True, use_killers: bool = True,
+                 use_history: bool = True) -> None:
+        """
+        Create a move orderer using the given heuristics.
+        """
+        self.use_hash_move = use_hash_move
+        self.use_killers = use_killers
+        self.use_history = use_history
+        self.killers = {}
+        self.history = {}
+
+    def order(self, state: GameState, moves: List[Any], hash_move: Any,
+              ply: int) -> List[Any]:
+        """
+        Return moves of state, ply moves below the root, in the order to try
+        them. hash_move is None if there is none.
+        """
+        ranks = self.tactical_ranks(state)
+        if self.use_killers:
+            for killer in self.killers.get(ply, []):
+                ranks.setdefault(killer, KILLER_MOVE)
+        if self.use_hash_move and hash_move is not None:
+            ranks[hash_move] = HASH_MOVE
+        history = self.history if self.use_history else {}
+        position = {move: i for i, move in enumerate(moves)}
+        return sorted(moves, key=lambda m: (ranks.get(m, QUIET_MOVE),
+                                            -history.get(m, 0),
+                                            -self.tiebreak(state, m),
+                                            position[m]))
+
+    def tactical_ranks(self, state: GameState) -> Dict[Any, int]:
+        """
+        Return the rank of each move of state that should be tried before
+        killer moves.
+        """
+        return {}
+
+    def tiebreak(self, state: GameState, move: Any) -> float:
+        """
+        Return how early move should be tried among moves of equal rank and
+        history score; higher is earlier.
+        """
+        return 0
+
+    def cutoff(self, move: Any, ply: int, depth: int) -> None:
+        """
+        Record that move caused a cutoff ply moves below the root, in a
+        search with depth moves left.
+        """
+        if self.use_killers:
+            killers = self.killers.setdefault(ply, [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[KILLER_SLOTS:]
+        if self.use_history:
+            self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+class LeyLineOrderer(MoveOrderer):
+    """
+    A MoveOrderer for Stonehenge that also tries moves that claim or block
+    a ley line early, and breaks ties by cell centrality.
+
+    centrality - the centrality of each cell, for the board size last used
+    """
+    centrality: Dict[str, float]
+
+    def __init__(self, use_hash_move: bool = True, use_killers: bool = True,
+                 use_history: bool = True) -> None:
+        """
+        Create a move orderer for Stonehenge using the given heuristics.
+        """
+        MoveOrderer.__init__(self, use_hash_move, use_killers, use_history)
+        self.centrality = {}
+        self._size = None
+
+    def tactical_ranks(self, state: SGState) -> Dict[Any, int]:
+        """
+        Return CLAIMING_MOVE for the cells where the player to move would
+        claim a ley line and BLOCKING_MOVE for the cells where the opponent
+        would.
+        """
+        player = state.get_current_player_name()
+        opponent = 'p2' if player == 'p1' else 'p1'
+        ranks = {cell: BLOCKING_MOVE
+                 for cell in state.claiming_moves(opponent)}
+        for cell in state.claiming_moves(player):
+            ranks[cell] = CLAIMING_MOVE
+        return ranks
+
+    def tiebreak(self, state: SGState, move: str) -> float:
+        """
+        Return the centrality of the cell move.
+        """
+        if state.size != self._size:
+            self.centrality = cell_centrality(state.size)
+            self._size = state.size
+        return self.centrality.get(move, 0)
+
+
+def cell_centrality(size: int) -> Dict[str, float]:
+    """
+    Return the centrality of each cell of a Stonehenge board of size: minus
+    its distance from the middle of the board, counted along the three ley
+    line directions.
+
+    >>> centrality = cell_centrality(2)
+    >>> max(centrality, key=centrality.get)
+    'D'
+    """
+    state = StonehengeGame(True, size).current_state
+    coordinates = {}
+    for direction in (state.h_ley_line, state.dr, state.dl):
+        for number, line in direction.items():
+            for cell in line[:-1]:
+                coordinates.setdefault(cell, []).append(number)
+    means = [sum(c[i] for c in coordinates.values()) / len(coordinates)
+             for i in range(3)]
+    return {cell: -sum(abs(c[i] - means[i]) for i in range(3))
+            for cell, c in coordinates.items()}
+
+
+def default_orderer(state: GameState) -> MoveOrderer:
+    """
+    Return the best move orderer for searches from state.
+    """
+    if isinstance(state, SGState):
+        return LeyLineOrderer()
+    return MoveOrderer()
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
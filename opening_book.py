@@ -0,0 +1,241 @@
+"""
+A module for Stonehenge opening books.
+
+The first moves of a game on a big board are the slowest to search and the
+same in every game, so they can be searched once, deeply, ahead of time.
+build_book finds every position of the first plies of a board size (each
+position once, however it was reached), searches them in parallel with
+iterative deepening and writes the best cells to a book file. with_book
+puts a book in front of any strategy.
+
+A book file is
+
+    header    BOOK_HEADER: magic, version, board size, bytes per key
+    records   one per position: its BoardLayout.pack as a little-endian
+              int of key bytes, then its best cell in one byte
+
+Records are appended as searches finish, so a build that is stopped can be
+resumed: build_book skips the positions already in the file, and a record
+cut short by the stop is ignored.
+
+The positions are not folded by symmetry: the board reflections that map
+ley lines onto ley lines are not modelled anywhere in this package, so a
+mirrored position is searched and stored on its own.
+"""
+import multiprocessing
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from stonehenge import SGState, StonehengeGame
+from stonehenge_board import Position, board_layout
+from search import iterative_deepening
+
+# magic, version, board size, bytes per key
+BOOK_HEADER = struct.Struct('<4sHHH')
+BOOK_MAGIC = b'GOB1'
+BOOK_VERSION = 1
+
+# Where with_book looks for book files.
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'books')
+
+# Seconds build_book searches each position for by default.
+DEFAULT_BOOK_TIME = 10.0
+
+# Books opened by with_book, by path.
+_books = {}
+
+
+def book_file_name(size: int) -> str:
+    """
+    Return the name of the Stonehenge book file of board size.
+    """
+    return 'stonehenge-{}.book'.format(size)
+
+
+def key_bytes(size: int) -> int:
+    """
+    Return the number of bytes a packed position of board size takes.
+
+    >>> key_bytes(5)
+    9
+    """
+    layout = board_layout(size)
+    largest = 3 ** (len(layout.cells) + len(layout.lines)) * 2
+    return (largest.bit_length() + 7) // 8
+
+
+class OpeningBook:
+    """
+    The best cells of the opening positions of a board size.
+
+    size - the board size
+    moves - maps the packed form of each position (BoardLayout.pack) to its
+            best cell
+    """
+    size: int
+    moves: Dict[int, int]
+
+    def __init__(self, size: int, moves: Dict[int, int] = None) -> None:
+        """
+        Create an opening book for board size.
+        """
+        self.size = size
+        self.moves = moves if moves is not None else {}
+
+    @staticmethod
+    def load(path: str) -> 'OpeningBook':
+        """
+        Return the book in the book file at path.
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, size, width = BOOK_HEADER.unpack_from(data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError('{} is not a book file'.format(path))
+        moves = {}
+        record = width + 1
+        start = BOOK_HEADER.size
+        for offset in range(start, len(data) - record + 1, record):
+            code = int.from_bytes(data[offset:offset + width], 'little')
+            moves[code] = data[offset + width]
+        return OpeningBook(size, moves)
+
+    def probe(self, state: Any) -> Optional[str]:
+        """
+        Return the book move of state, or None if state is not in the book.
+        """
+        if not isinstance(state, SGState) or state.size != self.size:
+            return None
+        layout = board_layout(self.size)
+        cell = self.moves.get(layout.pack(layout.from_state(state)))
+        return layout.cells[cell] if cell is not None else None
+
+
+def opening_positions(size: int, plies: int) -> List[Position]:
+    """
+    Return every position with moves reached in fewer than plies moves on
+    a board of size, with either player starting, each once, in the order
+    of the number of moves made.
+    """
+    layout = board_layout(size)
+    layer = [layout.start(True), layout.start(False)]
+    positions = []
+    for _ in range(plies):
+        layer = [position for position in layer if layout.moves(position)]
+        positions.extend(layer)
+        layer = list(dict.fromkeys(layout.play(position, cell)
+                                   for position in layer
+                                   for cell in layout.moves(position)))
+    return positions
+
+
+def _search_position(size: int, code: int,
+                     time_budget: float) -> Tuple[int, int]:
+    """
+    Return code and the index of the best cell of the position packed as
+    code, found by iterative deepening within time_budget seconds.
+    """
+    layout = board_layout(size)
+    game = StonehengeGame(True, size)
+    game.current_state = layout.to_state(layout.unpack(code))
+    move = iterative_deepening(game, time_budget).move
+    return code, layout.cells.index(move)
+
+
+def build_book(size: int, plies: int, path: str,
+               time_budget: float = DEFAULT_BOOK_TIME,
+               workers: int = 1) -> OpeningBook:
+    """
+    Search every position of the first plies of board size for
+    time_budget seconds each with workers processes, append the best cells
+    to the book file at path and return the whole book. Positions already
+    in the file are not searched again.
+    """
+    width = key_bytes(size)
+    book = OpeningBook(size)
+    if os.path.exists(path):
+        book = OpeningBook.load(path)
+        if book.size != size:
+            raise ValueError('{} is a book of size {}'.format(path, book.size))
+    else:
+        with open(path, 'wb') as file:
+            file.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, size, width))
+    layout = board_layout(size)
+    todo = [code for code in map(layout.pack, opening_positions(size, plies))
+            if code not in book.moves]
+
+    with open(path, 'r+b') as file:
+        _truncate_partial_record(file, width + 1)
+        if workers <= 1:
+            for code in todo:
+                _record(book, file, width,
+                        _search_position(size, code, time_budget))
+        else:
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                futures = [pool.submit(_search_position, size, code,
+                                       time_budget) for code in todo]
+                for future in as_completed(futures):
+                    _record(book, file, width, future.result())
+    return book
+
+
+def _truncate_partial_record(file: Any, record: int) -> None:
+    """
+    Cut off a record that a stopped build left half written at the end of
+    file, and move to the end.
+    """
+    end = file.seek(0, os.SEEK_END)
+    file.truncate(end - (end - BOOK_HEADER.size) % record)
+    file.seek(0, os.SEEK_END)
+
+
+def _record(book: OpeningBook, file: Any, width: int,
+            result: Tuple[int, int]) -> None:
+    """
+    Add result, the packed form of a position and its best cell, to book
+    and append it to file, flushed so it survives the build being stopped.
+    """
+    code, cell = result
+    book.moves[code] = cell
+    file.write(code.to_bytes(width, 'little') + bytes([cell]))
+    file.flush()
+
+
+def open_book(size: int) -> Optional[OpeningBook]:
+    """
+    Return the book of board size in BOOK_DIR, loaded once, or None if
+    there is no such file.
+    """
+    path = os.path.join(BOOK_DIR, book_file_name(size))
+    if path not in _books:
+        _books[path] = OpeningBook.load(path) if os.path.exists(path) \
+            else None
+    return _books[path]
+
+
+def with_book(strategy: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """
+    Return a strategy that plays the book move of the current state if the
+    book of its board size in BOOK_DIR has one, and the move of strategy
+    otherwise.
+    """
+    def book_strategy(game: Any) -> Any:
+        """
+        Return the book move for game, or the move of the wrapped strategy.
+        """
+        state = game.current_state
+        if isinstance(state, SGState):
+            book = open_book(state.size)
+            move = book.probe(state) if book is not None else None
+            if move is not None:
+                return move
+        return strategy(game)
+    book_strategy.__name__ = 'book_' + strategy.__name__
+    return book_strategy
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
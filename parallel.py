@@ -0,0 +1,311 @@
+"""
+A module for minimax on several processes, split at the root.
+
+Every strategy in strategy.py and search.py runs on one core. Here the
+states frontier_depth moves below the root (the children of the root by
+default) are solved exactly, each on its own, by the worker processes of
+a concurrent.futures.ProcessPoolExecutor, and their scores are combined
+with minimax in this process. A deeper frontier gives more, smaller tasks,
+so the work is shared out more evenly, at the price of more work in all:
+the workers share no transposition table, so a state below two tasks is
+solved once for each.
+
+Each task is sent as an encoding of three ints instead of a pickled game:
+
+    (STONEHENGE, size, packed position)    see BoardLayout.pack
+    (SUBTRACT_SQUARE, 0, 2 * total + p1_turn)
+
+The workers solve their states with search.solve (with LeyLinePruner for
+Stonehenge), which returns the exact score of the state. The move picked
+is the first of the best moves in the order of get_possible_moves: the
+move recursive_minimax_strategy and iterative_minimax_strategy pick. As
+the tasks finish, the root moves are scored in that order as far as the
+scores in so far allow; a reply that wins for the opponent settles a move
+without its other replies. Scores are only ever WIN or LOSE, so once a
+move is a WIN and every move before it is scored, no other task can
+change the pick, and the tasks not yet started are cancelled. Tasks that
+are already running cannot be stopped, so parallel_minimax waits for them
+before it returns: otherwise the next search on the same pool would queue
+behind them. The time this takes is reported as leftover_seconds.
+
+The pools are kept between calls, by number of workers, so a game only
+starts its worker processes once.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from typing import Any, Dict, List, Optional, Tuple
+from game_state import GameState
+from search import solve, terminal_score, INFINITY
+from pruning import LeyLinePruner
+from stonehenge import SGState, StonehengeGame
+from stonehenge_board import board_layout
+from subtract_square_game import SubtractSquareGame
+from tablebase_file import STONEHENGE, SUBTRACT_SQUARE
+
+# Worker processes parallel_minimax_strategy uses.
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Moves below the root at which the tree is split into tasks.
+DEFAULT_FRONTIER_DEPTH = 1
+
+# A state as sent to a worker: game code, board size, code of the state.
+Encoding = Tuple[int, int, int]
+
+# Process pools made by process_pool, by number of workers.
+_pools = {}
+
+
+class ParallelResult:
+    """
+    The result of a root-split minimax search.
+
+    move - the best move, the first in the order of get_possible_moves
+    score - its score for the current player
+    scores - the score of each root move scored, in the order of
+             get_possible_moves up to move
+    tasks - the number of frontier states solved, counting those that were
+            already running when the move was picked
+    cancelled - the number of frontier states never started because the
+                move was picked before they were needed
+    workers - the number of worker processes, or 0 if the states were
+              solved in this process
+    search_seconds - the CPU seconds the workers spent solving, added up
+    leftover_seconds - the seconds spent, after the move was picked,
+                       waiting for the tasks that were already running
+    wall_seconds - the seconds the whole search took, leftover_seconds
+                   included
+    """
+    move: Any
+    score: int
+    scores: Dict[Any, int]
+    tasks: int
+    cancelled: int
+    workers: int
+    search_seconds: float
+    leftover_seconds: float
+    wall_seconds: float
+
+    def __init__(self, move: Any, score: int, scores: Dict[Any, int],
+                 tasks: int, cancelled: int, workers: int,
+                 search_seconds: float, leftover_seconds: float,
+                 wall_seconds: float) -> None:
+        """
+        Create a root-split search result.
+        """
+        self.move = move
+        self.score = score
+        self.scores = scores
+        self.tasks = tasks
+        self.cancelled = cancelled
+        self.workers = workers
+        self.search_seconds = search_seconds
+        self.leftover_seconds = leftover_seconds
+        self.wall_seconds = wall_seconds
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this result.
+        """
+        return 'ParallelResult(move={!r}, score={}, tasks={}, ' \
+               'cancelled={}, workers={}, search_seconds={:.3f}, ' \
+               'leftover_seconds={:.3f}, wall_seconds={:.3f})'.format(
+                   self.move, self.score, self.tasks, self.cancelled,
+                   self.workers, self.search_seconds, self.leftover_seconds,
+                   self.wall_seconds)
+
+
+def encode(state: GameState) -> Encoding:
+    """
+    Return the encoding of state, a Stonehenge or Subtract Square state.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> encode(SubtractSquareState(False, 50))
+    (2, 0, 100)
+    """
+    if isinstance(state, SGState):
+        layout = board_layout(state.size)
+        return STONEHENGE, state.size, layout.pack(layout.from_state(state))
+    return SUBTRACT_SQUARE, 0, 2 * state.current_total + state.p1_turn
+
+
+def decode(encoding: Encoding) -> Any:
+    """
+    Return a game whose current state is the state of encoding.
+
+    >>> state = StonehengeGame(True, 2).current_state.make_move('A')
+    >>> decode(encode(state)).current_state.key() == state.key()
+    True
+    """
+    game_code, size, code = encoding
+    if game_code == STONEHENGE:
+        layout = board_layout(size)
+        game = StonehengeGame(True, size)
+        game.current_state = layout.to_state(layout.unpack(code))
+        return game
+    total, p1_turn = divmod(code, 2)
+    return SubtractSquareGame(bool(p1_turn), total)
+
+
+def solve_encoded(encoding: Encoding) -> Tuple[int, float]:
+    """
+    Return the exact score, for the player to move, of the state of
+    encoding, a state with moves, and the CPU seconds it took to find.
+    """
+    start = time.process_time()
+    game = decode(encoding)
+    pruner = LeyLinePruner() if encoding[0] == STONEHENGE else None
+    score = solve(game, pruner=pruner).score
+    return score, time.process_time() - start
+
+
+def frontier(state: GameState, depth: int, found: Dict[Encoding, None]) \
+        -> None:
+    """
+    Add the encodings of the states with moves depth moves below state to
+    found, in the order a search would reach them.
+    """
+    moves = state.get_possible_moves()
+    if not moves:
+        return
+    if depth == 0:
+        found.setdefault(encode(state))
+        return
+    for move in moves:
+        frontier(state.make_move(move), depth - 1, found)
+
+
+def frontier_score(game: Any, state: GameState, depth: int,
+                   scores: Dict[Encoding, int]) -> Optional[int]:
+    """
+    Return the score of state for the player to move, from the scores of
+    the states depth moves below it found so far, or None if they do not
+    settle it yet.
+    """
+    moves = state.get_possible_moves()
+    if not moves:
+        return terminal_score(game, state)
+    if depth == 0:
+        return scores.get(encode(state))
+    best = -INFINITY
+    for move in moves:
+        score = frontier_score(game, state.make_move(move), depth - 1,
+                               scores)
+        if score is None:
+            best = None
+        elif -score == GameState.WIN:
+            return GameState.WIN
+        elif best is not None:
+            best = max(best, -score)
+    return best
+
+
+def pick_move(game: Any, state: GameState, depth: int,
+              scores: Dict[Encoding, int]) -> Optional[Dict[Any, int]]:
+    """
+    Return the scores of the moves of state, in the order of
+    get_possible_moves, up to the first that wins, if the scores of the
+    states depth moves below state found so far settle them all; otherwise
+    None.
+    """
+    move_scores = {}
+    for move in state.get_possible_moves():
+        score = frontier_score(game, state.make_move(move), depth, scores)
+        if score is None:
+            return None
+        move_scores[move] = -score
+        if -score == GameState.WIN:
+            break
+    return move_scores
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Return the process pool with workers workers, made once per number of
+    workers.
+    """
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(workers)
+    return _pools[workers]
+
+
+def shutdown_pools() -> None:
+    """
+    Shut down the process pools made by process_pool.
+    """
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def parallel_minimax(game: Any, workers: int = DEFAULT_WORKERS,
+                     frontier_depth: int = DEFAULT_FRONTIER_DEPTH,
+                     pool: Optional[ProcessPoolExecutor] = None) \
+        -> ParallelResult:
+    """
+    Search game.current_state, a state with moves, to the end of the game
+    by solving the states frontier_depth moves below it on workers worker
+    processes, and return the result. With 0 workers the states are solved
+    one after the other in this process. pool, if given, is used instead of
+    the pool of process_pool.
+
+    Raise ValueError if frontier_depth is less than 1.
+    """
+    if frontier_depth < 1:
+        raise ValueError('frontier_depth must be at least 1, not {}'.format(
+            frontier_depth))
+    start = time.perf_counter()
+    state = game.current_state
+    found = {}
+    for move in state.get_possible_moves():
+        frontier(state.make_move(move), frontier_depth - 1, found)
+    tasks: List[Encoding] = list(found)
+    scores = {}
+    search_seconds = leftover_seconds = 0.0
+    cancelled = len(tasks)
+    # Moves to the end of the game may settle it before any task is solved.
+    move_scores = pick_move(game, state, frontier_depth - 1, scores)
+    if move_scores is None and workers == 0:
+        for encoding in tasks:
+            scores[encoding], seconds = solve_encoded(encoding)
+            search_seconds += seconds
+            move_scores = pick_move(game, state, frontier_depth - 1, scores)
+            if move_scores is not None:
+                break
+        cancelled = len(tasks) - len(scores)
+    elif move_scores is None:
+        if pool is None:
+            pool = process_pool(workers)
+        futures = {pool.submit(solve_encoded, encoding): encoding
+                   for encoding in tasks}
+        for future in as_completed(futures):
+            scores[futures[future]], seconds = future.result()
+            search_seconds += seconds
+            move_scores = pick_move(game, state, frontier_depth - 1, scores)
+            if move_scores is not None:
+                break
+        cancelled = sum(future.cancel() for future in futures)
+        running = [future for future in futures
+                   if not future.cancelled() and futures[future] not in scores]
+        waited = time.perf_counter()
+        for future in wait(running).done:
+            search_seconds += future.result()[1]
+        leftover_seconds = time.perf_counter() - waited
+    best_move = max(move_scores, key=move_scores.get)
+    return ParallelResult(best_move, move_scores[best_move], move_scores,
+                          len(tasks) - cancelled, cancelled, workers,
+                          search_seconds, leftover_seconds,
+                          time.perf_counter() - start)
+
+
+def parallel_minimax_strategy(game: Any) -> Any:
+    """
+    Return the move of minimax for game, found on DEFAULT_WORKERS
+    processes.
+    """
+    return parallel_minimax(game).move
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,148 @@
+"""
+A module for thinking on the opponent's time (pondering).
+
+While a human types a move in, the computer player has nothing to do.
+PonderingStrategy puts that time to use: ponder starts a background thread
+that, for each move the human could make, most likely first, works out
+the answer the strategy would give to it and keeps it in a cache. When the
+human's move is in, stop cancels the thread, and if the state the game
+reached is in the cache the answer is played at once.
+
+Each answer is worked out by a copy of the strategy, made with copy.deepcopy
+just before, on a copy of the game after the reply. For a strategy whose
+move only depends on the state and on its own attributes, such as a
+SearchStrategy that searches to the end or to a fixed depth, the copy makes
+exactly the move the strategy would have made, and when its answer is used
+the copy replaces the strategy, so later moves are the same as without
+pondering. A strategy with a time budget gets a search of the same budget
+either way, but timed searches never repeat exactly anyway.
+
+The thread stops within CLOCK_INTERVAL states of being cancelled, through
+Searcher.cancel; a search cut short is thrown away.
+"""
+import threading
+from copy import deepcopy
+from typing import Any, Dict, List, Tuple
+from game_state import GameState
+from search import SearchStrategy, SearchTimeout
+
+
+class PonderingStrategy:
+    """
+    A SearchStrategy that can think about its answers while the opponent
+    chooses a move.
+
+    strategy - the strategy that chooses the moves
+    answers - the answers worked out so far: maps the key of a state to
+              the move of strategy there and the copy of strategy that
+              chose it
+    hits - the number of moves that were answered from answers
+    """
+    strategy: SearchStrategy
+    answers: Dict[Any, Tuple[Any, SearchStrategy]]
+    hits: int
+
+    def __init__(self, strategy: SearchStrategy) -> None:
+        """
+        Create a pondering version of strategy.
+        """
+        self.strategy = strategy
+        self.answers = {}
+        self.hits = 0
+        self.__name__ = 'pondering_' + strategy.__name__
+        self._cancel = threading.Event()
+        self._worker = None
+
+    def __call__(self, game: Any) -> Any:
+        """
+        Return a move for game: the answer worked out while pondering if
+        there is one, or else the move of strategy.
+        """
+        self.stop()
+        answer = self.answers.get(game.current_state.key())
+        self.answers = {}
+        if answer is None:
+            return self.strategy(game)
+        move, strategy = answer
+        if strategy.searcher is not None:
+            strategy.searcher.game = game
+            strategy.searcher.cancel = None
+        self.strategy = strategy
+        self.hits += 1
+        return move
+
+    def ponder(self, game: Any) -> None:
+        """
+        Start working out the answers to the moves from game.current_state,
+        the opponent's turn, in the background.
+        """
+        self.stop()
+        self.answers = {}
+        self._cancel = threading.Event()
+        self._worker = threading.Thread(
+            target=self._ponder, args=(game, game.current_state,
+                                       self._cancel), daemon=True)
+        self._worker.start()
+
+    def stop(self) -> None:
+        """
+        Cancel pondering, and wait for the background thread to finish.
+        """
+        if self._worker is not None:
+            self._cancel.set()
+            self._worker.join()
+            self._worker = None
+
+    def likely_replies(self, state: GameState) -> List[Any]:
+        """
+        Return the moves from state, the one the last search expected
+        first.
+        """
+        moves = state.get_possible_moves()
+        searcher = self.strategy.searcher
+        entry = searcher.table.get(state.key()) if searcher is not None \
+            else None
+        if entry is not None and entry[3] in moves:
+            moves.remove(entry[3])
+            moves.insert(0, entry[3])
+        return moves
+
+    def _ponder(self, game: Any, state: GameState,
+                cancel: threading.Event) -> None:
+        """
+        Work out the answers to the replies from state in game until they
+        are all done or cancel is set.
+        """
+        for reply in self.likely_replies(state):
+            reached = state.make_move(reply)
+            if cancel.is_set():
+                return
+            if not reached.get_possible_moves():
+                continue
+            game_copy = deepcopy(game)
+            game_copy.current_state = reached
+            strategy = deepcopy(self.strategy, {id(game): game_copy})
+            strategy.cancel = cancel
+            try:
+                move = strategy(game_copy)
+            except SearchTimeout:
+                return
+            if cancel.is_set():
+                return
+            strategy.cancel = None
+            self.answers[reached.key()] = (move, strategy)
+
+
+def pondering(strategy: Any) -> Any:
+    """
+    Return a pondering version of strategy if it is a SearchStrategy, and
+    strategy itself otherwise.
+    """
+    if isinstance(strategy, SearchStrategy):
+        return PonderingStrategy(strategy)
+    return strategy
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
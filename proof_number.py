@@ -0,0 +1,247 @@
+"""
+A module for depth-first proof-number search (df-pn).
+
+Proof-number search only answers whether the player about to move wins,
+which for Stonehenge (where there are no draws) is all we need to pick a
+move. Every state has a proof number, the least number of states that still
+have to be proven to show the player to move wins, and a disproof number,
+the least number to show they lose. The search always expands the state
+that is cheapest to prove or disprove, so it spends far fewer states than
+minimax on positions that are decided.
+
+In the negamax form used here, a state's proof number is the smallest
+disproof number of its children and its disproof number is the sum of the
+proof numbers of its children.
+"""
+from typing import Any, Dict, List, Optional, Set
+from game_state import GameState
+from search import terminal_score
+from strategy import rough_outcome_strategy
+
+# A proof or disproof number meaning "can never be (dis)proven".
+PN_INFINITY = 10 ** 9
+
+# States proof_number_strategy may expand before giving up.
+DEFAULT_MAX_NODES = 5000
+
+# Entries the transposition table may hold before the least worked-on half
+# is thrown away.
+DEFAULT_TABLE_SIZE = 500000
+
+
+class ProofResult:
+    """
+    The result of a proof-number search.
+
+    value - GameState.WIN or GameState.LOSE for the player about to move,
+            or None if the node budget ran out first
+    move - a winning move if value is WIN, otherwise None
+    proof_size - number of distinct states in the proof (or disproof) tree
+    nodes - number of states expanded
+    """
+    value: Optional[int]
+    move: Any
+    proof_size: int
+    nodes: int
+
+    def __init__(self, value: Optional[int], move: Any, proof_size: int,
+                 nodes: int) -> None:
+        """
+        Create a proof-number search result.
+        """
+        self.value = value
+        self.move = move
+        self.proof_size = proof_size
+        self.nodes = nodes
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this result.
+        """
+        return 'ProofResult(value={}, move={!r}, proof_size={}, ' \
+               'nodes={})'.format(self.value, self.move, self.proof_size,
+                                  self.nodes)
+
+
+class ProofNumberSearch:
+    """
+    Depth-first proof-number search with a bounded transposition table.
+
+    game - the game being searched
+    max_nodes - number of states that may be expanded
+    table_size - number of entries the table may hold
+    table - maps state keys to [proof number, disproof number, work], where
+            work is the number of expansions spent below the state
+    nodes - number of states expanded so far
+    """
+    game: Any
+    max_nodes: int
+    table_size: int
+    table: Dict[Any, List[int]]
+    nodes: int
+
+    def __init__(self, game: Any, max_nodes: int = DEFAULT_MAX_NODES,
+                 table_size: int = DEFAULT_TABLE_SIZE) -> None:
+        """
+        Create a proof-number search for game.
+        """
+        self.game = game
+        self.max_nodes = max_nodes
+        self.table_size = table_size
+        self.table = {}
+        self.nodes = 0
+
+    def prove(self, state: GameState) -> ProofResult:
+        """
+        Return whether the player about to move in state wins, with a
+        winning move if they do.
+        """
+        key = state.key()
+        self.mid(state, key, PN_INFINITY, PN_INFINITY)
+        proof, disproof = self.numbers(key)
+        if proof == 0:
+            return ProofResult(GameState.WIN, self.winning_move(state),
+                               self.proof_size(state, set()), self.nodes)
+        elif disproof == 0:
+            return ProofResult(GameState.LOSE, None,
+                               self.proof_size(state, set()), self.nodes)
+        return ProofResult(None, None, 0, self.nodes)
+
+    def numbers(self, key: Any) -> List[int]:
+        """
+        Return the proof and disproof number of the state with key. States
+        not in the table count as 1, 1.
+        """
+        entry = self.table.get(key)
+        if entry is None:
+            return [1, 1]
+        return entry[:2]
+
+    def store(self, key: Any, proof: int, disproof: int, work: int) -> None:
+        """
+        Store the numbers of the state with key, making room first if the
+        table is full.
+        """
+        if key not in self.table and len(self.table) >= self.table_size:
+            self.collect_garbage()
+        self.table[key] = [proof, disproof, work]
+
+    def collect_garbage(self) -> None:
+        """
+        Throw away the half of the table that took the least work to find.
+        """
+        keys = sorted(self.table, key=lambda k: self.table[k][2])
+        for key in keys[:len(keys) // 2]:
+            del self.table[key]
+
+    def store_if_over(self, state: GameState, key: Any) -> None:
+        """
+        Store the numbers of state if it is over and not in the table.
+        """
+        if key not in self.table and not state.get_possible_moves():
+            if terminal_score(self.game, state) == GameState.WIN:
+                self.store(key, 0, PN_INFINITY, 0)
+            else:
+                self.store(key, PN_INFINITY, 0, 0)
+
+    def mid(self, state: GameState, key: Any, proof_threshold: int,
+            disproof_threshold: int) -> None:
+        """
+        Expand state until its proof number reaches proof_threshold, its
+        disproof number reaches disproof_threshold or the node budget runs
+        out, and store its numbers.
+        """
+        self.store_if_over(state, key)
+        if key in self.table and 0 in self.table[key][:2]:
+            return
+        self.nodes += 1
+        nodes_before = self.nodes
+        work = self.table[key][2] if key in self.table else 0
+        children = [state.make_move(move)
+                    for move in state.get_possible_moves()]
+        keys = [child.key() for child in children]
+        for child, child_key in zip(children, keys):
+            self.store_if_over(child, child_key)
+
+        while True:
+            proof, disproof = PN_INFINITY, 0
+            best, second = None, PN_INFINITY
+            for i, child_key in enumerate(keys):
+                child_proof, child_disproof = self.numbers(child_key)
+                disproof = min(PN_INFINITY, disproof + child_proof)
+                if child_disproof < proof:
+                    second = proof
+                    proof, best = child_disproof, i
+                elif child_disproof < second:
+                    second = child_disproof
+            if proof >= proof_threshold or disproof >= disproof_threshold \
+                    or self.nodes >= self.max_nodes:
+                break
+            best_proof = self.numbers(keys[best])[0]
+            if disproof_threshold >= PN_INFINITY:
+                child_proof_threshold = PN_INFINITY
+            else:
+                child_proof_threshold = \
+                    disproof_threshold - disproof + best_proof
+            self.mid(children[best], keys[best], child_proof_threshold,
+                     min(proof_threshold, second + 1))
+        self.store(key, proof, disproof, work + self.nodes - nodes_before + 1)
+
+    def winning_move(self, state: GameState) -> Any:
+        """
+        Return a move from state, a proven win, to a proven loss for the
+        opponent.
+        """
+        for move in state.get_possible_moves():
+            if self.numbers(state.make_move(move).key())[1] == 0:
+                return move
+        return None
+
+    def proof_size(self, state: GameState, seen: Set[Any]) -> int:
+        """
+        Return the number of distinct states not in seen in the proof tree
+        of state, and add them to seen. States whose entries were thrown
+        away count as a single state.
+        """
+        key = state.key()
+        if key in seen:
+            return 0
+        seen.add(key)
+        entry = self.table.get(key)
+        moves = state.get_possible_moves()
+        if entry is None or not moves:
+            return 1
+        if entry[0] == 0:
+            move = self.winning_move(state)
+            if move is None:
+                return 1
+            return 1 + self.proof_size(state.make_move(move), seen)
+        return 1 + sum(self.proof_size(state.make_move(move), seen)
+                       for move in moves)
+
+
+def prove(game: Any, max_nodes: int = DEFAULT_MAX_NODES,
+          table_size: int = DEFAULT_TABLE_SIZE) -> ProofResult:
+    """
+    Return whether the player about to move in game.current_state wins,
+    found by proof-number search expanding at most max_nodes states.
+    """
+    search = ProofNumberSearch(game, max_nodes, table_size)
+    return search.prove(game.current_state)
+
+
+def proof_number_strategy(game: Any) -> Any:
+    """
+    Return a winning move for game if proof-number search finds one within
+    DEFAULT_MAX_NODES expansions, otherwise the move of
+    rough_outcome_strategy.
+    """
+    result = prove(game)
+    if result.value == GameState.WIN:
+        return result.move
+    return rough_outcome_strategy(game)
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,264 @@
+"""
+A module for cutting down the moves a search tries without changing the
+score it finds, and for scoring states whose outcome is already decided.
+
+SGState.get_possible_moves gives the search every empty cell, even when
+most of them lose at once. A MovePruner is handed the moves of each state
+a Searcher expands and returns the ones worth searching:
+
+    forced moves  if the opponent could claim enough ley lines to win
+                  with their next stone, only the moves after which they
+                  no longer can are searched (LeyLinePruner only)
+    dead cells    of the cells whose ley lines are all claimed, only the
+                  first is searched (LeyLinePruner only)
+
+Every forced move left out loses at once, so a state keeps its score as
+long as one move is left. When none is, every move loses and the pruner
+returns no moves: the search scores the state as lost without searching
+it.
+
+A stone on a dead cell, one whose ley lines are all claimed, can never
+claim anything: it only passes the turn, so the states after any two dead
+cells are the same game. Searching one of them is enough. The others stay
+empty in that child, so the passes left, and with them whose turn it is
+when the live cells run out, are the same as without pruning.
+
+Before that, the pruner is asked whether the outcome of a state is
+already decided (LeyLinePruner only). A Stonehenge game has no draws:
+once every ley line is claimed one player owns more than half of them, so
+a player who can no longer claim enough lines to win has lost. A player
+can claim an unclaimed line only with as many more stones as they are
+short of half of it, and they have half of the empty cells left to place,
+rounded up for the player to move. Counting the lines each player could
+still claim that way gives an upper bound on the lines they end up with;
+when it falls short for one player the other has won, whatever anyone
+plays. The player to move has also won if one stone claims enough lines.
+Either way the search scores the state without searching its moves.
+
+The threats are found from the tallies of the ley lines: a stone claims
+an unclaimed line once its player has half of the cells of the line, so
+a stone on an empty cell claims every unclaimed line through it that its
+player is one stone short of.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from game_state import GameState
+from stonehenge import SGState
+
+
+class MovePruner:
+    """
+    Keeps every move. The base class of the pruners.
+    """
+
+    def outcome(self, state: GameState,
+                moves: List[Any]) -> Optional[Tuple[int, Any]]:
+        """
+        Return the score of state, a state with moves, for the player to
+        move and a best move among moves if the outcome of state is already
+        decided; otherwise None.
+        """
+        return None
+
+    def prune(self, state: GameState, moves: List[Any]) -> List[Any]:
+        """
+        Return the moves of state, a state with moves, worth searching, in
+        the order of moves. An empty list means that every move loses.
+        """
+        return moves
+
+
+class LeyLinePruner(MovePruner):
+    """
+    A MovePruner for Stonehenge that scores decided states, only searches
+    the moves that stop an immediate win of the opponent when there is one,
+    and only one dead cell.
+
+    use_outcome_bound - whether to score states decided by the tallies
+    use_forced_moves - whether to prune to the moves that stop a threat
+    use_dead_cells - whether to search only the first dead cell
+    """
+    use_outcome_bound: bool
+    use_forced_moves: bool
+    use_dead_cells: bool
+
+    def __init__(self, use_forced_moves: bool = True,
+                 use_dead_cells: bool = True,
+                 use_outcome_bound: bool = True) -> None:
+        """
+        Create a pruner for Stonehenge using the given prunings.
+        """
+        self.use_forced_moves = use_forced_moves
+        self.use_dead_cells = use_dead_cells
+        self.use_outcome_bound = use_outcome_bound
+
+    def outcome(self, state: SGState,
+                moves: List[Any]) -> Optional[Tuple[int, Any]]:
+        """
+        Return the score of state and a best move if the tallies decide it.
+        """
+        if self.use_outcome_bound:
+            return decided_outcome(state, moves)
+        return None
+
+    def prune(self, state: SGState, moves: List[Any]) -> List[Any]:
+        """
+        Return the moves of state worth searching.
+        """
+        if self.use_forced_moves:
+            moves = forced_moves(state, moves)
+        if self.use_dead_cells:
+            moves = without_dead_cells(state, moves)
+        return moves
+
+
+def claimable_lines(state: SGState, mark: str) -> Dict[str, List[int]]:
+    """
+    Return the unclaimed ley lines that a stone of the player of mark on
+    each empty cell would claim, as indices into state.ley_lines(). Cells
+    that would claim none are left out.
+
+    >>> from stonehenge import StonehengeGame
+    >>> state = StonehengeGame(True, 1).current_state.make_move('A')
+    >>> claimable_lines(state, '2')
+    {'C': [1, 5], 'B': [3, 5]}
+    """
+    claimable = {}
+    for index, line in enumerate(state.ley_lines()):
+        cells = line[:-1]
+        if line[-1] == '@' and 2 * (cells.count(mark) + 1) >= len(cells):
+            for cell in cells:
+                if cell not in ('1', '2'):
+                    claimable.setdefault(cell, []).append(index)
+    return claimable
+
+
+def lines_needed(state: SGState, mark: str) -> float:
+    """
+    Return how many more ley lines the player of mark must claim to win.
+    """
+    owned = sum(1 for line in state.ley_lines() if line[-1] == mark)
+    return 1.5 * (state.size + 1) - owned
+
+
+def lines_within_reach(state: SGState, mark: str, stones: int) -> int:
+    """
+    Return the ley lines the player of mark owns plus the unclaimed ones
+    they are at most stones stones short of: at least as many lines as
+    they can own once they have placed stones more stones.
+    """
+    reach = 0
+    for line in state.ley_lines():
+        cells = line[:-1]
+        if line[-1] == mark or (line[-1] == '@' and (len(cells) + 1) // 2 -
+                                cells.count(mark) <= stones):
+            reach += 1
+    return reach
+
+
+def decided_outcome(state: SGState,
+                    moves: List[str]) -> Optional[Tuple[int, str]]:
+    """
+    Return the score of state for the player to move and a best move if
+    the ley-line tallies decide the game: the player to move can win with
+    one stone, or one of the players cannot win whatever is played.
+    Otherwise return None. moves are the moves of state, all its empty
+    cells.
+
+    >>> from stonehenge import StonehengeGame
+    >>> state = StonehengeGame(True, 2).current_state
+    >>> decided_outcome(state, state.get_possible_moves()) is None
+    True
+    >>> for move in 'GBDFA':
+    ...     state = state.make_move(move)
+    >>> decided_outcome(state, state.get_possible_moves())
+    (-1, 'C')
+    """
+    mover = '1' if state.p1_turn else '2'
+    other = '2' if state.p1_turn else '1'
+    needed = lines_needed(state, mover)
+    for move, lines in claimable_lines(state, mover).items():
+        if len(lines) >= needed:
+            return GameState.WIN, move
+    # With a stone for each cell of half of the longest line, a player can
+    # reach every unclaimed line, and so can still win.
+    longest = (state.size + 2) // 2
+    to_win = 1.5 * (state.size + 1)
+    stones = (len(moves) + 1) // 2
+    if stones < longest and \
+            lines_within_reach(state, mover, stones) < to_win:
+        return GameState.LOSE, moves[0]
+    stones = len(moves) // 2
+    if stones < longest and \
+            lines_within_reach(state, other, stones) < to_win:
+        return GameState.WIN, moves[0]
+    return None
+
+
+def forced_moves(state: SGState, moves: List[str]) -> List[str]:
+    """
+    Return moves if the opponent of the player to move in state could not
+    win with their next stone. Otherwise return the moves after which they
+    could not: the moves that win at once, that take the cell the opponent
+    would win on, or that claim the lines they would win with.
+
+    >>> from stonehenge import StonehengeGame
+    >>> state = StonehengeGame(True, 2).current_state.make_move('G')
+    >>> forced_moves(state, state.get_possible_moves())
+    ['A', 'B', 'C']
+    >>> state = state.make_move('D').make_move('E')
+    >>> forced_moves(state, state.get_possible_moves())
+    []
+    """
+    mover = '1' if state.p1_turn else '2'
+    other = '2' if state.p1_turn else '1'
+    needed = lines_needed(state, other)
+    threats = {cell: set(lines)
+               for cell, lines in claimable_lines(state, other).items()
+               if len(lines) >= needed}
+    if not threats:
+        return moves
+    mover_lines = claimable_lines(state, mover)
+    mover_needed = lines_needed(state, mover)
+    forced = []
+    for move in moves:
+        claimed = mover_lines.get(move, [])
+        if len(claimed) >= mover_needed or all(
+                cell == move or len(lines.difference(claimed)) < needed
+                for cell, lines in threats.items()):
+            forced.append(move)
+    return forced
+
+
+def dead_cells(state: SGState) -> List[str]:
+    """
+    Return the empty cells of state whose ley lines are all claimed.
+
+    >>> from stonehenge import StonehengeGame
+    >>> state = StonehengeGame(True, 3).current_state
+    >>> for move in 'HKFECBL':
+    ...     state = state.make_move(move)
+    >>> dead_cells(state)
+    ['A', 'I']
+    >>> without_dead_cells(state, state.get_possible_moves())
+    ['A', 'D', 'G', 'J']
+    """
+    live = set()
+    for line in state.ley_lines():
+        if line[-1] == '@':
+            live.update(line[:-1])
+    return [cell for line in state.h_ley_line.values() for cell in line[:-1]
+            if cell not in ('1', '2') and cell not in live]
+
+
+def without_dead_cells(state: SGState, moves: List[str]) -> List[str]:
+    """
+    Return moves without the dead cells of state after the first.
+    """
+    dead = set(dead_cells(state))
+    kept = [move for move in moves if move in dead][:1]
+    return [move for move in moves if move not in dead or move in kept]
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,289 @@
+"""
+A module for perfect ranking of Stonehenge positions.
+
+A PositionRanking numbers the legal positions of one board size 0, 1, 2,
+... with no gaps, so a solved table or a visit counter can be a flat NumPy
+array indexed by rank instead of a dictionary keyed by state.
+
+A position is legal if the player to move has as many stones as the other
+player, or one fewer. Positions are ranked by:
+
+    1. the number of stones on the board, then whose turn it is
+    2. which cells hold a stone (the combinatorial number system)
+    3. which of those stones are player 1's (same)
+    4. who owns each tied ley line. A ley line with an even number of cells
+       that is full, with as many stones of each player, belongs to
+       whoever got half of it first, which the cells do not tell. A
+       position with t tied lines therefore stands for 2 ** t positions.
+
+Steps 1 to 3 are arithmetic on a table of binomial coefficients. Step 4
+needs, for every cell pattern, how many positions come before it: the
+offsets array, which is built by looking at every pattern of the board
+once. That is 3 ** 12 patterns for size 3, so rankings are only made for
+boards up to size 3.
+"""
+from bisect import bisect_right
+from typing import List, Tuple
+import numpy
+from stonehenge_board import BoardLayout, Position, board_layout
+
+# Largest board size a PositionRanking can be made for.
+MAX_RANKING_SIZE = 3
+
+_rankings = {}
+
+
+class PositionRanking:
+    """
+    A bijection between the legal positions of a board size and
+    range(count).
+
+    layout - the layout of the board
+    count - the number of legal positions
+    pattern_count - the number of legal cell patterns (with whose turn)
+    offsets - offsets[r] is the rank of the first position whose cell
+              pattern has pattern rank r; offsets[pattern_count] == count
+    groups - (stones, p1_turn, player 1 stones, first pattern rank) of
+             each group of patterns, in rank order
+    """
+    layout: BoardLayout
+    count: int
+    pattern_count: int
+    offsets: numpy.ndarray
+    groups: List[Tuple[int, bool, int, int]]
+
+    def __init__(self, size: int) -> None:
+        """
+        Create the ranking of board size.
+        """
+        if size > MAX_RANKING_SIZE:
+            raise ValueError('boards bigger than {} cannot be ranked'
+                             .format(MAX_RANKING_SIZE))
+        self.layout = board_layout(size)
+        cells = len(self.layout.cells)
+        self._binomial = [[_choose(n, k) for k in range(cells + 2)]
+                          for n in range(cells + 1)]
+        self.groups = []
+        self._group_starts = []
+        self._group_index = {}
+        start = 0
+        for stones in range(cells + 1):
+            for p1_turn in (False, True):
+                ones = (stones + (0 if p1_turn else 1)) // 2
+                self._group_index[(stones, p1_turn, ones)] = len(self.groups)
+                self.groups.append((stones, p1_turn, ones, start))
+                self._group_starts.append(start)
+                start += self._binomial[cells][stones] * \
+                    self._binomial[stones][ones]
+        self.pattern_count = start
+        self._tie_lines = [self.layout.lines[j]
+                           for j in self.layout.tie_lines]
+        self.offsets = self._build_offsets()
+        self.count = int(self.offsets[-1])
+
+    def _build_offsets(self) -> numpy.ndarray:
+        """
+        Return the offsets array, counting the tied lines of every legal
+        cell pattern.
+        """
+        cells = len(self.layout.cells)
+        codes = numpy.arange(3 ** cells, dtype=numpy.int64)
+        marks = numpy.empty((len(codes), cells), dtype=numpy.int8)
+        for i in range(cells - 1, -1, -1):
+            marks[:, i] = codes % 3
+            codes //= 3
+        tied = numpy.zeros(len(marks), dtype=numpy.int64)
+        for line in self._tie_lines:
+            line_marks = marks[:, list(line)]
+            tied += ((line_marks == 1).sum(axis=1) * 2 == len(line)) & \
+                (line_marks != 0).all(axis=1)
+        sizes = numpy.zeros(self.pattern_count, dtype=numpy.int64)
+        for p1_turn in (False, True):
+            ranks = self.pattern_ranks(marks, p1_turn)
+            legal = ranks >= 0
+            sizes[ranks[legal]] = 2 ** tied[legal]
+        offsets = numpy.zeros(self.pattern_count + 1, dtype=numpy.int64)
+        numpy.cumsum(sizes, out=offsets[1:])
+        return offsets
+
+    def pattern_ranks(self, marks: numpy.ndarray,
+                      p1_turn: bool) -> numpy.ndarray:
+        """
+        Return the pattern rank of each row of marks (one row of cell marks
+        per position) with p1_turn, or -1 where that is not legal.
+        """
+        binomial = numpy.array(self._binomial, dtype=numpy.int64)
+        count = len(marks)
+        stones = numpy.zeros(count, dtype=numpy.int64)
+        ones = numpy.zeros(count, dtype=numpy.int64)
+        cell_rank = numpy.zeros(count, dtype=numpy.int64)
+        one_rank = numpy.zeros(count, dtype=numpy.int64)
+        for i in range(marks.shape[1]):
+            taken = marks[:, i] != 0
+            is_one = marks[:, i] == 1
+            cell_rank += numpy.where(taken, binomial[i, stones + 1], 0)
+            one_rank += numpy.where(is_one, binomial[stones, ones + 1], 0)
+            stones += taken
+            ones += is_one
+        twos = stones - ones
+        if p1_turn:
+            legal = (twos == ones) | (twos == ones + 1)
+        else:
+            legal = (ones == twos) | (ones == twos + 1)
+        group_start = numpy.full(count, -1, dtype=numpy.int64)
+        for stones_, turn, ones_, start in self.groups:
+            if turn == p1_turn:
+                group_start[legal & (stones == stones_) & (ones == ones_)] \
+                    = start
+        per_cells = binomial[stones, ones]
+        return numpy.where(group_start >= 0,
+                           group_start + cell_rank * per_cells + one_rank, -1)
+
+    def pattern_rank(self, cells: Tuple[int, ...], p1_turn: bool) -> int:
+        """
+        Return the rank of the cell pattern cells with p1_turn among legal
+        patterns.
+        """
+        binomial = self._binomial
+        stones = ones = cell_rank = one_rank = 0
+        for i, mark in enumerate(cells):
+            if mark:
+                cell_rank += binomial[i][stones + 1]
+                if mark == 1:
+                    one_rank += binomial[stones][ones + 1]
+                    ones += 1
+                stones += 1
+        start = self.groups[self._group_index[(stones, p1_turn, ones)]][3]
+        return start + cell_rank * binomial[stones][ones] + one_rank
+
+    def rank(self, position: Position) -> int:
+        """
+        Return the rank of position.
+
+        Precondition: position is legal.
+
+        >>> ranking = ranking_for(2)
+        >>> layout = ranking.layout
+        >>> position = layout.play(layout.play(layout.start(True), 3), 0)
+        >>> ranking.unrank(ranking.rank(position)) == position
+        True
+        """
+        cells, claims, p1_turn = position
+        rank = int(self.offsets[self.pattern_rank(cells, p1_turn)])
+        bit = 1
+        for j, line in zip(self.layout.tie_lines, self._tie_lines):
+            if _is_tied(cells, line):
+                if claims[j] == 2:
+                    rank += bit
+                bit *= 2
+        return rank
+
+    def unrank(self, rank: int) -> Position:
+        """
+        Return the position with rank.
+        """
+        pattern = int(numpy.searchsorted(self.offsets, rank, side='right')) \
+            - 1
+        tie_bits = rank - int(self.offsets[pattern])
+        group = bisect_right(self._group_starts, pattern) - 1
+        stones, p1_turn, ones, start = self.groups[group]
+        cell_rank, one_rank = divmod(pattern - start,
+                                     self._binomial[stones][ones])
+        taken = self._unrank_subset(cell_rank, stones, len(self.layout.cells))
+        is_one = self._unrank_subset(one_rank, ones, stones)
+        cells = [0] * len(self.layout.cells)
+        for k, i in enumerate(taken):
+            cells[i] = 1 if k in is_one else 2
+        cells = tuple(cells)
+
+        claims = []
+        for line in self.layout.lines:
+            if _is_tied(cells, line):
+                claims.append(2 if tie_bits & 1 else 1)
+                tie_bits >>= 1
+            else:
+                claims.append(_owner(cells, line))
+        return cells, tuple(claims), p1_turn
+
+    def _unrank_subset(self, rank: int, size: int, total: int) -> List[int]:
+        """
+        Return the subset of range(total) with size elements whose rank in
+        the combinatorial number system is rank.
+        """
+        subset = []
+        for k in range(size, 0, -1):
+            n = k - 1
+            while n + 1 < total and self._binomial[n + 1][k] <= rank:
+                n += 1
+            subset.append(n)
+            rank -= self._binomial[n][k]
+            total = n
+        subset.reverse()
+        return subset
+
+    def rank_many(self, cells: numpy.ndarray, claims: numpy.ndarray,
+                  p1_turn: numpy.ndarray) -> numpy.ndarray:
+        """
+        Return the ranks of many positions at once: row i of cells and
+        claims and p1_turn[i] are position i.
+        """
+        pattern = numpy.where(p1_turn, self.pattern_ranks(cells, True),
+                              self.pattern_ranks(cells, False))
+        ranks = self.offsets[pattern]
+        bit = numpy.ones(len(cells), dtype=numpy.int64)
+        for j, line in zip(self.layout.tie_lines, self._tie_lines):
+            line_cells = cells[:, list(line)]
+            tied = ((line_cells == 1).sum(axis=1) * 2 == len(line)) & \
+                (line_cells != 0).all(axis=1)
+            ranks = ranks + numpy.where(tied & (claims[:, j] == 2), bit, 0)
+            bit = numpy.where(tied, bit * 2, bit)
+        return ranks
+
+
+def _choose(n: int, k: int) -> int:
+    """
+    Return n choose k, 0 if k > n.
+    """
+    if k > n or k < 0:
+        return 0
+    result = 1
+    for i in range(k):
+        result = result * (n - i) // (i + 1)
+    return result
+
+
+def _is_tied(cells: Tuple[int, ...], line: Tuple[int, ...]) -> bool:
+    """
+    Return whether line is full with as many stones of each player.
+    """
+    ones = twos = 0
+    for i in line:
+        if cells[i] == 1:
+            ones += 1
+        elif cells[i] == 2:
+            twos += 1
+    return ones == twos and ones + twos == len(line)
+
+
+def _owner(cells: Tuple[int, ...], line: Tuple[int, ...]) -> int:
+    """
+    Return who owns line, which is not tied: 1, 2, or 0 for nobody.
+    """
+    for mark in (1, 2):
+        if 2 * sum(1 for i in line if cells[i] == mark) >= len(line):
+            return mark
+    return 0
+
+
+def ranking_for(size: int) -> PositionRanking:
+    """
+    Return the ranking of board size, made once per size.
+    """
+    if size not in _rankings:
+        _rankings[size] = PositionRanking(size)
+    return _rankings[size]
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,190 @@
+"""
+A module for Monte Carlo tree search with RAVE (rapid action value
+estimation).
+
+Plain UCT only learns about a move from the playouts that start with it.
+All-moves-as-first (AMAF) statistics also count a move at a node whenever
+the player to move there plays it later in the same iteration, in the tree
+or in the playout. In Stonehenge the worth of a cell depends mostly on the
+ley lines through it and little on when it is taken, so AMAF statistics
+are a good guess after a handful of playouts, where UCT statistics are
+noise.
+
+RAVE scores a child by mixing its two win rates,
+
+    (1 - beta) * UCT win rate + beta * AMAF win rate
+
+with beta falling from 1 towards 0 as the child gets visits, so that the
+quick but biased AMAF guess gives way to the real statistics. The default
+schedule is beta = sqrt(k / (3 * visits + k)): k is the number of visits at
+which both count the same.
+"""
+import math
+from typing import Any, Callable, Dict, List, Optional
+from game_state import GameState
+from search import terminal_score, DEFAULT_TIME_BUDGET
+from mcts import MCTS, Node
+
+# The visits at which the default beta schedule weighs UCT and AMAF
+# statistics the same.
+DEFAULT_EQUIVALENCE = 300
+
+# The exploration constant of RAVE; the AMAF statistics explore already.
+DEFAULT_RAVE_EXPLORATION = 0.2
+
+
+def equivalence_schedule(k: float) -> Callable[[int], float]:
+    """
+    Return the beta schedule sqrt(k / (3 * visits + k)).
+
+    >>> equivalence_schedule(300)(300)
+    0.5
+    """
+    def beta(visits: int) -> float:
+        """
+        Return the weight of the AMAF win rate of a child with visits.
+        """
+        return math.sqrt(k / (3 * visits + k))
+    return beta
+
+
+class RaveNode(Node):
+    """
+    A node with AMAF statistics.
+
+    amaf - maps each move to [number of iterations in which the player to
+           move here played it, total result of those for that player]
+    """
+    amaf: Dict[Any, List[float]]
+
+    def __init__(self, state: GameState, move: Any = None,
+                 parent: Optional['RaveNode'] = None) -> None:
+        """
+        Create a node for state, reached by move from parent.
+        """
+        Node.__init__(self, state, move, parent)
+        self.amaf = {}
+
+
+class RaveMCTS(MCTS):
+    """
+    A Monte Carlo tree search with RAVE.
+
+    beta - the beta schedule: the weight of the AMAF win rate of a child
+           given its visits
+    """
+    beta: Callable[[int], float]
+
+    def __init__(self, game: Any,
+                 beta: Callable[[int], float] = None,
+                 exploration: float = DEFAULT_RAVE_EXPLORATION,
+                 seed: Optional[int] = None) -> None:
+        """
+        Create a search from game.current_state with beta schedule beta, by
+        default equivalence_schedule(DEFAULT_EQUIVALENCE).
+        """
+        MCTS.__init__(self, game, exploration, seed)
+        self.beta = beta if beta is not None else \
+            equivalence_schedule(DEFAULT_EQUIVALENCE)
+        self._playout_moves = []
+
+    def new_node(self, state: GameState, move: Any = None,
+                 parent: Optional[Node] = None) -> Node:
+        """
+        Return a new node with AMAF statistics.
+        """
+        return RaveNode(state, move, parent)
+
+    def descend(self) -> Node:
+        """
+        Return the node to play out from. Unlike UCT, untried moves compete
+        with the children: an untried move scores its AMAF win rate, so a
+        move that did well in playouts is tried before the others are.
+        """
+        node = self.root
+        while node.untried or node.children:
+            log_visits = math.log(node.visits + 1)
+            best, best_score = None, -1.0
+            for child in node.children:
+                score = self.rave_score(node, child.move, child.visits,
+                                        child.wins, log_visits)
+                if score > best_score:
+                    best, best_score = child, score
+            best_untried = None
+            for move in node.untried:
+                score = self.rave_score(node, move, 0, 0.0, log_visits)
+                if score > best_score:
+                    best_untried, best_score = move, score
+            if best_untried is not None:
+                node.untried.remove(best_untried)
+                child = self.new_node(node.state.make_move(best_untried),
+                                      best_untried, node)
+                node.children.append(child)
+                return child
+            node = best
+        return node
+
+    def rave_score(self, node: Node, move: Any, visits: int, wins: float,
+                   log_visits: float) -> float:
+        """
+        Return the RAVE score of move at node for a child with visits and
+        wins; log_visits is the log of the visits of node plus one.
+        """
+        count, amaf_wins = node.amaf.get(move, (0, 0.0))
+        amaf_rate = amaf_wins / count if count else 0.5
+        if not visits:
+            return amaf_rate + self.exploration * math.sqrt(log_visits)
+        beta = self.beta(visits)
+        return (1 - beta) * wins / visits + beta * amaf_rate + \
+            self.exploration * math.sqrt(log_visits / visits)
+
+    def playout(self, state: GameState) -> float:
+        """
+        Return the result of a random game from state for the player to move
+        in state, and remember its moves for back_up.
+        """
+        self.playouts += 1
+        played = self._playout_moves = []
+        moves = state.get_possible_moves()
+        while moves:
+            move = self.rng.choice(moves)
+            played.append(move)
+            state = state.make_move(move)
+            moves = state.get_possible_moves()
+        score = terminal_score(self.game, state)
+        if len(played) % 2:
+            score = -score
+        return (score + 1) / 2
+
+    def back_up(self, node: Node, result: float) -> None:
+        """
+        Add result to node and the nodes above it, and add the moves of the
+        iteration to their AMAF statistics: at each node, every later move
+        of the player to move there counts as if it had been played first.
+        """
+        moves = list(self._playout_moves)
+        MCTS.back_up(self, node, result)
+        while node is not None:
+            # moves[0] is the move out of node, made by the player to move
+            # there, who gets result.
+            for move in moves[::2]:
+                entry = node.amaf.setdefault(move, [0, 0.0])
+                entry[0] += 1
+                entry[1] += result
+            if node.move is not None:
+                moves.insert(0, node.move)
+            result = 1 - result
+            node = node.parent
+
+
+def rave_strategy(game: Any) -> Any:
+    """
+    Return a move for game found by Monte Carlo tree search with RAVE
+    within DEFAULT_TIME_BUDGET seconds.
+    """
+    return RaveMCTS(game).search(DEFAULT_TIME_BUDGET)
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,675 @@
+"""
+A module for depth-limited minimax search with a time budget.
+
+The minimax strategies in strategy.py search the whole game tree, so on the
+larger Stonehenge boards they never return. The search here stops at a given
+depth and scores the states it reaches there with an evaluation function.
+iterative_deepening searches depth 1, 2, 3, ... until the time budget runs
+out and keeps the result of the last depth it finished.
+
+Scores are always for the player about to move, so the score of a state is
+-1 times the best score of its children (negamax).
+
+analyse scores every move of a state, not just the best one, in one search
+whose transposition table the moves share.
+
+A Searcher can be given a MovePruner (see pruning.py), which scores states
+whose outcome is already decided and leaves out moves that cannot change
+the score of a state.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from game_state import GameState
+from move_ordering import MoveOrderer, default_orderer
+from pruning import MovePruner
+from endgame import solve_endgame, ENDGAME_EMPTY_CELLS
+
+# A score bigger than any real score.
+INFINITY = 2
+
+# Seconds iterative_deepening_strategy may spend on one move.
+DEFAULT_TIME_BUDGET = 2.0
+
+# How a transposition table score relates to the real score of a state.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Number of visited states between two looks at the clock.
+CLOCK_INTERVAL = 256
+
+# A depth no game here reaches, for searches to the end of the game.
+FULL_DEPTH = 10 ** 6
+
+# Width of the window of a null-window search. Scores of finished games
+# are -1, 0 or 1, so a null-window search answers "is the score above x?".
+NULL_WINDOW = 1e-6
+
+# The search methods a Searcher can use.
+ALPHABETA = 'alphabeta'
+PVS = 'pvs'
+MTDF = 'mtdf'
+METHODS = (ALPHABETA, PVS, MTDF)
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget has run out.
+    """
+    pass
+
+
+def terminal_score(game: Any, state: GameState) -> int:
+    """
+    Return the score of state, a state of game that is over, for the player
+    about to move. game.current_state is left as it was.
+    """
+    saved = game.current_state
+    game.current_state = state
+    try:
+        if game.is_winner(state.get_current_player_name()):
+            return GameState.WIN
+        elif game.is_winner('p1') or game.is_winner('p2'):
+            return GameState.LOSE
+        return GameState.DRAW
+    finally:
+        game.current_state = saved
+
+
+class SearchResult:
+    """
+    The result of searching from the current state of a game.
+
+    move - the best move found
+    score - the score of move for the current player
+    pv - the principal variation: the line of play both players are expected
+         to follow, starting with move
+    depth - the deepest search that finished
+    nodes - the number of states visited over all depths
+    exact - whether score is proven rather than estimated at the horizon
+    """
+    move: Any
+    score: float
+    pv: List[Any]
+    depth: int
+    nodes: int
+    exact: bool
+
+    def __init__(self, move: Any, score: float, pv: List[Any], depth: int,
+                 nodes: int, exact: bool) -> None:
+        """
+        Create a search result.
+        """
+        self.move = move
+        self.score = score
+        self.pv = pv
+        self.depth = depth
+        self.nodes = nodes
+        self.exact = exact
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this result.
+        """
+        return 'SearchResult(move={!r}, score={}, pv={!r}, depth={}, ' \
+               'nodes={}, exact={})'.format(self.move, self.score, self.pv,
+                                            self.depth, self.nodes,
+                                            self.exact)
+
+
+class Searcher:
+    """
+    Depth-limited negamax search with alpha-beta pruning and a
+    transposition table.
+
+    game - the game being searched; its current_state is restored after use
+    evaluate - scores a state at the horizon for the player about to move
+    orderer - decides the order in which moves are tried
+    pruner - decides which moves are worth trying
+    method - ALPHABETA, PVS (principal variation search: every move after
+             the first is only tested with a null window, and searched
+             again with a full window if it beats the first) or MTDF
+             (MTD(f): the root is searched with null windows only,
+             narrowing down on the score)
+    table - transposition table from state key to
+            (depth, score, flag, best move, proven)
+    previous - the transposition table from before the last reroot; the
+               entries the search reaches again are moved back to table
+    nodes - number of states visited so far
+    horizon_hits - number of scores that were estimated rather than proven
+    deadline - time.perf_counter() value at which to give up, or None
+    cancel - an event that makes the search give up once set, or None
+    cutoffs - number of states where a move caused a beta cutoff
+    first_move_cutoffs - number of those cutoffs caused by the first move
+    root_scores - the score of each root move in the last search
+    root_move - the best root move of the last search
+    """
+    game: Any
+    evaluate: Callable[[GameState], float]
+    orderer: MoveOrderer
+    pruner: MovePruner
+    method: str
+    table: Dict[Any, Tuple[int, float, int, Any, bool]]
+    previous: Dict[Any, Tuple[int, float, int, Any, bool]]
+    nodes: int
+    horizon_hits: int
+    deadline: Optional[float]
+    cancel: Optional[threading.Event]
+    cutoffs: int
+    first_move_cutoffs: int
+    root_scores: Dict[Any, float]
+    root_move: Any
+
+    def __init__(self, game: Any,
+                 evaluate: Callable[[GameState], float] = None,
+                 orderer: MoveOrderer = None,
+                 method: str = ALPHABETA,
+                 pruner: MovePruner = None) -> None:
+        """
+        Create a searcher for game using method, one of METHODS. Without
+        evaluate, every state at the horizon is scored as a draw. Without
+        orderer, the default orderer for game.current_state is used.
+        Without pruner, every move is tried.
+        """
+        if method not in METHODS:
+            raise ValueError('unknown search method {!r}'.format(method))
+        self.method = method
+        self.game = game
+        self.evaluate = evaluate if evaluate is not None else \
+            (lambda state: GameState.DRAW)
+        self.orderer = orderer if orderer is not None else \
+            default_orderer(game.current_state)
+        self.pruner = pruner if pruner is not None else MovePruner()
+        self.table = {}
+        self.previous = {}
+        self.nodes = 0
+        self.horizon_hits = 0
+        self.deadline = None
+        self.cancel = None
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.root_scores = {}
+        self.root_move = None
+
+    def alphabeta(self, state: GameState, depth: int, alpha: float,
+                  beta: float, ply: int = 1) -> float:
+        """
+        Return the score of state, ply moves below the root, searched depth
+        moves deep. A score <= alpha is only an upper bound and a score
+        >= beta only a lower bound of the real score.
+        """
+        self.nodes += 1
+        if self.nodes % CLOCK_INTERVAL == 0 and self.out_of_time():
+            raise SearchTimeout
+        key = state.key()
+        entry = self.table.get(key)
+        if entry is None and self.previous:
+            entry = self.previous.pop(key, None)
+            if entry is not None:
+                self.table[key] = entry
+        best_move = None
+        if entry is not None:
+            entry_depth, score, flag, best_move, proven = entry
+            if proven or entry_depth >= depth:
+                if flag == EXACT or (flag == LOWER and score >= beta) or \
+                        (flag == UPPER and score <= alpha):
+                    if not proven:
+                        self.horizon_hits += 1
+                    return score
+        moves = state.get_possible_moves()
+        if not moves:
+            return terminal_score(self.game, state)
+        decided = self.pruner.outcome(state, moves)
+        if decided is not None:
+            score, best_move = decided
+            self.table[key] = (depth, score, EXACT, best_move, True)
+            return score
+        if depth == 0:
+            self.horizon_hits += 1
+            return self.evaluate(state)
+        searched = self.pruner.prune(state, moves)
+        if not searched:
+            # Every move loses at once.
+            self.table[key] = (depth, GameState.LOSE, EXACT, moves[0], True)
+            return GameState.LOSE
+        moves = searched
+
+        hits_before = self.horizon_hits
+        alpha_before = alpha
+        best_score = -INFINITY
+        ordered = self.orderer.order(state, moves, best_move, ply)
+        for i, move in enumerate(ordered):
+            score = self.child_score(state.make_move(move), depth, alpha,
+                                     beta, ply, i == 0)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self.cutoffs += 1
+                if i == 0:
+                    self.first_move_cutoffs += 1
+                self.orderer.cutoff(move, ply, depth)
+                break
+
+        if best_score <= alpha_before:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, best_score, flag, best_move,
+                           self.horizon_hits == hits_before)
+        return best_score
+
+    def out_of_time(self) -> bool:
+        """
+        Return whether the deadline has passed or the search was cancelled.
+        """
+        return (self.deadline is not None and
+                time.perf_counter() > self.deadline) or \
+            (self.cancel is not None and self.cancel.is_set())
+
+    def child_score(self, child: GameState, depth: int, alpha: float,
+                    beta: float, ply: int, first: bool) -> float:
+        """
+        Return the score, for the player who moved, of child, a child of a
+        state ply moves below the root that is searched depth moves deep
+        with window alpha, beta. first is whether child is the first child
+        searched.
+        """
+        if self.method != PVS or first:
+            return -self.alphabeta(child, depth - 1, -beta, -alpha, ply + 1)
+        score = -self.alphabeta(child, depth - 1, -alpha - NULL_WINDOW,
+                                -alpha, ply + 1)
+        if alpha < score < beta:
+            score = -self.alphabeta(child, depth - 1, -beta, -score,
+                                    ply + 1)
+        return score
+
+    def search(self, state: GameState, depth: int) -> Tuple[Any, float]:
+        """
+        Search state depth moves deep with this searcher's method, and
+        return its best move and score.
+        """
+        if self.method == MTDF:
+            guess = self.root_scores.get(self.root_move, GameState.DRAW)
+            return self.mtdf(state, depth, guess)
+        return self.search_root(state, depth)
+
+    def mtdf(self, state: GameState, depth: int,
+             guess: float) -> Tuple[Any, float]:
+        """
+        Return the best move and score of state searched depth moves deep,
+        with null-window searches starting at guess, the expected score.
+        """
+        lower, upper = -INFINITY, INFINITY
+        score = guess
+        best_move = None
+        hits_before = self.horizon_hits
+        while lower < upper:
+            beta = max(score, lower + NULL_WINDOW)
+            score = self.alphabeta(state, depth, beta - NULL_WINDOW, beta, 0)
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+                best_move = self.table[state.key()][3]
+        if best_move is None:
+            best_move = self.table[state.key()][3]
+        self.root_move = best_move
+        self.root_scores = {best_move: score}
+        self.table[state.key()] = (depth, score, EXACT, best_move,
+                                   self.horizon_hits == hits_before)
+        return best_move, score
+
+    def search_root(self, state: GameState, depth: int) -> Tuple[Any, float]:
+        """
+        Search state depth moves deep, and return its best move and score.
+        Root moves are tried in the order of their scores from the previous
+        call, and in the orderer's order the first time.
+        """
+        moves = self.orderer.order(state, state.get_possible_moves(), None, 0)
+        previous = self.root_scores
+        moves = sorted(moves, key=lambda m: -previous.get(m, -INFINITY))
+        scores = {}
+        best_move, best_score = None, -INFINITY
+        alpha = -INFINITY
+        hits_before = self.horizon_hits
+        for move in moves:
+            score = self.child_score(state.make_move(move), depth, alpha,
+                                     INFINITY, 0, not scores)
+            scores[move] = score
+            if score > best_score:
+                best_move, best_score = move, score
+            alpha = max(alpha, score)
+        self.root_scores = scores
+        self.root_move = best_move
+        self.table[state.key()] = (depth, best_score, EXACT, best_move,
+                                   self.horizon_hits == hits_before)
+        return best_move, best_score
+
+    def analyse_root(self, state: GameState, depth: int,
+                     bounded: bool = False) -> Dict[Any, Tuple[float, int]]:
+        """
+        Search every move of state depth moves deep, and return the score
+        of each with its flag: EXACT, or UPPER if the score is only an upper
+        bound. With bounded, moves after the first are searched, as in PVS,
+        with a null window just below the best score so far: a move that
+        ties or beats it is searched again for its exact score, and a move
+        that is worse only gets an upper bound below the best score.
+        Otherwise every move gets its exact score. All moves share the
+        transposition table.
+        """
+        moves = self.orderer.order(state, state.get_possible_moves(), None, 0)
+        previous = self.root_scores
+        moves = sorted(moves, key=lambda m: -previous.get(m, -INFINITY))
+        analysis = {}
+        best_move, best_score = None, -INFINITY
+        hits_before = self.horizon_hits
+        for move in moves:
+            child = state.make_move(move)
+            if not bounded or not analysis:
+                score = -self.alphabeta(child, depth - 1, -INFINITY,
+                                        INFINITY, 1)
+                analysis[move] = (score, EXACT)
+            else:
+                alpha = best_score - NULL_WINDOW
+                score = -self.alphabeta(child, depth - 1, -best_score,
+                                        -alpha, 1)
+                if alpha < score < GameState.WIN:
+                    # As good as the best so far, but maybe better.
+                    score = -self.alphabeta(child, depth - 1, -INFINITY,
+                                            -alpha, 1)
+                analysis[move] = (score, UPPER if score <= alpha else EXACT)
+            if score > best_score:
+                best_move, best_score = move, score
+        self.root_scores = {move: score
+                            for move, (score, _) in analysis.items()}
+        self.root_move = best_move
+        self.table[state.key()] = (depth, best_score, EXACT, best_move,
+                                   self.horizon_hits == hits_before)
+        return analysis
+
+    def reroot(self) -> None:
+        """
+        Get ready to search from a new root, such as the state a game
+        reached after the last search. The entries that the searches from
+        the new root reach are kept; the rest, which belong to states the
+        game can no longer reach, are dropped at the next reroot.
+        """
+        self.previous = self.table
+        self.table = {}
+        self.nodes = 0
+        self.horizon_hits = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.root_scores = {}
+        self.root_move = None
+
+    def first_move_cutoff_rate(self) -> float:
+        """
+        Return the fraction of cutoffs that the first move tried caused.
+        """
+        if self.cutoffs == 0:
+            return 0.0
+        return self.first_move_cutoffs / self.cutoffs
+
+    def principal_variation(self, state: GameState, depth: int) -> List[Any]:
+        """
+        Return the line of play of at most depth moves from state that the
+        transposition table says both players will follow.
+        """
+        pv = []
+        while len(pv) < depth:
+            entry = self.table.get(state.key())
+            if entry is None or entry[3] is None:
+                break
+            pv.append(entry[3])
+            state = state.make_move(entry[3])
+        return pv
+
+
+def iterative_deepening(game: Any,
+                        time_budget: float = DEFAULT_TIME_BUDGET,
+                        max_depth: int = None,
+                        evaluate: Callable[[GameState], float] = None,
+                        orderer: MoveOrderer = None,
+                        method: str = ALPHABETA,
+                        endgame_cells: Optional[int] = ENDGAME_EMPTY_CELLS,
+                        searcher: Optional[Searcher] = None,
+                        pruner: MovePruner = None) -> SearchResult:
+    """
+    Search game.current_state with method one move deeper at a time until
+    time_budget seconds have passed, max_depth is reached or the score is
+    proven, and return the result of the last depth that finished.
+
+    If not even depth 1 finishes in time, the first possible move is
+    returned with depth 0. If the game is already over, the result has no
+    move and the score of the finished game.
+
+    A Stonehenge state with at most endgame_cells empty cells is solved
+    exactly by the endgame solver instead (see endgame.py), unless
+    endgame_cells is None.
+
+    searcher, if given, is used instead of a new Searcher, keeping its
+    transposition table.
+    """
+    state = game.current_state
+    if not state.get_possible_moves():
+        return SearchResult(None, terminal_score(game, state), [], 0, 0,
+                            True)
+    if endgame_cells is not None:
+        solved = solve_endgame(state, endgame_cells)
+        if solved is not None:
+            move, score, pv, nodes = solved
+            return SearchResult(move, score, pv, FULL_DEPTH, nodes, True)
+    if searcher is None:
+        searcher = Searcher(game, evaluate, orderer, method, pruner)
+    searcher.deadline = time.perf_counter() + time_budget
+    result = SearchResult(state.get_possible_moves()[0], GameState.DRAW, [],
+                          0, 0, False)
+    depth = 1
+    while max_depth is None or depth <= max_depth:
+        hits_before = searcher.horizon_hits
+        try:
+            move, score = searcher.search(state, depth)
+        except SearchTimeout:
+            break
+        exact = searcher.horizon_hits == hits_before
+        result = SearchResult(move, score,
+                              searcher.principal_variation(state, depth),
+                              depth, searcher.nodes, exact)
+        if exact:
+            break
+        depth += 1
+    result.nodes = searcher.nodes
+    return result
+
+
+def iterative_deepening_strategy(game: Any) -> Any:
+    """
+    Return a move for game found by iterative deepening within
+    DEFAULT_TIME_BUDGET seconds.
+    """
+    return iterative_deepening(game).move
+
+
+def solve(game: Any, method: str = ALPHABETA,
+          orderer: MoveOrderer = None,
+          pruner: MovePruner = None) -> SearchResult:
+    """
+    Search game.current_state to the end of the game with method, and
+    return the result. If the game is already over, the result has no move
+    and the score of the finished game.
+    """
+    state = game.current_state
+    if not state.get_possible_moves():
+        return SearchResult(None, terminal_score(game, state), [],
+                            FULL_DEPTH, 0, True)
+    searcher = Searcher(game, orderer=orderer, method=method, pruner=pruner)
+    move, score = searcher.search(state, FULL_DEPTH)
+    return SearchResult(move, score,
+                        searcher.principal_variation(state, FULL_DEPTH),
+                        FULL_DEPTH, searcher.nodes, True)
+
+
+class MoveAnalysis:
+    """
+    The score of one root move in an analysis.
+
+    move - the move
+    score - its score for the current player
+    flag - EXACT, or UPPER if score is only an upper bound
+    pv - the line of play expected after it, starting with move
+    """
+    move: Any
+    score: float
+    flag: int
+    pv: List[Any]
+
+    def __init__(self, move: Any, score: float, flag: int,
+                 pv: List[Any]) -> None:
+        """
+        Create the analysis of a move.
+        """
+        self.move = move
+        self.score = score
+        self.flag = flag
+        self.pv = pv
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this analysis.
+        """
+        return 'MoveAnalysis(move={!r}, score={}, flag={}, pv={!r})'.format(
+            self.move, self.score, self.flag, self.pv)
+
+
+def analyse(game: Any, depth: int = FULL_DEPTH,
+            evaluate: Callable[[GameState], float] = None,
+            orderer: MoveOrderer = None,
+            bounded: bool = False) -> List[MoveAnalysis]:
+    """
+    Search every move from game.current_state depth moves deep (to the end
+    of the game by default) in one search sharing one transposition table,
+    and return the analysis of each, best first. With bounded, only the
+    best move is sure to get an exact score (see Searcher.analyse_root),
+    which is cheaper.
+    """
+    state = game.current_state
+    searcher = Searcher(game, evaluate, orderer)
+    analysis = searcher.analyse_root(state, depth, bounded)
+    result = [MoveAnalysis(move, score, flag,
+                           [move] + searcher.principal_variation(
+                               state.make_move(move), depth - 1))
+              for move, (score, flag) in analysis.items()]
+    result.sort(key=lambda entry: (-entry.score, entry.flag))
+    return result
+
+
+def alphabeta_strategy(game: Any) -> Any:
+    """
+    Return a move for game found by alpha-beta search to the end of the
+    game.
+    """
+    return solve(game, ALPHABETA).move
+
+
+def pvs_strategy(game: Any) -> Any:
+    """
+    Return a move for game found by principal variation search to the end
+    of the game.
+    """
+    return solve(game, PVS).move
+
+
+def mtdf_strategy(game: Any) -> Any:
+    """
+    Return a move for game found by MTD(f) search to the end of the game.
+    """
+    return solve(game, MTDF).move
+
+
+class SearchStrategy:
+    """
+    A strategy that keeps its searcher, and so its transposition table,
+    from one move to the next. The next time it is asked for a move in the
+    same game, the table is rerooted at the state the game reached, so the
+    part of the last search below that state is not searched again.
+
+    method - the search method, one of METHODS
+    time_budget - the seconds of iterative deepening per move, or None
+    max_depth - the deepest iterative deepening goes, or None
+    evaluate - scores the states at the horizon
+    reuse - whether the searcher is kept between moves
+    pruner - decides which moves are worth trying, or None for all
+    endgame_cells - iterative deepening solves Stonehenge states with at
+                    most this many empty cells with the endgame solver, or
+                    never if None
+    searcher - the searcher of the last move, or None
+    cancel - an event that makes the search give up once set, or None
+    """
+    method: str
+    time_budget: Optional[float]
+    max_depth: Optional[int]
+    evaluate: Optional[Callable[[GameState], float]]
+    reuse: bool
+    pruner: Optional[MovePruner]
+    endgame_cells: Optional[int]
+    searcher: Optional[Searcher]
+    cancel: Optional[threading.Event]
+
+    def __init__(self, method: str = ALPHABETA,
+                 time_budget: Optional[float] = None,
+                 max_depth: Optional[int] = None,
+                 evaluate: Callable[[GameState], float] = None,
+                 reuse: bool = True,
+                 pruner: Optional[MovePruner] = None,
+                 endgame_cells: Optional[int] = ENDGAME_EMPTY_CELLS) \
+            -> None:
+        """
+        Create a strategy that searches with method. With neither
+        time_budget nor max_depth, it searches to the end of the game;
+        otherwise it deepens iteratively until either runs out, switching
+        to the endgame solver as iterative_deepening does. The endgame
+        solver does not look at cancel, so a pondering search that reaches
+        it is only cancelled once the solve is done.
+        """
+        self.method = method
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.evaluate = evaluate
+        self.reuse = reuse
+        self.pruner = pruner
+        self.endgame_cells = endgame_cells
+        self.searcher = None
+        self.cancel = None
+        self.__name__ = '{}_search_strategy'.format(method)
+
+    def __call__(self, game: Any) -> Any:
+        """
+        Return a move for game.
+        """
+        searcher = self.searcher
+        if searcher is None or searcher.game is not game or not self.reuse:
+            searcher = self.searcher = Searcher(game, self.evaluate,
+                                                method=self.method,
+                                                pruner=self.pruner)
+        else:
+            searcher.reroot()
+        searcher.cancel = self.cancel
+        if self.time_budget is None and self.max_depth is None:
+            searcher.deadline = None
+            return searcher.search(game.current_state, FULL_DEPTH)[0]
+        time_budget = self.time_budget if self.time_budget is not None \
+            else float('inf')
+        return iterative_deepening(game, time_budget, self.max_depth,
+                                   endgame_cells=self.endgame_cells,
+                                   searcher=searcher).move
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,1103 @@
+"""
+Unittests for the depth-limited searches in search.py.
+
+Like minimax_unittest_basic.py, these only test basic functionality: that
+the searches find the winning moves of small games and respect their limits.
+"""
+
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+import numpy
+
+from game_interface import playable_games, usable_strategies
+from search import iterative_deepening, Searcher, SearchStrategy, solve, \
+    analyse, METHODS, EXACT, UPPER
+from move_ordering import LeyLineOrderer, MoveOrderer
+from proof_number import prove
+from strategy import rough_outcome_strategy
+import tablebase
+from tablebase import Tablebase
+from tablebase_file import TablebaseFile
+from stonehenge_board import board_layout
+from ranking import ranking_for
+from endgame import solve_endgame, EndgameSolver, ENDGAME_EMPTY_CELLS
+import opening_book
+import mcts
+from mcts import MCTS
+from mcts_pool import PoolMCTS
+from rave import RaveMCTS, equivalence_schedule
+from batch_playout import playout_board, playout_win_rate
+from ponder import PonderingStrategy
+from game_interface import GameInterface
+from strategy import interactive_strategy, iterative_minimax_strategy, \
+    recursive_minimax_strategy
+from heuristic import ley_line_features, ley_line_evaluation, \
+    make_heuristic_strategy, load_weights
+from tune import batch_features, tune
+from stack_search import StackSearch, FrameStack, STACK_METHODS, MEMOIZED
+from pruning import LeyLinePruner, forced_moves, dead_cells, \
+    without_dead_cells, decided_outcome
+from parallel import parallel_minimax, encode, decode, frontier
+StonehengeGame = playable_games['h']
+SubtractSquareGame = playable_games['s']
+
+
+def stonehenge_after(size, p1_starts, moves):
+    """
+    Return a Stonehenge game of size after moves have been made.
+    """
+    game = StonehengeGame(p1_starts, size)
+    for move in moves:
+        game.current_state = game.current_state.make_move(move)
+    return game
+
+
+class IterativeDeepeningUnitTests(unittest.TestCase):
+    def test_subtract_square_18(self):
+        """
+        Test that iterative deepening proves the win in SubtractSquare 18.
+        """
+        game = SubtractSquareGame(True, 18)
+        result = iterative_deepening(game)
+        self.assertIn(result.move, [1, 16])
+        self.assertEqual(result.score, 1)
+        self.assertTrue(result.exact)
+        self.assertEqual(result.pv[0], result.move)
+
+    def test_stonehenge_one_winning_move_not_immediate(self):
+        """
+        Test that iterative deepening finds the only winning move on a size
+        2 board, and that the principal variation starts with it.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        result = iterative_deepening(game)
+        self.assertEqual(result.move, 'E')
+        self.assertEqual(result.pv[0], 'E')
+        self.assertTrue(result.exact)
+
+    def test_time_budget(self):
+        """
+        Test that a search on a size 4 board, which cannot be finished,
+        returns a legal move within its time budget.
+        """
+        game = StonehengeGame(True, 4)
+        start = time.perf_counter()
+        result = iterative_deepening(game, time_budget=0.5)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn(result.move, game.current_state.get_possible_moves())
+        self.assertFalse(result.exact)
+        self.assertGreaterEqual(result.depth, 1)
+
+    def test_max_depth(self):
+        """
+        Test that the search stops at max_depth.
+        """
+        game = StonehengeGame(True, 3)
+        result = iterative_deepening(game, max_depth=2, endgame_cells=None)
+        self.assertEqual(result.depth, 2)
+
+    def test_game_over(self):
+        """
+        Test that a finished game gives no move and its final score, both
+        from iterative deepening and from solve.
+        """
+        for search in (iterative_deepening, solve):
+            result = search(SubtractSquareGame(True, 0))
+            self.assertEqual((result.move, result.score, result.pv),
+                             (None, -1, []))
+            self.assertTrue(result.exact)
+
+    def test_registered(self):
+        """
+        Test that iterative deepening can be chosen in game_interface.
+        """
+        game = SubtractSquareGame(True, 4)
+        self.assertEqual(usable_strategies['id'](game), 4)
+
+
+class MoveOrderingUnitTests(unittest.TestCase):
+    def test_claiming_move_first(self):
+        """
+        Test that the only move that claims the winning ley line is ordered
+        first on a size 3 board.
+        """
+        game = stonehenge_after(3, False, ['K', 'A', 'C', 'B', 'F', 'E', 'G',
+                                           'D', 'I'])
+        state = game.current_state
+        ordered = LeyLineOrderer().order(state, state.get_possible_moves(),
+                                         None, 1)
+        self.assertEqual(ordered[0], 'H')
+
+    def test_hash_killer_history(self):
+        """
+        Test that the hash move comes first, then killers of the ply, then
+        moves by history score.
+        """
+        orderer = MoveOrderer()
+        state = SubtractSquareGame(True, 20).current_state
+        orderer.cutoff(4, 3, 2)
+        orderer.cutoff(9, 5, 1)
+        ordered = orderer.order(state, state.get_possible_moves(), 16, 3)
+        self.assertEqual(ordered, [16, 4, 9, 1])
+
+    def test_ordering_keeps_result(self):
+        """
+        Test that move ordering changes how many states are searched but not
+        the score.
+        """
+        game = stonehenge_after(3, True, ['A', 'L'])
+        scores, nodes = [], []
+        for orderer in (MoveOrderer(False, False, False), LeyLineOrderer()):
+            searcher = Searcher(game, orderer=orderer)
+            scores.append(searcher.search_root(game.current_state, 10)[1])
+            nodes.append(searcher.nodes)
+        self.assertEqual(scores[0], scores[1])
+        self.assertLess(nodes[1], nodes[0])
+
+
+class NullWindowUnitTests(unittest.TestCase):
+    def test_methods_agree(self):
+        """
+        Test that alpha-beta, principal variation search and MTD(f) find
+        the same score for a Stonehenge position and SubtractSquare 30.
+        """
+        for make_game in (lambda: stonehenge_after(3, True, ['A', 'B']),
+                          lambda: SubtractSquareGame(True, 30)):
+            scores = [solve(make_game(), method).score for method in METHODS]
+            self.assertEqual(len(set(scores)), 1)
+
+    def test_strategies(self):
+        """
+        Test that the null-window strategies find the only winning move.
+        """
+        for name in ('ab', 'pvs', 'mtd'):
+            game = stonehenge_after(2, True, ['A', 'F', 'D'])
+            self.assertEqual(usable_strategies[name](game), 'E')
+            game = SubtractSquareGame(True, 18)
+            self.assertIn(usable_strategies[name](game), [1, 16])
+
+
+class ProofNumberUnitTests(unittest.TestCase):
+    def test_proves_win(self):
+        """
+        Test that df-pn proves the wins of SubtractSquare 18 and of a size 2
+        Stonehenge board with only one winning move.
+        """
+        result = prove(SubtractSquareGame(True, 18))
+        self.assertEqual(result.value, 1)
+        self.assertIn(result.move, [1, 16])
+        result = prove(stonehenge_after(2, True, ['A', 'F', 'D']))
+        self.assertEqual(result.value, 1)
+        self.assertEqual(result.move, 'E')
+        self.assertGreater(result.proof_size, 1)
+
+    def test_proves_loss(self):
+        """
+        Test that df-pn agrees with alpha-beta on a lost position.
+        """
+        game = stonehenge_after(3, True, ['A'])
+        self.assertEqual(prove(game).value, solve(game).score)
+        self.assertEqual(prove(game).value, -1)
+
+    def test_budget_fallback(self):
+        """
+        Test that the search gives up when the node budget runs out, and
+        that the strategy plays the rough outcome move when it has no
+        winning move.
+        """
+        result = prove(StonehengeGame(True, 4), max_nodes=1)
+        self.assertIsNone(result.value)
+        game = stonehenge_after(3, True, ['A'])
+        self.assertEqual(usable_strategies['pn'](game),
+                         rough_outcome_strategy(game))
+
+
+class TablebaseUnitTests(unittest.TestCase):
+    def test_agrees_with_search(self):
+        """
+        Test that the size 2 tablebase has the values alpha-beta finds.
+        """
+        table = Tablebase.build(2)
+        self.assertEqual(len(table.entries), sum(table.layer_sizes))
+        for moves in ([], ['A'], ['D', 'A'], ['A', 'F', 'D']):
+            game = stonehenge_after(2, True, moves)
+            value, move = table.probe(game.current_state)
+            self.assertEqual(value, solve(game).score)
+        self.assertEqual(move, 'E')
+
+    def test_strategy(self):
+        """
+        Test that the tablebase strategy finds the only winning move.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        self.assertEqual(usable_strategies['tb'](game), 'E')
+
+
+class TablebaseFileUnitTests(unittest.TestCase):
+    def test_file_matches_table(self):
+        """
+        Test that a tablebase file has the value of every position of the
+        size 2 tablebase and nothing at other indices.
+        """
+        table = Tablebase.build(2)
+        layout = board_layout(2)
+        ranking = ranking_for(2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stonehenge-2.gtb')
+            table.write_file(path)
+            with TablebaseFile(path, cache_blocks=2) as table_file:
+                indices = set()
+                for packed, entry in table.entries.items():
+                    index = ranking.rank(layout.unpack(packed))
+                    indices.add(index)
+                    self.assertEqual(table_file.value(index), entry % 3 - 1)
+                self.assertEqual(len(indices), len(table.entries))
+                missing = set(range(ranking.count)) - indices
+                self.assertTrue(all(table_file.value(index) is None
+                                    for index in missing))
+                self.assertLessEqual(len(table_file._cache), 2)
+
+    def test_strategy_uses_files(self):
+        """
+        Test that tablebase_strategy plays from tablebase files.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            tablebase.write_tablebase_files(directory, (2,), 100)
+            with patch('tablebase.TABLEBASE_DIR', directory):
+                game = stonehenge_after(2, True, ['A', 'F', 'D'])
+                self.assertEqual(tablebase.file_move(game.current_state), 'E')
+                game = SubtractSquareGame(True, 18)
+                self.assertIn(usable_strategies['tb'](game), [1, 16])
+            for table_file in tablebase._files.values():
+                if table_file is not None:
+                    table_file.close()
+            tablebase._files.clear()
+
+
+class AnalysisUnitTests(unittest.TestCase):
+    def test_exact_scores(self):
+        """
+        Test that the analysis gives every move the score of solving the
+        state after it, best first, each with a line starting with it.
+        """
+        game = SubtractSquareGame(True, 20)
+        analysis = analyse(game)
+        state = game.current_state
+        self.assertEqual(sorted(entry.move for entry in analysis),
+                         sorted(state.get_possible_moves()))
+        for entry in analysis:
+            child = SubtractSquareGame(True, 20)
+            child.current_state = state.make_move(entry.move)
+            self.assertEqual(entry.flag, EXACT)
+            self.assertEqual(entry.score, -solve(child).score)
+            self.assertEqual(entry.pv[0], entry.move)
+        scores = [entry.score for entry in analysis]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_bounded(self):
+        """
+        Test that a bounded analysis finds the winning cell with an exact
+        score, and bounds the others from above.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        analysis = analyse(game, bounded=True)
+        self.assertEqual((analysis[0].move, analysis[0].score,
+                          analysis[0].flag), ('E', 1, EXACT))
+        exact = {entry.move: entry.score for entry in analyse(game)}
+        for entry in analysis[1:]:
+            self.assertLessEqual(exact[entry.move], entry.score)
+            self.assertIn(entry.flag, (EXACT, UPPER))
+
+    def test_bounded_losing_moves(self):
+        """
+        Test that a bounded analysis gives every move that ties the best
+        its exact score, and every other move a bound below the best score,
+        so no losing move looks like a win.
+        """
+        for total in (20, 40):
+            game = SubtractSquareGame(True, total)
+            exact = {entry.move: entry.score for entry in analyse(game)}
+            best = max(exact.values())
+            for entry in analyse(game, bounded=True):
+                if exact[entry.move] == best:
+                    self.assertEqual((entry.score, entry.flag), (best, EXACT))
+                else:
+                    self.assertLess(entry.score, best)
+                    self.assertLessEqual(exact[entry.move], entry.score)
+                    if entry.flag == EXACT:
+                        self.assertEqual(entry.score, exact[entry.move])
+
+
+class SearchStrategyUnitTests(unittest.TestCase):
+    def test_reuse(self):
+        """
+        Test that a strategy that keeps its table between moves plays a
+        best move every turn, and searches less after its first move.
+        """
+        game = SubtractSquareGame(True, 60)
+        strategy = SearchStrategy()
+        nodes = []
+        while not game.is_over(game.current_state):
+            move = strategy(game)
+            nodes.append(strategy.searcher.nodes)
+            best = solve(game).score
+            game.current_state = game.current_state.make_move(move)
+            self.assertEqual(-solve(game).score if
+                             not game.is_over(game.current_state) else best,
+                             best)
+        self.assertLess(max(nodes[1:]), nodes[0])
+
+    def test_endgame_solver(self):
+        """
+        Test that a strategy with a time budget hands endgames to the
+        endgame solver, unless told not to.
+        """
+        game = stonehenge_after(2, True, ['A', 'F'])
+        for endgame_cells, called in ((ENDGAME_EMPTY_CELLS, True),
+                                      (None, False)):
+            strategy = SearchStrategy(time_budget=1.0,
+                                      endgame_cells=endgame_cells)
+            with patch('search.solve_endgame',
+                       wraps=solve_endgame) as solver:
+                move = strategy(game)
+            self.assertEqual(solver.called, called)
+            self.assertEqual(move, solve_endgame(game.current_state)[0])
+
+    def test_reroot_drops_unreached(self):
+        """
+        Test that after rerooting, the table only holds entries of states
+        the game can still reach, and the entries of the old table that the
+        search did not reach are the only ones left to drop.
+        """
+        game = SubtractSquareGame(True, 30)
+        strategy = SearchStrategy()
+        move = strategy(game)
+        searcher = strategy.searcher
+        first_table = set(searcher.table)
+        game.current_state = game.current_state.make_move(move).make_move(1)
+        strategy(game)
+        self.assertIs(strategy.searcher, searcher)
+        total = game.current_state.current_total
+        for key in searcher.table:
+            self.assertLessEqual(int(key.split()[-1]), total)
+        self.assertEqual(set(searcher.table) | set(searcher.previous),
+                         first_table | set(searcher.table))
+        self.assertIs(usable_strategies['abr'].__class__, SearchStrategy)
+
+
+class PonderUnitTests(unittest.TestCase):
+    def test_same_moves(self):
+        """
+        Test that a strategy that ponders while the human moves plays the
+        same moves as one that does not, answering from its cache.
+        """
+        game = SubtractSquareGame(True, 45)
+        pondering = PonderingStrategy(SearchStrategy())
+        plain = SearchStrategy()
+        human = random_strategy(0)
+        while not game.is_over(game.current_state):
+            move = pondering(game)
+            self.assertEqual(move, plain(game))
+            game.current_state = game.current_state.make_move(move)
+            if game.is_over(game.current_state):
+                break
+            pondering.ponder(game)
+            pondering._worker.join()
+            game.current_state = game.current_state.make_move(human(game))
+        self.assertGreater(pondering.hits, 0)
+
+    def test_cancel(self):
+        """
+        Test that stopping cancels a long ponder at once, and that the move
+        is then the same as without pondering.
+        """
+        game = stonehenge_after(3, True, ['A'])
+        pondering = PonderingStrategy(SearchStrategy())
+        pondering.ponder(game)
+        time.sleep(0.05)
+        start = time.perf_counter()
+        pondering.stop()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        game.current_state = game.current_state.make_move('B')
+        self.assertEqual(pondering(game), SearchStrategy()(game))
+
+    def test_game_interface(self):
+        """
+        Test that GameInterface lets the computer ponder while the human
+        types in moves.
+        """
+        strategy = SearchStrategy()
+
+        def human_input(prompt):
+            """
+            Answer the prompts of a game of Subtract Square 30 in which the
+            human always subtracts 1, slowly.
+            """
+            if prompt.startswith('Type y'):
+                return 'y'
+            if prompt.startswith('Enter the number'):
+                return '30'
+            time.sleep(0.2)
+            return '1'
+        with patch('builtins.input', side_effect=human_input), \
+                patch('builtins.print'):
+            interface = GameInterface(SubtractSquareGame,
+                                      interactive_strategy, strategy, True)
+            interface.play()
+        self.assertGreater(interface.p2_strategy.hits, 0)
+
+
+def random_strategy(seed):
+    """
+    Return a strategy that plays random moves, chosen with random seed
+    seed.
+    """
+    rng = random.Random(seed)
+    return lambda game: rng.choice(game.current_state.get_possible_moves())
+
+
+class IterativeMinimaxUnitTests(unittest.TestCase):
+    def test_same_as_recursive(self):
+        """
+        Test that the stack-based minimax picks the same moves as the
+        recursive one, and leaves the game as it was.
+        """
+        for total in range(1, 30):
+            game = SubtractSquareGame(total % 2 == 0, total)
+            state = game.current_state
+            self.assertEqual(iterative_minimax_strategy(game),
+                             recursive_minimax_strategy(game))
+            self.assertIs(game.current_state, state)
+        for moves in ([], ['A'], ['B', 'C'], ['A', 'G', 'D']):
+            game = stonehenge_after(2, True, moves)
+            self.assertEqual(iterative_minimax_strategy(game),
+                             recursive_minimax_strategy(game))
+
+    def test_memory(self):
+        """
+        Test that the peak memory of the stack-based minimax stays small.
+        """
+        game = SubtractSquareGame(True, 25)
+        tracemalloc.start()
+        iterative_minimax_strategy(game)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertLess(peak, 200000)
+
+
+class StackSearchUnitTests(unittest.TestCase):
+    def test_same_as_recursive(self):
+        """
+        Test that every method on the frame stack picks the move of the
+        recursive minimax and the score of a full search.
+        """
+        games = [SubtractSquareGame(total % 2 == 0, total)
+                 for total in range(1, 26)]
+        games += [stonehenge_after(2, True, moves)
+                  for moves in ([], ['A'], ['B', 'C'], ['A', 'G', 'D'])]
+        for game in games:
+            state = game.current_state
+            expected = recursive_minimax_strategy(game)
+            score = solve(game).score
+            for method in STACK_METHODS:
+                self.assertEqual(StackSearch(game, method).search(state),
+                                 (expected, score))
+            self.assertIs(game.current_state, state)
+
+    def test_deeper_than_recursion_limit(self):
+        """
+        Test that a game longer than the recursion limit is searched, the
+        stack growing as it needs to.
+        """
+        game = SubtractSquareGame(True, 3000)
+        search = StackSearch(game, MEMOIZED, capacity=16)
+        self.assertIn(search.search(game.current_state)[1], (-1, 1))
+        self.assertGreaterEqual(search.max_height, 3000)
+        self.assertGreaterEqual(search.frames.capacity(), 3000)
+        self.assertEqual(search.frames.height, 0)
+
+    def test_frame_stack(self):
+        """
+        Test that a popped frame lets go of its state and moves.
+        """
+        frames = FrameStack(1)
+        frames.push('a', [1], -2, 2)
+        frames.push('b', [2, 3], -2, 2)
+        self.assertEqual((frames.height, frames.capacity()), (2, 2))
+        frames.pop()
+        self.assertEqual((frames.states[1], frames.moves[1]), (None, None))
+        self.assertEqual(frames.moves[0], [1])
+
+
+def wins_at_once(state):
+    """
+    Return whether the player to move in state can win with one move.
+    """
+    player = state.get_current_player_name()
+    return any(state.make_move(move).has_ley_line(player) >=
+               1.5 * (state.size + 1) for move in state.get_possible_moves())
+
+
+class PruningUnitTests(unittest.TestCase):
+    def test_forced_moves(self):
+        """
+        Test that the forced moves are exactly the moves after which the
+        opponent cannot win at once, on random games of sizes 2 and 3.
+        """
+        rng = random.Random(0)
+        for size in (2, 3) * 20:
+            state = StonehengeGame(True, size).current_state
+            while state.get_possible_moves():
+                moves = state.get_possible_moves()
+                forced = forced_moves(state, moves)
+                for move in moves:
+                    child = state.make_move(move)
+                    loses = bool(child.get_possible_moves()) and \
+                        wins_at_once(child)
+                    self.assertEqual(move in forced, not loses)
+                state = state.make_move(rng.choice(moves))
+
+    def test_same_score(self):
+        """
+        Test that pruning keeps the score of a full search and cuts nodes.
+        """
+        for moves in ([], ['A'], ['A', 'F', 'D'], ['B', 'C', 'G']):
+            game = stonehenge_after(2, True, moves)
+            full = solve(game)
+            pruned = solve(game, pruner=LeyLinePruner())
+            self.assertEqual(pruned.score, full.score)
+            self.assertLessEqual(pruned.nodes, full.nodes)
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        self.assertEqual(solve(game, pruner=LeyLinePruner()).move, 'E')
+        strategy = SearchStrategy(pruner=LeyLinePruner())
+        self.assertEqual(strategy(game), 'E')
+
+    def test_lost_position(self):
+        """
+        Test that a position where every move lets the opponent win is
+        scored as lost without searching its moves.
+        """
+        game = stonehenge_after(2, True, ['G', 'D', 'E'])
+        searcher = Searcher(game, pruner=LeyLinePruner())
+        self.assertEqual(searcher.alphabeta(game.current_state, 5, -2, 2),
+                         -1)
+        self.assertEqual(searcher.nodes, 1)
+        self.assertEqual(solve(game, pruner=LeyLinePruner()).score, -1)
+
+    def test_dead_cells(self):
+        """
+        Test that only the first dead cell is searched, and that searches
+        from positions with dead cells keep their scores.
+        """
+        game = stonehenge_after(3, True, list('HKFECBL'))
+        state = game.current_state
+        self.assertEqual(dead_cells(state), ['A', 'I'])
+        self.assertEqual(without_dead_cells(state, ['I', 'D', 'A']),
+                         ['I', 'D'])
+        pruner = LeyLinePruner(use_forced_moves=False)
+        for moves in ('HKFECBL', 'HKFECB', 'HKFEC'):
+            game = stonehenge_after(3, True, list(moves))
+            self.assertEqual(solve(game, pruner=pruner).score,
+                             solve(game).score)
+
+
+    def test_decided_outcome(self):
+        """
+        Test that a decided outcome is the solved score of the position and
+        that its move keeps that score, on random games of size 2.
+        """
+        rng = random.Random(0)
+        solver = EndgameSolver(2)
+        layout = board_layout(2)
+        decided = 0
+        for _ in range(30):
+            state = StonehengeGame(True, 2).current_state
+            while state.get_possible_moves():
+                moves = state.get_possible_moves()
+                outcome = decided_outcome(state, moves)
+                if outcome is not None:
+                    decided += 1
+                    position = layout.from_state(state)
+                    child = layout.play(position,
+                                        layout.cells.index(outcome[1]))
+                    self.assertEqual(solver.solve(position)[0], outcome[0])
+                    self.assertEqual(-solver.solve(child)[0], outcome[0])
+                state = state.make_move(rng.choice(moves))
+        self.assertGreater(decided, 0)
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        pruner = LeyLinePruner(use_forced_moves=False, use_dead_cells=False)
+        self.assertEqual(solve(game, pruner=pruner).move, 'E')
+
+    def test_decided_at_horizon(self):
+        """
+        Test that a decided position is scored as lost even at the horizon,
+        where the evaluation alone gives a score strictly between LOSE and
+        WIN.
+        """
+        game = stonehenge_after(2, True, 'GBDFA')
+        state = game.current_state
+        plain = Searcher(game, ley_line_evaluation())
+        self.assertLess(abs(plain.alphabeta(state, 0, -2, 2)), 1)
+        for depth in (0, 1):
+            searcher = Searcher(game, ley_line_evaluation(),
+                                pruner=LeyLinePruner())
+            self.assertEqual(searcher.alphabeta(state, depth, -2, 2), -1)
+        self.assertEqual(searcher.search(state, 1), ('C', -1))
+
+
+def children_outcomes(state):
+    """
+    Return the rough_outcome of each child of state, one child at a time.
+    """
+    return [state.make_move(move).rough_outcome()
+            for move in state.get_possible_moves()]
+
+
+class EvaluateChildrenUnitTests(unittest.TestCase):
+    def test_stonehenge(self):
+        """
+        Test that scoring the children together gives their rough outcomes
+        on random games of sizes 1 to 3, both players starting.
+        """
+        rng = random.Random(0)
+        for size in (1, 2, 3) * 6:
+            state = StonehengeGame(rng.random() < 0.5, size).current_state
+            while state.get_possible_moves():
+                self.assertEqual(state.evaluate_children(),
+                                 children_outcomes(state))
+                state = state.make_move(
+                    rng.choice(state.get_possible_moves()))
+
+    def test_subtract_square(self):
+        """
+        Test that scoring the children together gives their rough outcomes,
+        and that rough_outcome_strategy still picks the same moves.
+        """
+        for total in range(120):
+            game = SubtractSquareGame(total % 2 == 0, total)
+            state = game.current_state
+            self.assertEqual(state.evaluate_children(),
+                             children_outcomes(state))
+            if state.get_possible_moves():
+                outcomes = children_outcomes(state)
+                self.assertEqual(
+                    rough_outcome_strategy(game),
+                    state.get_possible_moves()[outcomes.index(
+                        min(outcomes))])
+
+
+class ParallelUnitTests(unittest.TestCase):
+    def test_same_as_recursive(self):
+        """
+        Test that root-split minimax picks the move of the recursive minimax
+        and the score of a full search, on worker processes and in this
+        process, with frontiers one and two moves deep.
+        """
+        games = [SubtractSquareGame(total % 2 == 0, total)
+                 for total in range(1, 26)]
+        games += [stonehenge_after(2, True, moves)
+                  for moves in ([], ['A'], ['B', 'C'])]
+        with ProcessPoolExecutor(2) as pool:
+            for game in games:
+                expected = recursive_minimax_strategy(game)
+                score = solve(game).score
+                for depth in (1, 2):
+                    for workers in (0, 2):
+                        result = parallel_minimax(game, workers, depth, pool)
+                        self.assertEqual((result.move, result.score),
+                                         (expected, score))
+
+    def test_frontier_depth(self):
+        """
+        Test that a frontier less than one move deep is refused, and that
+        tasks left once the move is settled are not solved.
+        """
+        game = SubtractSquareGame(True, 40)
+        with self.assertRaises(ValueError):
+            parallel_minimax(game, 0, 0)
+        result = parallel_minimax(game, 0, 1)
+        self.assertEqual((result.move, result.tasks, result.cancelled),
+                         (1, 1, 5))
+
+    def test_cancelled_tasks(self):
+        """
+        Test that every frontier state is either solved or never started,
+        so that no task is left running on the pool after the search.
+        """
+        game = stonehenge_after(2, True, [])
+        with ProcessPoolExecutor(2) as pool:
+            for depth in (1, 2):
+                result = parallel_minimax(game, 2, depth, pool)
+                found = {}
+                state = game.current_state
+                for move in state.get_possible_moves():
+                    frontier(state.make_move(move), depth - 1, found)
+                self.assertEqual(result.tasks + result.cancelled, len(found))
+                self.assertGreaterEqual(result.tasks, 1)
+                self.assertGreaterEqual(result.wall_seconds,
+                                        result.leftover_seconds)
+
+    def test_encoding(self):
+        """
+        Test that a state decodes to a game in the same state.
+        """
+        states = [stonehenge_after(3, False, 'AJE').current_state,
+                  SubtractSquareGame(False, 37).current_state]
+        for state in states:
+            game = decode(encode(state))
+            self.assertEqual(game.current_state.key(), state.key())
+            self.assertEqual(game.current_state.p1_turn, state.p1_turn)
+
+
+class EndgameUnitTests(unittest.TestCase):
+    def test_matches_solve(self):
+        """
+        Test that the endgame solver agrees with a full search.
+        """
+        for moves in [[], ['A'], ['A', 'F', 'D'], ['B', 'C']]:
+            game = stonehenge_after(2, True, moves)
+            result = solve_endgame(game.current_state)
+            self.assertEqual(result[1], solve(game).score)
+            self.assertIn(result[0], game.current_state.get_possible_moves())
+
+    def test_switch(self):
+        """
+        Test that iterative deepening switches to the endgame solver at the
+        threshold and not before.
+        """
+        game = stonehenge_after(4, True, ['A', 'B', 'C', 'D', 'E', 'F'])
+        result = iterative_deepening(game, max_depth=2, endgame_cells=11)
+        self.assertEqual(result.depth, 2)
+        result = iterative_deepening(game, max_depth=2, endgame_cells=12)
+        self.assertTrue(result.exact)
+        self.assertEqual(result.move, result.pv[0])
+
+
+class OpeningBookUnitTests(unittest.TestCase):
+    def test_build_and_resume(self):
+        """
+        Test that a stopped build is resumed without searching the
+        positions already in the book file again.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'book')
+            first = opening_book.build_book(2, 1, path, 0.01)
+            self.assertEqual(len(first.moves), 2)
+            with open(path, 'ab') as file:
+                file.write(b'\x01\x02')
+            with patch('opening_book._search_position',
+                       wraps=opening_book._search_position) as search:
+                book = opening_book.build_book(2, 2, path, 0.01)
+            positions = opening_book.opening_positions(2, 2)
+            self.assertEqual(search.call_count, len(positions) - 2)
+            self.assertEqual(opening_book.OpeningBook.load(path).moves,
+                             book.moves)
+            self.assertEqual(len(book.moves), len(positions))
+
+    def test_with_book(self):
+        """
+        Test that the book wrapper plays book moves and asks the wrapped
+        strategy otherwise.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, opening_book.book_file_name(2))
+            book = opening_book.build_book(2, 1, path, 0.01)
+            strategy = opening_book.with_book(lambda game: 'fallback')
+            with patch('opening_book.BOOK_DIR', directory):
+                game = StonehengeGame(True, 2)
+                layout = board_layout(2)
+                code = layout.pack(layout.start(True))
+                self.assertEqual(strategy(game),
+                                 layout.cells[book.moves[code]])
+                game = stonehenge_after(2, True, ['A'])
+                self.assertEqual(strategy(game), 'fallback')
+            opening_book._books.clear()
+
+
+class MCTSUnitTests(unittest.TestCase):
+    def test_finds_win(self):
+        """
+        Test that MCTS finds the only winning move of a small position.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        self.assertEqual(MCTS(game, seed=0).search(iterations=2000), 'E')
+        game = SubtractSquareGame(True, 18)
+        self.assertIn(MCTS(game, seed=0).search(iterations=500), [1, 16])
+
+    def test_reroot(self):
+        """
+        Test that the tree under the move played is kept.
+        """
+        game = StonehengeGame(True, 2)
+        search = MCTS(game, seed=0)
+        move = search.search(iterations=200)
+        child = [node for node in search.root.children
+                 if node.move == move][0]
+        visits, size = child.visits, child.size()
+        self.assertTrue(search.reroot(game.current_state.make_move(move)))
+        self.assertIs(search.root, child)
+        self.assertIsNone(child.parent)
+        self.assertEqual((search.root.visits, search.root.size()),
+                         (visits, size))
+
+    def test_registered(self):
+        """
+        Test that MCTS can be chosen in game_interface and keeps its tree
+        between turns.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        with patch('mcts.DEFAULT_TIME_BUDGET', 0.2):
+            self.assertEqual(usable_strategies['mc'](game), 'E')
+            tree = mcts._trees[id(game)]
+            game.current_state = game.current_state.make_move('E')
+            self.assertEqual(tree.root.state.key(), game.current_state.key())
+        mcts._trees.clear()
+
+
+def pool_tree_size(pool, root):
+    """
+    Return the number of nodes of pool under root, checking that every
+    child links back to its parent and has at most its parent's visits.
+    """
+    size, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        size += 1
+        for child in pool.children(node):
+            assert pool.parent[child] == node
+            assert pool.visits[child] <= pool.visits[node]
+            stack.append(child)
+    return size
+
+
+class NodePoolUnitTests(unittest.TestCase):
+    def test_finds_win(self):
+        """
+        Test that MCTS on a node pool finds the only winning move.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        search = PoolMCTS(game, 1000, seed=0)
+        self.assertEqual(search.search(iterations=2000), 'E')
+
+    def test_recycle(self):
+        """
+        Test that a full pool recycles nodes and keeps a tree whose nodes
+        can all be reached from the root.
+        """
+        game = StonehengeGame(True, 3)
+        search = PoolMCTS(game, 300, seed=0)
+        search.search(iterations=3000)
+        pool = search.pool
+        self.assertGreater(pool.recycled, 0)
+        self.assertEqual(pool_tree_size(pool, search.root), pool.used())
+
+    def test_pool_size(self):
+        """
+        Test that a pool without room for a node besides the root is
+        refused, and that the smallest pool still searches.
+        """
+        game = StonehengeGame(True, 2)
+        for pool_size in (0, 1):
+            with self.assertRaises(ValueError):
+                PoolMCTS(game, pool_size)
+        search = PoolMCTS(game, 2, seed=0)
+        self.assertIn(search.search(iterations=200),
+                      game.current_state.get_possible_moves())
+
+    def test_reroot(self):
+        """
+        Test that rerooting keeps exactly the subtree of the move played.
+        """
+        game = StonehengeGame(True, 3)
+        search = PoolMCTS(game, 5000, seed=0)
+        move = search.search(iterations=500)
+        child = [node for node in search.pool.children(search.root)
+                 if search.pool.move[node] ==
+                 board_layout(3).cells.index(move)][0]
+        visits = search.pool.visits[child]
+        self.assertTrue(search.reroot(game.current_state.make_move(move)))
+        self.assertEqual(search.root, child)
+        self.assertEqual(search.pool.visits[search.root], visits)
+        self.assertEqual(pool_tree_size(search.pool, search.root),
+                         search.pool.used())
+
+
+class RaveUnitTests(unittest.TestCase):
+    def test_finds_win(self):
+        """
+        Test that MCTS with RAVE finds the only winning move.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        self.assertEqual(RaveMCTS(game, seed=0).search(iterations=500), 'E')
+
+    def test_amaf(self):
+        """
+        Test that the root's AMAF statistics count each move of the player
+        to move once per iteration they play it in.
+        """
+        game = StonehengeGame(True, 2)
+        search = RaveMCTS(game, seed=0)
+        search.search(iterations=50)
+        counts = [entry[0] for entry in search.root.amaf.values()]
+        self.assertTrue(all(0 < count <= 50 for count in counts))
+        first_moves = sum(child.visits for child in search.root.children)
+        self.assertGreater(sum(counts), first_moves)
+
+    def test_beta_schedule(self):
+        """
+        Test that beta starts at 1 and falls as visits grow.
+        """
+        beta = equivalence_schedule(100)
+        self.assertEqual(beta(0), 1)
+        self.assertGreater(beta(10), beta(1000))
+
+
+class BatchPlayoutUnitTests(unittest.TestCase):
+    def test_matches_exact_rate(self):
+        """
+        Test that batch playouts win as often as uniformly random play does
+        on size 2, worked out exactly.
+        """
+        layout = board_layout(2)
+        rates = {}
+
+        def exact(position):
+            if position not in rates:
+                moves = layout.moves(position)
+                if not moves:
+                    rates[position] = (layout.score(position) + 1) / 2
+                else:
+                    rates[position] = sum(
+                        1 - exact(layout.play(position, cell))
+                        for cell in moves) / len(moves)
+            return rates[position]
+        start = layout.play(layout.start(False), 2)
+        rate = playout_win_rate(2, start, 40000, numpy.random.default_rng(0))
+        self.assertAlmostEqual(rate, exact(start), delta=0.01)
+
+    def test_batch_of_positions(self):
+        """
+        Test that a batch of different positions is played to the end, and
+        that finished games keep their winner.
+        """
+        board = playout_board(2)
+        layout = board.layout
+        won = layout.start(True)
+        while layout.moves(won):
+            won = layout.play(won, layout.moves(won)[0])
+        cells, claims, mover = board.encode(
+            (won, layout.start(True), layout.play(layout.start(False), 3)))
+        before = cells.copy()
+        winner = board.play_out(cells, claims, mover,
+                                numpy.random.default_rng(0))
+        won_mover = 1 if won[2] else 2
+        self.assertEqual(winner[0], won_mover if layout.score(won) == 1
+                         else 3 - won_mover)
+        self.assertTrue(all(winner[1:] > 0))
+        self.assertTrue((cells == before).all())
+
+
+class HeuristicUnitTests(unittest.TestCase):
+    def test_features(self):
+        """
+        Test that the features are zero-sum: the opponent of the player to
+        move sees them negated.
+        """
+        game = stonehenge_after(3, True, ['A', 'E', 'B'])
+        state = game.current_state
+        flipped = type(state)(not state.p1_turn, state.h_ley_line, state.dr,
+                          state.dl)
+        for mine, theirs in zip(ley_line_features(state),
+                                ley_line_features(flipped)):
+            self.assertAlmostEqual(mine, -theirs)
+
+    def test_search_finds_claim(self):
+        """
+        Test that a one-move search with the ley-line evaluation takes the
+        winning cell.
+        """
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        strategy = make_heuristic_strategy(1, endgame_cells=-1)
+        self.assertEqual(strategy(game), 'E')
+        self.assertEqual(usable_strategies['hs'](game), 'E')
+
+    def test_evaluation_bounds(self):
+        """
+        Test that evaluations stay strictly between a loss and a win.
+        """
+        evaluate = ley_line_evaluation((100.0, 100.0, 100.0))
+        game = stonehenge_after(3, True, ['A', 'E', 'B', 'C'])
+        self.assertLess(abs(evaluate(game.current_state)), 1)
+
+
+class TuningUnitTests(unittest.TestCase):
+    def test_batch_features(self):
+        """
+        Test that the features of a batch of positions are those of their
+        states one at a time.
+        """
+        board = playout_board(3)
+        layout = board.layout
+        positions = [layout.start(True)]
+        while layout.moves(positions[-1]):
+            moves = layout.moves(positions[-1])
+            positions.append(layout.play(positions[-1],
+                                         moves[len(moves) // 3]))
+        features = batch_features(board, *board.encode(tuple(positions)))
+        for row, position in zip(features, positions):
+            expected = ley_line_features(layout.to_state(position))
+            for got, want in zip(row, expected):
+                self.assertAlmostEqual(float(got), want)
+
+    def test_tune(self):
+        """
+        Test that tuning writes weights that the heuristic strategy can load
+        and that fit the games better than the weights they were played with.
+        """
+        path = os.path.join(tempfile.mkdtemp(), 'weights.json')
+        result = tune(2, 100, path, batch=64, seed=0)
+        weights = load_weights(path)
+        self.assertEqual(weights, result.weights)
+        self.assertLessEqual(result.log_loss, result.start_log_loss)
+        game = stonehenge_after(2, True, ['A', 'F', 'D'])
+        self.assertEqual(make_heuristic_strategy(1, weights, -1)(game), 'E')
+
+
+class RankingUnitTests(unittest.TestCase):
+    def test_bijection(self):
+        """
+        Test that unrank undoes rank on every rank of size 2 and that every
+        reachable position has its own rank.
+        """
+        ranking = ranking_for(2)
+        for rank in range(ranking.count):
+            self.assertEqual(ranking.rank(ranking.unrank(rank)), rank)
+        layout = board_layout(2)
+        positions = [layout.unpack(packed)
+                     for packed in Tablebase.build(2).entries]
+        ranks = {ranking.rank(position) for position in positions}
+        self.assertEqual(len(ranks), len(positions))
+
+    def test_rank_many(self):
+        """
+        Test that ranking positions in a batch gives the same ranks as one
+        at a time.
+        """
+        ranking = ranking_for(2)
+        positions = [ranking.unrank(rank)
+                     for rank in range(0, ranking.count, 7)]
+        cells = numpy.array([position[0] for position in positions])
+        claims = numpy.array([position[1] for position in positions])
+        turns = numpy.array([position[2] for position in positions])
+        self.assertEqual(list(ranking.rank_many(cells, claims, turns)),
+                         list(range(0, ranking.count, 7)))
+
+
+if __name__ == "__main__":
+    unittest.main()
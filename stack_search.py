@@ -0,0 +1,254 @@
+"""
+A module for minimax searches that do not recurse.
+
+recursive_minimax_strategy and Searcher.alphabeta call themselves once per
+move, so a game longer than the Python recursion limit (about 1000 moves,
+such as Subtract Square from a few thousand) raises RecursionError. Here
+the same searches run on a FrameStack instead: the path from the root to
+the state being searched is kept in parallel lists, one entry per state on
+the path, allocated up front and doubled when the path gets longer. The
+loop pushes a frame for each child it searches and pops it when the child
+is scored, so the only limit on depth is memory.
+
+A frame is one slot in each of the eight lists, 64 bytes on 64-bit
+CPython, plus the objects it refers to: the state, the list of its moves
+(56 bytes and 8 per move, plus the moves themselves unless they are small
+ints or strings that are shared) and, for MEMOIZED, the key of the state.
+The scores are shared objects. The moves dominate: a Subtract Square frame
+at a total of 20000 takes about 4.6 kB, nearly all of it the 141 squares
+it can subtract, so a path of 10000 moves from there needs about 46 MB; a
+Stonehenge frame takes a few hundred bytes besides its state.
+
+Three methods are offered:
+
+    MINIMAX    the whole game tree, like recursive_minimax_strategy
+    ALPHABETA  negamax with alpha-beta pruning
+    MEMOIZED   the whole game tree, but each state is scored once and its
+               score cached by key, like a transposition table without
+               bounds
+
+All three pick the first of the best moves in the order of
+get_possible_moves, so they agree with recursive_minimax_strategy.
+"""
+from typing import Any, Dict, List, Tuple
+from game_state import GameState
+from search import terminal_score
+
+MINIMAX = 'minimax'
+ALPHABETA = 'alphabeta'
+MEMOIZED = 'memoized'
+STACK_METHODS = (MINIMAX, ALPHABETA, MEMOIZED)
+
+# Frames a FrameStack holds before it first grows.
+DEFAULT_CAPACITY = 1024
+
+# A score bigger than any real score.
+INFINITY = 2
+
+
+class FrameStack:
+    """
+    The states on the path from the root to the state being searched, in
+    parallel lists with one entry per frame.
+
+    height - the number of frames in use; frame height - 1 is the top
+    states - the state of each frame
+    moves - the moves of the state of each frame
+    next_move - the index in moves of the next move to search
+    best_score - the best score of the children searched so far, for the
+                 player to move in the state
+    best_move - the move of that child
+    alpha - the lower end of the window of the frame
+    beta - the upper end of the window of the frame
+    keys - the key of the state of each frame (MEMOIZED only)
+    """
+    height: int
+    states: List[Any]
+    moves: List[List[Any]]
+    next_move: List[int]
+    best_score: List[float]
+    best_move: List[Any]
+    alpha: List[float]
+    beta: List[float]
+    keys: List[Any]
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """
+        Create an empty stack with room for capacity frames.
+        """
+        self.height = 0
+        self.states = [None] * capacity
+        self.moves = [None] * capacity
+        self.next_move = [0] * capacity
+        self.best_score = [0.0] * capacity
+        self.best_move = [None] * capacity
+        self.alpha = [0.0] * capacity
+        self.beta = [0.0] * capacity
+        self.keys = [None] * capacity
+
+    def capacity(self) -> int:
+        """
+        Return the number of frames the stack has room for.
+
+        >>> FrameStack(8).capacity()
+        8
+        """
+        return len(self.states)
+
+    def push(self, state: GameState, moves: List[Any], alpha: float,
+             beta: float, key: Any = None) -> None:
+        """
+        Add a frame for state, with moves and window alpha, beta, doubling
+        the room of the stack if it is full.
+        """
+        top = self.height
+        if top == len(self.states):
+            for frames in (self.states, self.moves, self.next_move,
+                           self.best_score, self.best_move, self.alpha,
+                           self.beta, self.keys):
+                frames.extend(frames[:1] * top)
+        self.states[top] = state
+        self.moves[top] = moves
+        self.next_move[top] = 0
+        self.best_score[top] = -INFINITY
+        self.best_move[top] = None
+        self.alpha[top] = alpha
+        self.beta[top] = beta
+        self.keys[top] = key
+        self.height = top + 1
+
+    def pop(self) -> None:
+        """
+        Remove the top frame, letting go of its state and moves.
+        """
+        self.height -= 1
+        top = self.height
+        self.states[top] = None
+        self.moves[top] = None
+        self.keys[top] = None
+
+
+class StackSearch:
+    """
+    A search of a game to the end, on a FrameStack.
+
+    game - the game being searched; its current_state is restored after use
+    method - MINIMAX, ALPHABETA or MEMOIZED
+    frames - the frame stack
+    cache - the score of each state searched so far, by key (MEMOIZED)
+    nodes - the number of states visited so far
+    max_height - the most frames that were on the stack at once
+    """
+    game: Any
+    method: str
+    frames: FrameStack
+    cache: Dict[Any, float]
+    nodes: int
+    max_height: int
+
+    def __init__(self, game: Any, method: str = MEMOIZED,
+                 capacity: int = DEFAULT_CAPACITY) -> None:
+        """
+        Create a search of game with method, on a stack with room for
+        capacity frames to start with.
+        """
+        if method not in STACK_METHODS:
+            raise ValueError('unknown search method {!r}'.format(method))
+        self.game = game
+        self.method = method
+        self.frames = FrameStack(capacity)
+        self.cache = {}
+        self.nodes = 0
+        self.max_height = 0
+
+    def search(self, state: GameState) -> Tuple[Any, float]:
+        """
+        Return the best move of state, a state with moves, and its score
+        for the player about to move.
+        """
+        frames, method = self.frames, self.method
+        memoized = method == MEMOIZED
+        pruned = method == ALPHABETA
+        frames.push(state, state.get_possible_moves(), -INFINITY, INFINITY,
+                    state.key() if memoized else None)
+        self.nodes += 1
+        while True:
+            top = frames.height - 1
+            moves = frames.moves[top]
+            index = frames.next_move[top]
+            if index == len(moves) or (
+                    pruned and frames.alpha[top] >= frames.beta[top]):
+                # Every child is scored, or one scored too high for the
+                # opponent to allow: the frame is done.
+                score = frames.best_score[top]
+                if memoized:
+                    self.cache[frames.keys[top]] = score
+                if top == 0:
+                    move = frames.best_move[0]
+                    frames.pop()
+                    return move, score
+                frames.pop()
+                self._add(top - 1, -score)
+                continue
+            frames.next_move[top] = index + 1
+            child = frames.states[top].make_move(moves[index])
+            self.nodes += 1
+            key = child.key() if memoized else None
+            if memoized and key in self.cache:
+                self._add(top, -self.cache[key])
+                continue
+            child_moves = child.get_possible_moves()
+            if not child_moves:
+                self._add(top, -terminal_score(self.game, child))
+                continue
+            frames.push(child, child_moves, -frames.beta[top],
+                        -frames.alpha[top], key)
+            self.max_height = max(self.max_height, frames.height)
+
+    def _add(self, top: int, score: float) -> None:
+        """
+        Take score, the score for the player to move in frame top of the
+        child of its last move searched, into account.
+        """
+        frames = self.frames
+        if score > frames.best_score[top]:
+            frames.best_score[top] = score
+            frames.best_move[top] = frames.moves[top][
+                frames.next_move[top] - 1]
+            if score > frames.alpha[top]:
+                frames.alpha[top] = score
+
+
+def stack_search(game: Any, method: str = MEMOIZED) -> Tuple[Any, float]:
+    """
+    Return the best move of game.current_state and its score for the player
+    about to move, searched to the end of the game with method on a frame
+    stack.
+    """
+    return StackSearch(game, method).search(game.current_state)
+
+
+def stack_minimax_strategy(game: Any) -> Any:
+    """
+    Return the move of minimax for game, without recursion.
+    """
+    return stack_search(game, MINIMAX)[0]
+
+
+def stack_alphabeta_strategy(game: Any) -> Any:
+    """
+    Return the move of alpha-beta search for game, without recursion.
+    """
+    return stack_search(game, ALPHABETA)[0]
+
+
+def stack_memoized_strategy(game: Any) -> Any:
+    """
+    Return the move of memoized minimax for game, without recursion.
+    """
+    return stack_search(game, MEMOIZED)[0]
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
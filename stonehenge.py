@@ -12,12 +12,15 @@ class StonehengeGame(Game):
     Stonehenge game class.
     """
 
-    def __init__(self, p1_starts: bool) -> None:
+    def __init__(self, p1_starts: bool, size: int = None) -> None:
         """
         Initialize this Game, using p1_starts to find who the first player is.
+        The side length is asked for unless size is given.
         """
         Game.__init__(self, p1_starts)
-        self.size = int(input('Please enter side length: '))
+        if size is None:
+            size = int(input('Please enter side length: '))
+        self.size = size
         h = self.game_board_h_ley_line(self.size)
         self.current_state = SGState(self.is_p1_turn,
                                      self.game_board_h_ley_line(self.size),
@@ -397,6 +400,21 @@ class SGState(GameState):
         return 'Current player: p2, player 1 has {} ley line(s), ' \
                'player 2 has {} ley line(s)'.format(p1_ley_line, p2_ley_line)
 
+    def key(self) -> str:
+        """
+        Return a string that identifies this state: whose turn it is, every
+        cell and every ley-line marker. (repr only counts the ley lines.)
+        >>> g = SGState(True, {1: ['A', 'B', '@'], 2: ['C', '@']}, {1: ['A', 'C', '@'], 2: ['B', '@']}, {1: ['A', '@'], 2: ['B', 'C', '@']})
+        >>> g.key()
+        '1AB@C@|@@|@@'
+        """
+        h = self.h_ley_line
+        return '{}{}|{}|{}'.format(
+            self.get_current_player_name()[-1],
+            ''.join(''.join(h[line]) for line in h),
+            ''.join(self.dr[line][-1] for line in self.dr),
+            ''.join(self.dl[line][-1] for line in self.dl))
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
@@ -428,6 +446,86 @@ class SGState(GameState):
                     return self.LOSE
         return self.DRAW
 
+    def evaluate_children(self) -> List[float]:
+        """
+        Return the rough_outcome of the state each move leads to, in the
+        order of get_possible_moves, without making any move.
+
+        rough_outcome of a child makes every move and every reply after it,
+        deep copying the board each time. Here the tallies of the ley lines
+        are counted once, and the stones a move or a reply would add only
+        change the tallies of the three lines through its cell. A child
+        scores WIN if player 1 is to move there and can claim enough lines
+        with one stone, LOSE if it is over or has a move after which its
+        opponent can, and DRAW otherwise, as rough_outcome does.
+
+        >>> state = StonehengeGame(True, 2).current_state.make_move('G')
+        >>> state.evaluate_children() == [
+        ...     state.make_move(move).rough_outcome()
+        ...     for move in state.get_possible_moves()]
+        True
+        """
+        moves = self.get_possible_moves()
+        mover = self.get_current_player_name()[-1]
+        other = '2' if mover == '1' else '1'
+        to_win = 1.5 * (self.size + 1)
+        lines = self.ley_lines()
+        lengths = [len(line) - 1 for line in lines]
+        unclaimed = [line[-1] == '@' for line in lines]
+        counts = {mark: [line[:-1].count(mark) for line in lines]
+                  for mark in (mover, other)}
+        owned = {mark: sum(1 for line in lines if line[-1] == mark)
+                 for mark in (mover, other)}
+        cell_lines = {cell: [j for j, line in enumerate(lines)
+                             if cell in line[:-1]] for cell in moves}
+
+        def claims(cell: str, mark: str, extra: str, taken: set) -> set:
+            """
+            Return the lines a stone of mark on cell would claim, with a
+            stone of mark already on extra and the lines taken claimed.
+            """
+            return {j for j in cell_lines[cell] if unclaimed[j] and
+                    j not in taken and 2 * (counts[mark][j] + 1 +
+                                            (j in cell_lines.get(extra, ())))
+                    >= lengths[j]}
+
+        outcomes = []
+        for move in moves:
+            mover_claims = claims(move, mover, '', set())
+            mover_owns = owned[mover] + len(mover_claims)
+            rest = [cell for cell in moves if cell != move]
+            if mover_owns >= to_win or not rest:
+                outcomes.append(self.LOSE)
+                continue
+            # The other player moves in the child.
+            if not self.p1_turn and any(
+                    owned[other] + len(claims(cell, other, '',
+                                              mover_claims)) >= to_win
+                    for cell in rest):
+                outcomes.append(self.WIN)
+                continue
+            # Cells where the mover could win with one more stone, with
+            # the lines they would claim; a reply only changes that by
+            # taking the cell or claiming some of the lines.
+            threats = [(cell, claims(cell, mover, move, mover_claims))
+                       for cell in rest]
+            threats = [(cell, lines_claimed) for cell, lines_claimed
+                       in threats if mover_owns + len(lines_claimed) >=
+                       to_win]
+            loses = False
+            if threats and len(rest) > 1:
+                for reply in rest:
+                    reply_claims = claims(reply, other, '', mover_claims)
+                    if owned[other] + len(reply_claims) >= to_win:
+                        continue
+                    if any(cell != reply and mover_owns + len(
+                            lines_claimed - reply_claims) >= to_win
+                           for cell, lines_claimed in threats):
+                        loses = True
+                        break
+            outcomes.append(self.LOSE if loses else self.DRAW)
+        return outcomes
+
     def has_ley_line(self, player: str) -> int:
         """
         return the number of ley lines player has.
@@ -455,6 +553,35 @@ class SGState(GameState):
                 total += 1
         return total
 
+    def ley_lines(self) -> List[List[str]]:
+        """
+        return every ley line: its cells followed by its marker
+        >>> g = SGState(True, {1: ['A', 'B', '@'], 2: ['C', '@']}, {1: ['A', 'C', '@'], 2: ['B', '@']}, {1: ['A', '@'], 2: ['B', 'C', '@']})
+        >>> g.ley_lines()[:3]
+        [['A', 'B', '@'], ['C', '@'], ['A', 'C', '@']]
+        """
+        return list(self.h_ley_line.values()) + list(self.dr.values()) + \
+            list(self.dl.values())
+
+    def claiming_moves(self, player: str) -> List[str]:
+        """
+        return the cells where a stone of player would claim a ley line
+        that nobody has claimed yet
+        >>> g = SGState(True, {1: ['A', 'B', '@'], 2: ['C', '@']}, {1: ['A', 'C', '@'], 2: ['B', '@']}, {1: ['A', '@'], 2: ['B', 'C', '@']})
+        >>> g.claiming_moves('p1')
+        ['A', 'B', 'C']
+        """
+        player_mark = player[-1]
+        moves = []
+        for line in self.ley_lines():
+            if line[-1] == '@':
+                cells = line[:-1]
+                if cells.count(player_mark) + 1 >= len(cells) / 2:
+                    for cell in cells:
+                        if not cell.isnumeric() and cell not in moves:
+                            moves.append(cell)
+        return moves
+
     def whoes_line(self, line: List[str]) -> str:
         """
         return if the line is claimed
@@ -0,0 +1,216 @@
+"""
+A compact form of Stonehenge states for solvers that visit millions of
+states.
+
+SGState keeps its board as dictionaries of lists of strings and deep copies
+them on every move. Here a state is a position: a tuple
+
+    (cells, claims, p1_turn)
+
+where cells has one entry per cell in alphabetical order and claims one
+entry per ley line in the order of SGState.ley_lines(), each 0 for empty or
+unclaimed, 1 for player 1 and 2 for player 2. A BoardLayout knows which
+cells are on which ley line for one board size and plays moves on
+positions.
+"""
+from typing import List, Tuple
+from game_state import GameState
+from stonehenge import SGState, StonehengeGame
+
+Position = Tuple[Tuple[int, ...], Tuple[int, ...], bool]
+
+_layouts = {}
+
+
+class BoardLayout:
+    """
+    The cells and ley lines of a Stonehenge board of one size.
+
+    size - the side length of the board
+    cells - the name of each cell, in alphabetical order
+    lines - the cells of each ley line, in the order of SGState.ley_lines()
+    cell_lines - the ley lines through each cell
+    lines_to_win - the number of ley lines a player needs to win
+    tie_lines - the ley lines with an even number of cells, the only ones
+                whose claim does not follow from the cells: when such a
+                line fills up with as many stones of each player, it
+                belongs to whoever got half of it first
+    """
+    size: int
+    cells: List[str]
+    lines: List[Tuple[int, ...]]
+    cell_lines: List[Tuple[int, ...]]
+    lines_to_win: float
+    tie_lines: List[int]
+
+    def __init__(self, size: int) -> None:
+        """
+        Create the layout of a board of size.
+        """
+        state = StonehengeGame(True, size).current_state
+        self.size = size
+        self.cells = [cell for line in state.h_ley_line.values()
+                      for cell in line[:-1]]
+        index = {cell: i for i, cell in enumerate(self.cells)}
+        self.lines = [tuple(index[cell] for cell in line[:-1])
+                      for line in state.ley_lines()]
+        self.cell_lines = [tuple(j for j, line in enumerate(self.lines)
+                                 if i in line)
+                           for i in range(len(self.cells))]
+        self.lines_to_win = 1.5 * (size + 1)
+        self.tie_lines = [j for j, line in enumerate(self.lines)
+                          if len(line) % 2 == 0]
+
+    def start(self, p1_turn: bool) -> Position:
+        """
+        Return the position of an empty board.
+        """
+        return ((0,) * len(self.cells), (0,) * len(self.lines), p1_turn)
+
+    def from_state(self, state: SGState) -> Position:
+        """
+        Return the position of state.
+        """
+        marks = {'1': 1, '2': 2}
+        cells = tuple(marks.get(cell, 0)
+                      for line in state.h_ley_line.values()
+                      for cell in line[:-1])
+        claims = tuple(marks.get(line[-1], 0) for line in state.ley_lines())
+        return cells, claims, state.p1_turn
+
+    def to_state(self, position: Position) -> SGState:
+        """
+        Return the SGState of position.
+        """
+        cells, claims, p1_turn = position
+        marks = ['@', '1', '2']
+        names = [marks[mark] if mark else self.cells[i]
+                 for i, mark in enumerate(cells)]
+        lines = [[names[i] for i in line] + [marks[claims[j]]]
+                 for j, line in enumerate(self.lines)]
+        count = self.size + 1
+        directions = [{k + 1: lines[d * count + k] for k in range(count)}
+                      for d in range(3)]
+        return SGState(p1_turn, directions[0], directions[1], directions[2])
+
+    def pack(self, position: Position) -> int:
+        """
+        Return position as one int: its cells and claims as base 3 digits,
+        then a bit for whose turn it is.
+
+        >>> layout = board_layout(1)
+        >>> layout.pack(layout.play(layout.start(True), 0))
+        13668
+        """
+        cells, claims, p1_turn = position
+        code = 0
+        for mark in cells:
+            code = code * 3 + mark
+        for mark in claims:
+            code = code * 3 + mark
+        return code * 2 + p1_turn
+
+    def unpack(self, code: int) -> Position:
+        """
+        Return the position whose packed form is code.
+
+        >>> layout = board_layout(1)
+        >>> position = layout.play(layout.start(True), 0)
+        >>> layout.unpack(layout.pack(position)) == position
+        True
+        """
+        code, p1_turn = divmod(code, 2)
+        marks = []
+        for _ in range(len(self.cells) + len(self.lines)):
+            code, mark = divmod(code, 3)
+            marks.append(mark)
+        marks.reverse()
+        return (tuple(marks[:len(self.cells)]),
+                tuple(marks[len(self.cells):]), bool(p1_turn))
+
+    def index(self, position: Position) -> int:
+        """
+        Return the index of position in an array with index_count()
+        entries: its cells as base 3 digits, then for each tie line a bit
+        that is 1 if the line is tied and belongs to player 2, then a bit
+        for whose turn it is. Different positions have different indices,
+        but most indices belong to no reachable position.
+        """
+        cells, claims, p1_turn = position
+        code = 0
+        for mark in cells:
+            code = code * 3 + mark
+        for j in self.tie_lines:
+            line = self.lines[j]
+            tied = 2 * sum(1 for i in line if cells[i] == 1) == len(line) \
+                and all(cells[i] for i in line)
+            code = code * 2 + (tied and claims[j] == 2)
+        return code * 2 + p1_turn
+
+    def index_count(self) -> int:
+        """
+        Return the number of possible values of index.
+
+        >>> board_layout(2).index_count()
+        279936
+        """
+        return 3 ** len(self.cells) * 2 ** len(self.tie_lines) * 2
+
+    def moves(self, position: Position) -> List[int]:
+        """
+        Return the cells that can be taken in position: every empty cell,
+        unless a player has already won.
+        """
+        cells, claims, _ = position
+        if claims.count(1) >= self.lines_to_win or \
+                claims.count(2) >= self.lines_to_win:
+            return []
+        return [i for i, mark in enumerate(cells) if not mark]
+
+    def play(self, position: Position, cell: int) -> Position:
+        """
+        Return the position after the player to move takes cell.
+        """
+        cells, claims, p1_turn = position
+        mark = 1 if p1_turn else 2
+        cells = cells[:cell] + (mark,) + cells[cell + 1:]
+        claims = list(claims)
+        for j in self.cell_lines[cell]:
+            if not claims[j]:
+                line = self.lines[j]
+                if 2 * sum(1 for i in line if cells[i] == mark) >= len(line):
+                    claims[j] = mark
+        return cells, tuple(claims), not p1_turn
+
+    def score(self, position: Position) -> int:
+        """
+        Return the score of position, a position with no moves, for the
+        player about to move.
+        """
+        _, claims, p1_turn = position
+        mover, other = (1, 2) if p1_turn else (2, 1)
+        if claims.count(mover) >= self.lines_to_win:
+            return GameState.WIN
+        elif claims.count(other) >= self.lines_to_win:
+            return GameState.LOSE
+        return GameState.DRAW
+
+
+def board_layout(size: int) -> BoardLayout:
+    """
+    Return the layout of a board of size, made once per size.
+
+    >>> layout = board_layout(1)
+    >>> layout.cells
+    ['A', 'B', 'C']
+    >>> layout.lines
+    [(0, 1), (2,), (0, 2), (1,), (0,), (1, 2)]
+    """
+    if size not in _layouts:
+        _layouts[size] = BoardLayout(size)
+    return _layouts[size]
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
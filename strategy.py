@@ -5,28 +5,14 @@ NOTE: Make sure this file adheres to python-ta.
 Adjust the type annotations as needed, and implement both a recursive
 and an iterative version of minimax.
 
-NOTE: I use the Tree and Stack class and the code is from course website
+NOTE: I use the Stack class and the code is from course website
 """
-from typing import Any, List
+from typing import Any, Iterator
 from copy import deepcopy
 
 
 # TODO: Adjust the type annotation as needed.
-# The following are the needed Tree class and Stack class
-class Tree:
-    """
-    ADT tree
-    """
-    def __init__(self, value: object = None,
-                 children: List['Tree'] = None) -> None:
-        """
-        Create tree
-        """
-        self.value = value
-        self.children = children[:] if children is not None else []
-        self.score = None
-
-
+# The following is the needed Stack class
 class Stack:
     """ Last-in, first-out (LIFO) stack.
     """
@@ -60,6 +46,20 @@ class Stack:
         """
         return self._contains.pop()
 
+    def top(self) -> object:
+        """
+        Return the top element of Stack self without removing it.
+
+        Assume Stack self is not empty.
+
+        >>> s = Stack()
+        >>> s.add(5)
+        >>> s.add(7)
+        >>> s.top()
+        7
+        """
+        return self._contains[-1]
+
     def is_empty(self) -> bool:
         """
         Return whether Stack self is empty.
@@ -101,18 +101,20 @@ def rough_outcome_strategy(game: Any) -> Any:
         In essence: rough_outcome() will only look 1 or 2 states ahead to
         'guess' the outcome of the game, but no further. It's better than
         random, but worse than minimax.
+
+    The rough_outcome of every child is worked out at once by
+    current_state.evaluate_children(), which shares the work between them.
     """
     current_state = game.current_state
     best_move = None
     best_outcome = -2  # Temporarily -- just so we can replace this easily later
 
     # Get the move that results in the lowest rough_outcome for the opponent
-    for move in current_state.get_possible_moves():
-        new_state = current_state.make_move(move)
-
+    for move, outcome in zip(current_state.get_possible_moves(),
+                             current_state.evaluate_children()):
         # We multiply the below by -1 since a state that's bad for the opponent
         # is good for us.
-        guessed_score = new_state.rough_outcome() * -1
+        guessed_score = outcome * -1
         if guessed_score > best_outcome:
             best_outcome = guessed_score
             best_move = move
@@ -162,46 +164,94 @@ def recursive_helper(game: Any) -> Any:
                     for s in new_states])
 
 
+class Frame:
+    """
+    A state on the stack of iterative_minimax_strategy whose children are
+    being scored, one at a time.
+
+    A frame holds no children: only the iterator over the moves not
+    scored yet and the best score so far, so the stack takes memory in
+    proportion to the depth of the game times its branching factor (the
+    moves iterator holds the list of moves), not to the size of its tree.
+
+    state - the state
+    moves - the moves of state not scored yet
+    move - the move whose child is being scored, or None
+    best_score - the best score for the player to move of the children
+                 scored so far
+    best_move - the move of that child
+    """
+    state: Any
+    moves: Iterator[Any]
+    move: Any
+    best_score: int
+    best_move: Any
+
+    def __init__(self, state: Any) -> None:
+        """
+        Create a frame for state, with no child scored yet.
+        """
+        self.state = state
+        self.moves = iter(state.get_possible_moves())
+        self.move = None
+        self.best_score = -2
+        self.best_move = None
+
+    def add(self, score: int) -> None:
+        """
+        Take score, the score of the child of self.move for the player
+        about to move there, into account.
+        """
+        if -score > self.best_score:
+            self.best_score = -score
+            self.best_move = self.move
+
+
 # TODO: Implement an iterative version of the minimax strategy.
-# TODO cancer cancer cancer cancer cancer cancer
 def iterative_minimax_strategy(game: Any) -> Any:
     """
-    iterative minimax strategy
+    Return the move for game that minimax picks, like
+    recursive_minimax_strategy, without recursion.
+
+    The states are scored in post-order on a stack of Frames: the top frame
+    makes its next child, which is pushed if it has moves, and a frame
+    whose moves have all been scored is popped and its best score added to
+    the frame below. Only the frames of the path to the current state are
+    alive at any time.
     """
-    current_state = game.current_state
-    move_list = current_state.get_possible_moves()
-    state_tree = Tree(current_state)
-    state_stack = Stack()
-    state_stack.add(state_tree)
-    while not state_stack.is_empty():
-        state = state_stack.remove()
-        actual_state = state.value
-        if state.children != []:
-            state.score = max([c.score * -1 for c in state.children])
-        elif actual_state.get_possible_moves() == []:
-            game.current_state = actual_state
-            if game.is_winner(actual_state.get_current_player_name()):
-                state.score = 1
-            elif game.is_winner('p1') or game.is_winner('p2'):
-                state.score = -1
-            else:
-                state.score = 0
+    stack = Stack()
+    stack.add(Frame(game.current_state))
+    while True:
+        frame = stack.top()
+        frame.move = next(frame.moves, None)
+        if frame.move is None:
+            stack.remove()
+            if stack.is_empty():
+                return frame.best_move
+            stack.top().add(frame.best_score)
+            continue
+        child = frame.state.make_move(frame.move)
+        if child.get_possible_moves():
+            stack.add(Frame(child))
         else:
-            act(state)
-            state_stack.add(state)
-            for c in state.children:
-                state_stack.add(c)
-    score_list = [-1 * c.score for c in state.children]
-    return move_list[score_list.index(state.score)]
+            frame.add(leaf_score(game, child))
 
 
-def act(state: Tree) -> None:
+def leaf_score(game: Any, state: Any) -> int:
     """
-    act helper to make move on a state
+    Return the score of state, a state with no moves, for the player
+    about to move: 1 for a win, -1 for a loss, 0 for a tie.
     """
-    cur_state = state.value
-    state.children = [Tree(cur_state.make_move(m)) for m in
-                      cur_state.get_possible_moves()]
+    current_state = game.current_state
+    game.current_state = state
+    try:
+        if game.is_winner(state.get_current_player_name()):
+            return 1
+        elif game.is_winner('p1') or game.is_winner('p2'):
+            return -1
+        return 0
+    finally:
+        game.current_state = current_state
 
 
 if __name__ == "__main__":
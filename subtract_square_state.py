@@ -3,7 +3,8 @@ An implementation of a state for SubtractSquare.
 
 NOTE: You do not have to run python-ta on this file.
 """
-from typing import Any
+import math
+from typing import Any, List
 from game_state import GameState
 
 
@@ -30,12 +31,8 @@ class SubtractSquareState(GameState):
         """
         Return all possible moves that can be applied to this state.
         """
-        moves = []
-        for i in range(1, self.current_total + 1):
-            if i ** 2 <= self.current_total:
-                moves.append(i ** 2)
-
-        return moves
+        largest = math.isqrt(max(self.current_total, 0))
+        return [i ** 2 for i in range(1, largest + 1)]
 
     def make_move(self, move: Any) -> "SubtractSquareState":
         """
@@ -70,6 +67,30 @@ class SubtractSquareState(GameState):
 
         return self.DRAW
 
+    def evaluate_children(self) -> List[float]:
+        """
+        Return the rough_outcome of the state each move of this state leads
+        to, in the order of get_possible_moves, from one table of the
+        squares up to the current total instead of a square root per total
+        tried.
+
+        >>> SubtractSquareState(True, 10).evaluate_children()
+        [1, 0, 1]
+        """
+        squares = self.get_possible_moves()
+        square_set = set(squares)
+        outcomes = []
+        for move in squares:
+            total = self.current_total - move
+            if total in square_set:
+                outcomes.append(self.WIN)
+            elif all(total - square in square_set for square in squares
+                     if square < total):
+                outcomes.append(self.LOSE)
+            else:
+                outcomes.append(self.DRAW)
+        return outcomes
+
 
 def is_pos_square(n: int) -> bool:
     """
@@ -0,0 +1,314 @@
+"""
+A module for Stonehenge tablebases: the exact value and a best move of every
+position that can be reached on a small board.
+
+Tablebase.build finds the reachable positions one layer at a time, layer k
+holding the positions with k stones on the board, and then scores the
+layers backwards from the fullest one (retrograde analysis): a position is
+won if one of its moves leads to a lost position in the next layer. Both
+passes can split each layer over several processes.
+
+Boards of size 1 to 3 have 8, 4270 and 633278 reachable positions.
+
+Tablebases can be written to tablebase files (see tablebase_file.py) in
+TABLEBASE_DIR, which tablebase_strategy probes before building anything.
+"""
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from game_state import GameState
+from stonehenge import SGState
+from subtract_square_state import SubtractSquareState
+from tablebase_file import TablebaseFile, write_tablebase_file, \
+    STONEHENGE, SUBTRACT_SQUARE, LOSE_CODE, WIN_CODE, MISSING_CODE
+from stonehenge_board import Position, board_layout
+from ranking import ranking_for
+from search import iterative_deepening_strategy
+
+# Largest board size tablebase_strategy builds a tablebase for.
+MAX_TABLEBASE_SIZE = 3
+
+# Where tablebase_strategy looks for tablebase files.
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'tablebases')
+
+# Name of the Subtract Square tablebase file in TABLEBASE_DIR.
+SUBTRACT_SQUARE_FILE = 'subtract-square.gtb'
+
+# Positions sent to a worker process at a time.
+CHUNK_SIZE = 5000
+
+# Tablebases built by tablebase_strategy, by board size.
+_tablebases = {}
+
+# Tablebase files opened by tablebase_strategy, by path.
+_files = {}
+
+# The values of the layer after the one being scored, for worker processes.
+_next_values = {}
+
+
+class Tablebase:
+    """
+    The value and best move of every reachable position of a board size.
+
+    size - the board size
+    entries - maps the packed form of each position (BoardLayout.pack) to
+              an entry: (best cell + 1) * 3 + (value + 1), where value is
+              for the player to move and best cell is -1 if there are no
+              moves
+    layer_sizes - the number of positions with each number of stones
+    """
+    size: int
+    entries: Dict[int, int]
+    layer_sizes: List[int]
+
+    def __init__(self, size: int, entries: Dict[int, int],
+                 layer_sizes: List[int]) -> None:
+        """
+        Create a tablebase for board size.
+        """
+        self.size = size
+        self.entries = entries
+        self.layer_sizes = layer_sizes
+
+    @staticmethod
+    def build(size: int, workers: int = 1) -> 'Tablebase':
+        """
+        Return the tablebase of board size, built with workers processes.
+        """
+        layout = board_layout(size)
+        layers = [{layout.start(True), layout.start(False)}]
+        while True:
+            children = set()
+            for chunk in _run_layer(_expand, size, list(layers[-1]), workers):
+                children.update(chunk)
+            if not children:
+                break
+            layers.append(children)
+
+        global _next_values
+        entries = {}
+        for layer in reversed(layers):
+            layer_entries = {}
+            for chunk in _run_layer(_score, size, list(layer), workers):
+                layer_entries.update(chunk)
+            entries.update(layer_entries)
+            _next_values = layer_entries
+        _next_values = {}
+        return Tablebase(size, entries, [len(layer) for layer in layers])
+
+    def probe(self, state: SGState) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Return the value of state for the player to move and a best move,
+        or None if state is not in the tablebase.
+        """
+        if state.size != self.size:
+            return None
+        layout = board_layout(self.size)
+        entry = self.entries.get(layout.pack(layout.from_state(state)))
+        if entry is None:
+            return None
+        value, cell = entry % 3 - 1, entry // 3 - 1
+        return value, (layout.cells[cell] if cell >= 0 else None)
+
+    def codes(self) -> bytearray:
+        """
+        Return the value code of every rank (see ranking.py) of this board
+        size, one per byte.
+        """
+        layout = board_layout(self.size)
+        ranking = ranking_for(self.size)
+        codes = bytearray([MISSING_CODE]) * ranking.count
+        for packed, entry in self.entries.items():
+            codes[ranking.rank(layout.unpack(packed))] = entry % 3
+        return codes
+
+    def write_file(self, path: str) -> None:
+        """
+        Write the values of this tablebase to a tablebase file at path.
+        """
+        write_tablebase_file(path, self.codes(), STONEHENGE, self.size)
+
+    def save(self, path: str) -> None:
+        """
+        Save this tablebase to path.
+        """
+        with open(path, 'wb') as file:
+            pickle.dump((self.size, self.entries, self.layer_sizes), file)
+
+    @staticmethod
+    def load(path: str) -> 'Tablebase':
+        """
+        Return the tablebase saved to path.
+        """
+        with open(path, 'rb') as file:
+            return Tablebase(*pickle.load(file))
+
+
+def _run_layer(function: Any, size: int, positions: List[Position],
+               workers: int) -> List[Any]:
+    """
+    Return the results of calling function(size, chunk) on chunks of
+    positions, using workers processes if workers > 1. The worker processes
+    are forked, so they see _next_values as it is now.
+    """
+    if workers <= 1:
+        return [function(size, positions)]
+    chunks = [positions[i:i + CHUNK_SIZE]
+              for i in range(0, len(positions), CHUNK_SIZE)]
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        return list(pool.map(function, [size] * len(chunks), chunks))
+
+
+def _expand(size: int, positions: List[Position]) -> Set[Position]:
+    """
+    Return every position reached by one move from positions.
+    """
+    layout = board_layout(size)
+    return {layout.play(position, cell) for position in positions
+            for cell in layout.moves(position)}
+
+
+def _score(size: int, positions: List[Position]) -> Dict[int, int]:
+    """
+    Return the tablebase entries of positions, given the values of every
+    position one move later in _next_values.
+    """
+    layout = board_layout(size)
+    entries = {}
+    for position in positions:
+        moves = layout.moves(position)
+        if not moves:
+            entry = layout.score(position) + 1
+        else:
+            best_value, best_cell = -2, None
+            for cell in moves:
+                child = layout.pack(layout.play(position, cell))
+                value = 1 - _next_values[child] % 3
+                if value > best_value:
+                    best_value, best_cell = value, cell
+                    if value == GameState.WIN:
+                        break
+            entry = (best_cell + 1) * 3 + best_value + 1
+        entries[layout.pack(position)] = entry
+    return entries
+
+
+def subtract_square_codes(max_total: int) -> bytearray:
+    """
+    Return the value code of Subtract Square for every total from 0 to
+    max_total, one per byte: a total is won if some square can be
+    subtracted to leave a lost total.
+
+    >>> list(subtract_square_codes(5))
+    [0, 2, 0, 2, 2, 0]
+    """
+    codes = bytearray([LOSE_CODE]) * (max_total + 1)
+    for total in range(1, max_total + 1):
+        root = 1
+        while root * root <= total:
+            if codes[total - root * root] == LOSE_CODE:
+                codes[total] = WIN_CODE
+                break
+            root += 1
+    return codes
+
+
+def write_tablebase_files(directory: str = TABLEBASE_DIR,
+                          sizes: Tuple[int, ...] = (1, 2, 3),
+                          max_total: int = 100000,
+                          workers: int = 1) -> None:
+    """
+    Write the Stonehenge tablebase files of sizes and the Subtract Square
+    tablebase file up to max_total to directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for size in sizes:
+        Tablebase.build(size, workers).write_file(
+            os.path.join(directory, stonehenge_file_name(size)))
+    write_tablebase_file(os.path.join(directory, SUBTRACT_SQUARE_FILE),
+                         subtract_square_codes(max_total), SUBTRACT_SQUARE, 0)
+
+
+def stonehenge_file_name(size: int) -> str:
+    """
+    Return the name of the Stonehenge tablebase file of board size.
+    """
+    return 'stonehenge-{}.gtb'.format(size)
+
+
+def open_tablebase_file(name: str) -> Optional[TablebaseFile]:
+    """
+    Return the tablebase file name in TABLEBASE_DIR, opened once, or None
+    if there is no such file.
+    """
+    path = os.path.join(TABLEBASE_DIR, name)
+    if path not in _files:
+        _files[path] = TablebaseFile(path) if os.path.exists(path) else None
+    return _files[path]
+
+
+def file_move(state: Any) -> Any:
+    """
+    Return the move from state to the worst state for the opponent
+    according to the tablebase files, or None if they do not cover state.
+    """
+    if isinstance(state, SGState):
+        table = open_tablebase_file(stonehenge_file_name(state.size))
+        if table is None:
+            return None
+        layout = board_layout(state.size)
+        ranking = ranking_for(state.size)
+        position = layout.from_state(state)
+        values = {layout.cells[cell]:
+                  table.value(ranking.rank(layout.play(position, cell)))
+                  for cell in layout.moves(position)}
+    elif isinstance(state, SubtractSquareState):
+        table = open_tablebase_file(SUBTRACT_SQUARE_FILE)
+        if table is None:
+            return None
+        values = {move: table.value(state.current_total - move)
+                  for move in state.get_possible_moves()}
+    else:
+        return None
+    if not values or None in values.values():
+        return None
+    return min(values, key=values.get)
+
+
+def tablebase_for(size: int) -> Tablebase:
+    """
+    Return the tablebase of board size, building it the first time.
+    """
+    if size not in _tablebases:
+        _tablebases[size] = Tablebase.build(size)
+    return _tablebases[size]
+
+
+def tablebase_strategy(game: Any) -> Any:
+    """
+    Return the best move for game according to the tablebase files in
+    TABLEBASE_DIR if they cover it, else according to a tablebase built in
+    memory if its board is at most MAX_TABLEBASE_SIZE, and otherwise the
+    move of iterative_deepening_strategy. The tablebase in memory is built
+    on the first call for each size, which takes about 15 seconds for size
+    3.
+    """
+    state = game.current_state
+    move = file_move(state)
+    if move is not None:
+        return move
+    if isinstance(state, SGState) and state.size <= MAX_TABLEBASE_SIZE:
+        found = tablebase_for(state.size).probe(state)
+        if found is not None and found[1] is not None:
+            return found[1]
+    return iterative_deepening_strategy(game)
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,193 @@
+"""
+A module for tablebase files that engines can probe without loading them.
+
+A tablebase file holds one value per position index, 2 bits each. For
+Stonehenge the index is the rank of the position (see ranking.py), for
+Subtract Square the total:
+
+    0 - the player to move loses
+    1 - draw
+    2 - the player to move wins
+    3 - no reachable position has this index
+
+The values are cut into blocks of block_entries values, and each block is
+packed 4 values to a byte and compressed with zlib on its own. The file is
+
+    header        HEADER: magic, version, game, board size, number of
+                  entries, entries per block, number of blocks
+    block index   number of blocks + 1 offsets (8 bytes each) from the
+                  start of the file; block i is between offsets i and i + 1
+    blocks
+
+TablebaseFile memory-maps the file, so opening it reads nothing but the
+header, processes probing the same file share the page cache, and a block
+is only read and decompressed when a probe needs it. The last
+cache_blocks decompressed blocks are kept.
+"""
+import mmap
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Any, List, Sequence
+import numpy
+
+# magic, version, game, board size, entries, entries per block, blocks
+HEADER = struct.Struct('<4sHHIQII')
+MAGIC = b'GTB1'
+VERSION = 2
+OFFSET = struct.Struct('<Q')
+
+# Game codes in the header.
+STONEHENGE = 1
+SUBTRACT_SQUARE = 2
+
+# Value codes.
+LOSE_CODE = 0
+DRAW_CODE = 1
+WIN_CODE = 2
+MISSING_CODE = 3
+
+# Default values per block; 4 KB per block once packed.
+DEFAULT_BLOCK_ENTRIES = 1 << 14
+
+# Default number of decompressed blocks a TablebaseFile keeps.
+DEFAULT_CACHE_BLOCKS = 64
+
+
+def write_tablebase_file(path: str, codes: Sequence[int], game: int,
+                         size: int,
+                         block_entries: int = DEFAULT_BLOCK_ENTRIES) -> None:
+    """
+    Write the value codes codes, one per index, to a tablebase file at path
+    for game (STONEHENGE or SUBTRACT_SQUARE) and board size. codes can be
+    any sequence of ints, e.g. a bytearray with one code per byte.
+
+    Precondition: block_entries is a multiple of 4.
+    """
+    blocks = []
+    for start in range(0, len(codes), block_entries):
+        blocks.append(zlib.compress(pack_codes(
+            codes[start:start + block_entries]), 9))
+    offset = HEADER.size + OFFSET.size * (len(blocks) + 1)
+    offsets = [offset]
+    for block in blocks:
+        offset += len(block)
+        offsets.append(offset)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, game, size, len(codes),
+                               block_entries, len(blocks)))
+        for offset in offsets:
+            file.write(OFFSET.pack(offset))
+        for block in blocks:
+            file.write(block)
+
+
+def pack_codes(codes: Sequence[int]) -> bytes:
+    """
+    Return codes packed 4 to a byte, the first in the lowest bits.
+
+    >>> list(pack_codes([1, 2, 3, 0, 2]))
+    [57, 2]
+    """
+    quads = numpy.zeros((len(codes) + 3) // 4 * 4, dtype=numpy.uint8)
+    quads[:len(codes)] = numpy.frombuffer(bytes(codes), dtype=numpy.uint8)
+    quads = quads.reshape(-1, 4)
+    return (quads[:, 0] | quads[:, 1] << 2 | quads[:, 2] << 4 |
+            quads[:, 3] << 6).tobytes()
+
+
+class TablebaseFile:
+    """
+    A memory-mapped tablebase file.
+
+    game - the game code of the file
+    size - the board size of the file
+    entries - the number of indices
+    block_entries - the number of values per block
+    cache_blocks - how many decompressed blocks to keep
+    blocks_read - the number of blocks decompressed so far
+    """
+    game: int
+    size: int
+    entries: int
+    block_entries: int
+    cache_blocks: int
+    blocks_read: int
+
+    def __init__(self, path: str,
+                 cache_blocks: int = DEFAULT_CACHE_BLOCKS) -> None:
+        """
+        Open the tablebase file at path.
+        """
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.game, self.size, self.entries, \
+            self.block_entries, blocks = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError('{} is not a tablebase file'.format(path))
+        self._offsets = struct.unpack_from('<{}Q'.format(blocks + 1),
+                                           self._map, HEADER.size)
+        self.cache_blocks = cache_blocks
+        self._cache = OrderedDict()
+        self.blocks_read = 0
+
+    def code(self, index: int) -> int:
+        """
+        Return the value code of index.
+        """
+        if not 0 <= index < self.entries:
+            return MISSING_CODE
+        number, offset = divmod(index, self.block_entries)
+        block = self._cache.get(number)
+        if block is None:
+            block = self._read_block(number)
+        else:
+            self._cache.move_to_end(number)
+        return (block[offset >> 2] >> ((offset & 3) * 2)) & 3
+
+    def value(self, index: int) -> Any:
+        """
+        Return the value of index for the player to move: GameState.WIN,
+        DRAW or LOSE, or None if no position has this index.
+        """
+        code = self.code(index)
+        if code == MISSING_CODE:
+            return None
+        return code - 1
+
+    def _read_block(self, number: int) -> bytes:
+        """
+        Decompress block number and add it to the cache.
+        """
+        start, end = self._offsets[number], self._offsets[number + 1]
+        block = zlib.decompress(self._map[start:end])
+        self.blocks_read += 1
+        self._cache[number] = block
+        if len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return block
+
+    def close(self) -> None:
+        """
+        Close the file.
+        """
+        self._cache.clear()
+        self._map.close()
+
+    def __enter__(self) -> 'TablebaseFile':
+        """
+        Return this file, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: List[Any]) -> None:
+        """
+        Close the file at the end of a with statement.
+        """
+        self.close()
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,327 @@
+"""
+A module for fitting the weights of the ley-line evaluation of heuristic.py
+to self-play games (Texel tuning).
+
+Every position of a self-play game is labelled with the result the player
+to move there went on to get: 1 for a win, 0.5 for a draw, 0 for a loss.
+The weights w that best predict those results under the logistic model
+
+    P(player to move wins) = 1 / (1 + exp(-w' . features))
+
+are found by Newton's method on the log loss. Since
+tanh(x) = 2 / (1 + exp(-2x)) - 1, the evaluation tanh(w . features) with
+w = w' / 2 is then the expected result rescaled to [-1, 1].
+
+The games are played on positions (see stonehenge_board.py) by a one-ply
+greedy player: it takes the move whose position scores worst for the
+opponent under the current weights, or a random move with probability
+epsilon so that the games differ. The features of a whole batch of
+positions are worked out at once with NumPy from the cells and claims, the
+same way batch_playout.py plays games, and the positions are dropped as
+soon as their features are. The features and result of every position,
+16 bytes each, are spilled to a temporary file as each batch is done, and
+the fit maps them back from it one batch at a time on each Newton step, so
+a run keeps about one batch in memory however many positions it plays.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'weights.json')
+    >>> result = tune(2, 20, path, seed=0)
+    >>> load_weights(path) == result.weights
+    True
+"""
+import math
+import os
+import random
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy
+from stonehenge_board import Position
+from batch_playout import PlayoutBoard, playout_board
+from heuristic import DEFAULT_WEIGHTS, load_weights, write_weights
+
+# Positions whose features are worked out at once.
+DEFAULT_BATCH = 4096
+
+# The chance that the self-play player makes a random move. With less, the
+# games repeat each other and the weights fit the quirks of the player.
+DEFAULT_EPSILON = 0.3
+
+# The L2 penalty on the logistic weights, which keeps them finite when a
+# feature separates wins from losses perfectly.
+DEFAULT_L2 = 1e-4
+
+# Newton steps fit_logistic takes at most.
+MAX_NEWTON_STEPS = 50
+
+# The features and results of a batch of positions.
+Batch = Tuple[numpy.ndarray, numpy.ndarray]
+
+
+class SpilledBatches:
+    """
+    The features and results of positions, kept in a file as float32 rows
+    of the features followed by the result, and read back a batch at a
+    time through a memory map.
+
+    path - the file the rows are in
+    batch - the rows given at a time
+    positions - the number of rows
+    width - the number of features of a row
+    rows - the memory map of the rows, or None once closed
+    """
+    path: str
+    batch: int
+    positions: int
+    width: int
+    rows: Optional[numpy.memmap]
+
+    def __init__(self, path: str, batches: Iterable[Batch],
+                 batch: int = DEFAULT_BATCH) -> None:
+        """
+        Write batches to a new file at path and map it back, to be given
+        batch rows at a time.
+
+        >>> path = os.path.join(tempfile.mkdtemp(), 'rows')
+        >>> batches = [(numpy.ones((3, 2)), numpy.zeros(3))] * 2
+        >>> spilled = SpilledBatches(path, batches, batch=4)
+        >>> [len(results) for _, results in spilled]
+        [4, 2]
+        >>> spilled.close()
+        """
+        self.path = path
+        self.batch = batch
+        self.positions = 0
+        self.width = 0
+        with open(path, 'wb') as file:
+            for features, results in batches:
+                self.width = features.shape[1]
+                numpy.hstack([features, results[:, None]]).astype(
+                    numpy.float32).tofile(file)
+                self.positions += len(results)
+        self.rows = numpy.memmap(path, dtype=numpy.float32, mode='r',
+                                 shape=(self.positions, self.width + 1))
+
+    def __iter__(self) -> Iterator[Batch]:
+        """
+        Yield the features and results of the rows, batch rows at a time.
+        """
+        for start in range(0, self.positions, self.batch):
+            rows = self.rows[start:start + self.batch]
+            yield rows[:, :-1], rows[:, -1]
+
+    def close(self) -> None:
+        """
+        Let go of the memory map, so the file can be removed.
+        """
+        self.rows = None
+
+
+class TuningResult:
+    """
+    The result of tuning the evaluation weights.
+
+    weights - the fitted weights of the evaluation
+    positions - the number of positions they were fitted to
+    log_loss - the log loss of the fitted weights on those positions
+    start_log_loss - the log loss of the weights the games were played with
+    """
+    weights: Tuple[float, ...]
+    positions: int
+    log_loss: float
+    start_log_loss: float
+
+    def __init__(self, weights: Tuple[float, ...], positions: int,
+                 log_loss: float, start_log_loss: float) -> None:
+        """
+        Create a tuning result.
+        """
+        self.weights = weights
+        self.positions = positions
+        self.log_loss = log_loss
+        self.start_log_loss = start_log_loss
+
+    def __repr__(self) -> str:
+        """
+        Return a representation of this result.
+        """
+        return 'TuningResult(weights={}, positions={}, log_loss={:.4f}, ' \
+               'start_log_loss={:.4f})'.format(self.weights, self.positions,
+                                               self.log_loss,
+                                               self.start_log_loss)
+
+
+def batch_features(board: PlayoutBoard, cells: numpy.ndarray,
+                   claims: numpy.ndarray,
+                   mover: numpy.ndarray) -> numpy.ndarray:
+    """
+    Return the ley-line features of a batch of positions, one row each, for
+    the player to move: the same as heuristic.ley_line_features of their
+    states. cells, claims and mover are as made by PlayoutBoard.encode.
+
+    >>> board = playout_board(2)
+    >>> layout = board.layout
+    >>> position = layout.play(layout.start(True), 0)
+    >>> features = batch_features(board, *board.encode((position,)))
+    >>> [round(float(feature), 3) for feature in features[0]]
+    [-0.444, -0.037, -0.056]
+    """
+    incidence = board.incidence.astype(numpy.int16)
+    ones = (cells == 1).astype(numpy.int16) @ incidence
+    twos = (cells == 2).astype(numpy.int16) @ incidence
+    p1_moves = (mover == 1)[:, None]
+    mine = numpy.where(p1_moves, ones, twos)
+    theirs = numpy.where(p1_moves, twos, ones)
+    other = 3 - mover
+    lines = claims.shape[1]
+    claimed = (claims == mover[:, None]).sum(axis=1) - \
+        (claims == other[:, None]).sum(axis=1)
+    unclaimed = claims == 0
+    lengths = incidence.sum(axis=0)
+    pressure = numpy.where(unclaimed, (mine - theirs) / lengths, 0.0)
+    # On an unclaimed line both players are short of half, so the
+    # denominators are only clamped for the claimed lines masked out.
+    needed = numpy.where(
+        unclaimed, 1 / numpy.maximum(board.half - mine, 1) -
+        1 / numpy.maximum(board.half - theirs, 1), 0.0)
+    return numpy.stack([claimed / board.layout.lines_to_win,
+                        pressure.sum(axis=1) / lines,
+                        needed.sum(axis=1) / lines], axis=1)
+
+
+def self_play_game(size: int, weights: Sequence[float], epsilon: float,
+                   rng: random.Random) -> Tuple[List[Position], List[float]]:
+    """
+    Play a game of board size from a random first player with the greedy
+    player of weights, and return its positions before each move and the
+    result the player to move in each got.
+    """
+    board = playout_board(size)
+    layout = board.layout
+    coefficients = numpy.asarray(weights, dtype=numpy.float64)
+    position = layout.start(rng.random() < 0.5)
+    positions = []
+    moves = layout.moves(position)
+    while moves:
+        positions.append(position)
+        if rng.random() < epsilon:
+            cell = rng.choice(moves)
+        else:
+            children = [layout.play(position, cell) for cell in moves]
+            scores = batch_features(board, *board.encode(children)) @ \
+                coefficients
+            cell = moves[int(scores.argmin())]
+        position = layout.play(position, cell)
+        moves = layout.moves(position)
+    # score is for the player to move at the end, so the players before
+    # alternate between the other side of it and it.
+    score = (layout.score(position) + 1) / 2
+    plies = len(positions)
+    return positions, [score if (plies - ply) % 2 == 0 else 1 - score
+                       for ply in range(plies)]
+
+
+def training_batches(size: int, games: int,
+                     weights: Sequence[float] = DEFAULT_WEIGHTS,
+                     epsilon: float = DEFAULT_EPSILON,
+                     batch: int = DEFAULT_BATCH,
+                     seed: Optional[int] = None) \
+        -> Iterator[Batch]:
+    """
+    Yield the features and results of the positions of games self-play
+    games of board size, batch positions at a time, as float32 arrays.
+    """
+    board = playout_board(size)
+    rng = random.Random(seed)
+    positions, results = [], []
+    for number in range(games):
+        game_positions, game_results = self_play_game(size, weights,
+                                                      epsilon, rng)
+        positions.extend(game_positions)
+        results.extend(game_results)
+        while len(positions) >= batch or \
+                (positions and number == games - 1):
+            features = batch_features(board, *board.encode(
+                tuple(positions[:batch])))
+            yield (features.astype(numpy.float32),
+                   numpy.array(results[:batch], dtype=numpy.float32))
+            del positions[:batch], results[:batch]
+
+
+def log_loss(batches: Iterable[Batch],
+             coefficients: numpy.ndarray) -> float:
+    """
+    Return the mean log loss of predicting the results of batches from
+    their features with the logistic model of coefficients.
+
+    >>> batch = (numpy.zeros((4, 3)), numpy.ones(4))
+    >>> log_loss([batch], numpy.zeros(3)) == math.log(2)
+    True
+    """
+    total, count = 0.0, 0
+    for features, results in batches:
+        margins = features @ coefficients
+        # log(1 + exp(-m)) for a win and log(1 + exp(m)) for a loss,
+        # weighted by the result for draws.
+        total += float(numpy.sum(results * numpy.logaddexp(0, -margins) +
+                                 (1 - results) * numpy.logaddexp(0, margins)))
+        count += len(results)
+    return total / count
+
+
+def fit_logistic(batches: Iterable[Batch],
+                 l2: float = DEFAULT_L2) -> numpy.ndarray:
+    """
+    Return the coefficients of the logistic model that predicts the results
+    of batches from their features with the least log loss plus l2 times
+    their squared length, found by Newton's method. The gradient and
+    Hessian are summed one batch at a time, so batches may be read again
+    on each step, such as from a SpilledBatches.
+    """
+    count = sum(len(results) for _, results in batches)
+    width = next(iter(batches))[0].shape[1]
+    coefficients = numpy.zeros(width)
+    for _ in range(MAX_NEWTON_STEPS):
+        gradient = 2 * l2 * coefficients
+        hessian = 2 * l2 * numpy.eye(width)
+        for features, results in batches:
+            predicted = 1 / (1 + numpy.exp(-(features @ coefficients)))
+            gradient += features.T @ (predicted - results) / count
+            hessian += (features.T * (predicted * (1 - predicted))) @ \
+                features / count
+        step = numpy.linalg.solve(hessian, gradient)
+        coefficients -= step
+        if numpy.abs(step).max() < 1e-9:
+            break
+    return coefficients
+
+
+def tune(size: int, games: int, path: str,
+         weights: Sequence[float] = DEFAULT_WEIGHTS,
+         epsilon: float = DEFAULT_EPSILON, batch: int = DEFAULT_BATCH,
+         l2: float = DEFAULT_L2, seed: Optional[int] = None) -> TuningResult:
+    """
+    Fit the evaluation weights to games self-play games of board size
+    played with weights, write them to a weights file at path and return
+    the result.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        batches = SpilledBatches(
+            os.path.join(directory, 'positions'),
+            training_batches(size, games, weights, epsilon, batch, seed),
+            batch)
+        coefficients = fit_logistic(batches, l2)
+        fitted = tuple(float(coefficient) / 2
+                       for coefficient in coefficients)
+        result = TuningResult(
+            fitted, batches.positions, log_loss(batches, coefficients),
+            log_loss(batches,
+                     2 * numpy.asarray(weights, dtype=numpy.float64)))
+        batches.close()
+    write_weights(path, fitted, size=size, games=games,
+                  positions=result.positions, log_loss=result.log_loss)
+    return result
+
+
+if __name__ == "__main__":
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")